@@ -2,13 +2,23 @@
 This code is adapted from the ineuron Senor Fault detection project
 """
 
-from fastapi import FastAPI
+import time
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from pydantic import BaseModel
 from starlette.responses import RedirectResponse
+from starlette.routing import Match
 from uvicorn import run as app_run
 
 from source.constants.application import APP_HOST, APP_PORT
+from source.monitoring.metrics import REQUEST_LATENCY
+from source.pipeline.job_manager import JOB_SUCCEEDED, JobManager
+from source.pipeline.online_prediction_pipeline import OnlinePredictionPipeline
 from source.pipeline.prediction_pipeline import PredictionPipeline
 from source.pipeline.training_pipeline import TrainPipeline
 
@@ -24,6 +34,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+online_prediction_pipeline = OnlinePredictionPipeline()
+
+job_manager = JobManager()
+
+
+class ScoreRequest(BaseModel):
+    rows: List[Dict[str, Any]]
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+
+    status = 500
+
+    try:
+        response = await call_next(request)
+
+        status = response.status_code
+
+        return response
+
+    finally:
+        # label by route template so job ids don't explode the label set
+        route = next(
+            (
+                route.path
+                for route in app.router.routes
+                if route.matches(request.scope)[0] == Match.FULL
+            ),
+            "unmatched",
+        )
+
+        REQUEST_LATENCY.labels(request.method, route, status).observe(
+            time.perf_counter() - start
+        )
+
 
 @app.get("/", tags=["authentication"])
 async def index():
@@ -33,11 +80,9 @@ async def index():
 @app.get("/train")
 async def trainRouteClient():
     try:
-        train_pipeline = TrainPipeline()
+        job = job_manager.submit("train", lambda: TrainPipeline().run_pipeline())
 
-        train_pipeline.run_pipeline()
-
-        return Response("Training successful !!")
+        return JSONResponse(job.to_dict(), status_code=202)
 
     except Exception as e:
         return Response(f"Error Occurred! {e}")
@@ -46,17 +91,63 @@ async def trainRouteClient():
 @app.get("/predict")
 async def predictRouteClient():
     try:
-        prediction_pipeline = PredictionPipeline()
-
-        prediction_pipeline.initiate_prediction()
-
-        return Response(
-            "Prediction successful and predictions are stored in s3 bucket !!"
+        job = job_manager.submit(
+            "predict", lambda: PredictionPipeline().initiate_prediction()
         )
 
+        return JSONResponse(job.to_dict(), status_code=202)
+
     except Exception as e:
         return Response(f"Error Occurred! {e}")
 
 
+@app.get("/jobs/{job_id}")
+async def jobStatusRouteClient(job_id: str):
+    job = job_manager.get_job(job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/result")
+async def jobResultRouteClient(job_id: str):
+    job = job_manager.get_job(job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    if job.is_active:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job.status}")
+
+    if job.status != JOB_SUCCEEDED:
+        return JSONResponse({"status": job.status, "error": job.error}, status_code=500)
+
+    return {"status": job.status, "result": jsonable_encoder(job.result)}
+
+
+@app.post("/v1/score")
+async def scoreRouteClient(request: ScoreRequest):
+    try:
+        dataframe = online_prediction_pipeline.build_dataframe(request.rows)
+
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    try:
+        prediction = await online_prediction_pipeline.score(dataframe)
+
+        return {"predictions": prediction.to_dict(orient="records")}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error Occurred! {e}")
+
+
+@app.get("/metrics")
+async def metricsRouteClient():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 if __name__ == "__main__":
     app_run(app, host=APP_HOST, port=APP_PORT)
@@ -0,0 +1,150 @@
+"""
+Timing and quality benchmark of the class balancing methods.
+
+Synthetic data following config/schema.yaml is split, preprocessed with the
+training preprocessor and balanced with every method of source.ml.balancing.
+For each method the configured model is fitted on the balanced set and
+scored on the untouched test split, so resampling time, fit time and test
+metrics can be compared side by side.
+
+Usage, from the repository root:
+```
+python -m benchmarks.balancing_benchmark --rows 1000000 --methods smote,undersample,scale_pos_weight
+```
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+from benchmarks.run_benchmarks import environment
+from benchmarks.synthetic_data import generate_back_order_data
+from source.components.data_transformation import DataTransformation
+from source.constants.training_pipeline import TARGET_COLUMN
+from source.entity.config_entity import DataTransformationConfig
+from source.ml.balancing import (
+    BALANCING_METHODS,
+    benchmark_balancers,
+    stratify_column_indices,
+)
+from source.ml.model import TunedModel
+from source.ml.pre_processing import drop_columns
+from source.utils import apply_schema_dtypes
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+
+    parser.add_argument("--rows", type=int, default=200_000)
+
+    parser.add_argument(
+        "--methods",
+        default=",".join(BALANCING_METHODS),
+        help="comma separated balancing methods",
+    )
+
+    parser.add_argument("--seed", type=int, default=42)
+
+    parser.add_argument("--output-dir", default="benchmark_results")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> str:
+    args = parse_args(argv)
+
+    config = DataTransformationConfig()
+
+    dataframe = drop_columns(
+        apply_schema_dtypes(generate_back_order_data(args.rows, seed=args.seed))
+    )
+
+    train_df, test_df = train_test_split(
+        dataframe,
+        test_size=0.2,
+        stratify=dataframe[TARGET_COLUMN],
+        random_state=args.seed,
+    )
+
+    preprocessor = DataTransformation(None, config).get_data_transformer_object()
+
+    label_encoder = LabelEncoder()
+
+    X_train = preprocessor.fit_transform(train_df.drop(columns=[TARGET_COLUMN]))
+
+    X_test = preprocessor.transform(test_df.drop(columns=[TARGET_COLUMN]))
+
+    y_train = label_encoder.fit_transform(train_df[TARGET_COLUMN])
+
+    y_test = label_encoder.transform(test_df[TARGET_COLUMN])
+
+    results = benchmark_balancers(
+        lambda: TunedModel().initiate_model(),
+        np.asarray(X_train, dtype=np.float32),
+        y_train,
+        np.asarray(X_test, dtype=np.float32),
+        y_test,
+        methods=tuple(args.methods.split(",")),
+        sampling_ratio=config.balancing_sampling_ratio,
+        k_neighbors=config.balancing_k_neighbors,
+        n_jobs=config.balancing_n_jobs,
+        max_neighbor_candidates=config.balancing_max_neighbor_candidates,
+        reweight=config.balancing_reweight,
+        stratify_on=stratify_column_indices(
+            preprocessor.get_feature_names_out(),
+            config.balancing_stratify_on,
+            preprocessor.feature_names_in_,
+        )
+        if config.balancing_stratify_on
+        else None,
+        n_bins=config.balancing_stratify_bins,
+        random_state=args.seed,
+    )
+
+    print(
+        f"{'method':<18}{'rows':>10}{'balance s':>11}{'fit s':>9}"
+        f"{'bal acc':>9}{'recall':>8}{'precision':>11}"
+    )
+
+    for row in results:
+        print(
+            f"{row['method']:<18}{row['train_rows']:>10}{row['balance_time_s']:>11.2f}"
+            f"{row['fit_time_s']:>9.2f}{row['balanced_accuracy_score']:>9.4f}"
+            f"{row['recall_score']:>8.4f}{row['precision_score']:>11.4f}"
+        )
+
+    started_at = datetime.now()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    output_file_path = os.path.join(
+        args.output_dir, f"balancing_{started_at.strftime('%m_%d_%Y_%H_%M_%S')}.json"
+    )
+
+    with open(output_file_path, "w") as output_file:
+        json.dump(
+            {
+                "started_at": started_at.isoformat(),
+                "environment": environment(),
+                "rows": args.rows,
+                "seed": args.seed,
+                "results": results,
+            },
+            output_file,
+            indent=2,
+            default=str,
+        )
+
+    print(f"Results written to {output_file_path}")
+
+    return output_file_path
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,84 @@
+"""
+Compare two benchmark result files written by benchmarks/run_benchmarks.py.
+
+Prints wall time, CPU time and peak RSS of every (rows, stage) pair present in
+both files with the candidate/baseline ratio, and exits with status 1 when a
+wall time ratio exceeds --threshold.
+
+Usage, from the repository root:
+```
+python -m benchmarks.compare_results baseline.json candidate.json --threshold 1.2
+```
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, Optional, Tuple
+
+
+def load_results(file_path: str) -> Dict[Tuple[int, str], dict]:
+    with open(file_path) as results_file:
+        results = json.load(results_file)
+
+    return {(row["rows"], row["stage"]): row for row in results["results"]}
+
+
+def ratio(candidate: Optional[float], baseline: Optional[float]) -> Optional[float]:
+    if not candidate or not baseline:
+        return None
+
+    return candidate / baseline
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+
+    parser.add_argument("baseline")
+
+    parser.add_argument("candidate")
+
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=None,
+        help="fail when a candidate wall time exceeds the baseline by this ratio",
+    )
+
+    args = parser.parse_args(argv)
+
+    baseline, candidate = load_results(args.baseline), load_results(args.candidate)
+
+    regressions = []
+
+    print(f"{'rows':>10}  {'stage':<45} {'wall':>8} {'cpu':>8} {'peak rss':>8}")
+
+    for key in sorted(baseline.keys() & candidate.keys()):
+        ratios = [
+            ratio(candidate[key][metric], baseline[key][metric])
+            for metric in ("wall_time_s", "cpu_time_s", "peak_rss_bytes")
+        ]
+
+        print(
+            f"{key[0]:>10}  {key[1]:<45} "
+            + " ".join(f"{'-' if r is None else f'{r:.2f}x':>8}" for r in ratios)
+        )
+
+        if args.threshold is not None and ratios[0] is not None and ratios[0] > args.threshold:
+            regressions.append(key)
+
+    for key in sorted(baseline.keys() ^ candidate.keys()):
+        source = "baseline" if key in baseline else "candidate"
+
+        print(f"{key[0]:>10}  {key[1]:<45} only in {source}")
+
+    if regressions:
+        print(f"{len(regressions)} stages slower than {args.threshold}x the baseline")
+
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
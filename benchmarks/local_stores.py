@@ -0,0 +1,379 @@
+"""
+In-memory stand-ins for S3 and MongoDB.
+
+They implement the subset of the boto3 and pymongo APIs the pipeline uses,
+and are installed into the shared S3Client and MongoDBClient connections so
+every component runs unchanged against them.
+"""
+
+import hashlib
+import io
+import itertools
+import shutil
+import threading
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+
+from botocore.exceptions import ClientError
+
+from source.configuration.aws_connection import S3Client
+from source.configuration.mongo_db_connection import MongoDBClient
+
+
+def _not_found(operation: str, key: str) -> ClientError:
+    return ClientError(
+        {"Error": {"Code": "404", "Message": f"Not Found: {key}"}}, operation
+    )
+
+
+class LocalS3Client:
+    """
+    Dictionary-backed replacement for the boto3 S3 client.
+    """
+
+    def __init__(self):
+        self.buckets: Dict[str, Dict[str, bytes]] = {}
+
+        self._uploads: Dict[str, Dict[int, bytes]] = {}
+
+        self._lock = threading.Lock()
+
+    def _bucket(self, bucket_name: str) -> Dict[str, bytes]:
+        return self.buckets.setdefault(bucket_name, {})
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes = b"", **kwargs) -> dict:
+        if hasattr(Body, "read"):
+            Body = Body.read()
+
+        with self._lock:
+            self._bucket(Bucket)[Key] = bytes(Body)
+
+        return {"ETag": self._etag(Body)}
+
+    def get_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        body = self._read(Bucket, Key, "GetObject")
+
+        return {
+            "Body": io.BytesIO(body),
+            "ETag": self._etag(body),
+            "ContentLength": len(body),
+        }
+
+    def head_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        body = self._read(Bucket, Key, "HeadObject")
+
+        return {"ETag": self._etag(body), "ContentLength": len(body)}
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str, **kwargs) -> None:
+        buffer = io.BytesIO()
+
+        with open(Filename, "rb") as file_obj:
+            shutil.copyfileobj(file_obj, buffer)
+
+        self.put_object(Bucket=Bucket, Key=Key, Body=buffer.getvalue())
+
+    def create_multipart_upload(self, Bucket: str, Key: str, **kwargs) -> dict:
+        upload_id = uuid.uuid4().hex
+
+        with self._lock:
+            self._uploads[upload_id] = {}
+
+        return {"UploadId": upload_id}
+
+    def upload_part(
+        self, Bucket: str, Key: str, PartNumber: int, UploadId: str, Body: bytes, **kwargs
+    ) -> dict:
+        with self._lock:
+            self._uploads[UploadId][PartNumber] = bytes(Body)
+
+        return {"ETag": self._etag(Body)}
+
+    def complete_multipart_upload(
+        self, Bucket: str, Key: str, UploadId: str, MultipartUpload: dict, **kwargs
+    ) -> dict:
+        with self._lock:
+            parts = self._uploads.pop(UploadId)
+
+        body = b"".join(
+            parts[part["PartNumber"]] for part in MultipartUpload["Parts"]
+        )
+
+        return self.put_object(Bucket=Bucket, Key=Key, Body=body)
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str, **kwargs) -> None:
+        with self._lock:
+            self._uploads.pop(UploadId, None)
+
+    def _read(self, bucket_name: str, key: str, operation: str) -> bytes:
+        try:
+            return self.buckets[bucket_name][key]
+
+        except KeyError:
+            raise _not_found(operation, key)
+
+    @staticmethod
+    def _etag(body: bytes) -> str:
+        return '"' + hashlib.md5(body).hexdigest() + '"'
+
+
+class _LocalObject:
+    def __init__(self, client: LocalS3Client, bucket_name: str, key: str):
+        self.meta = _Meta(client)
+
+        self.bucket_name = bucket_name
+
+        self.key = key
+
+    def get(self, **kwargs) -> dict:
+        return self.meta.client.get_object(Bucket=self.bucket_name, Key=self.key)
+
+    def load(self) -> None:
+        self.meta.client.head_object(Bucket=self.bucket_name, Key=self.key)
+
+    def __repr__(self) -> str:
+        return f"s3.ObjectSummary(bucket_name={self.bucket_name!r}, key={self.key!r})"
+
+
+class _LocalObjects:
+    def __init__(self, client: LocalS3Client, bucket_name: str):
+        self._client = client
+
+        self._bucket_name = bucket_name
+
+    def filter(self, Prefix: str = "") -> List[_LocalObject]:
+        keys = sorted(self._client.buckets.get(self._bucket_name, {}))
+
+        return [
+            _LocalObject(self._client, self._bucket_name, key)
+            for key in keys
+            if key.startswith(Prefix)
+        ]
+
+    def all(self) -> List[_LocalObject]:
+        return self.filter()
+
+
+class _LocalBucket:
+    def __init__(self, client: LocalS3Client, name: str):
+        self.name = name
+
+        self.objects = _LocalObjects(client, name)
+
+
+class _Meta:
+    def __init__(self, client: LocalS3Client):
+        self.client = client
+
+
+class LocalS3Resource:
+    """
+    Replacement for the boto3 S3 resource, backed by a LocalS3Client.
+    """
+
+    def __init__(self, client: LocalS3Client):
+        self.meta = _Meta(client)
+
+    def Bucket(self, name: str) -> _LocalBucket:
+        return _LocalBucket(self.meta.client, name)
+
+    def Object(self, bucket_name: str, key: str) -> _LocalObject:
+        return _LocalObject(self.meta.client, bucket_name, key)
+
+
+class LocalCollection:
+    """
+    List-backed replacement for a pymongo collection.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+        self.documents: List[Dict[str, Any]] = []
+
+        self._ids = itertools.count()
+
+    def insert_many(self, documents: List[Dict[str, Any]]) -> None:
+        for document in documents:
+            document.setdefault("_id", next(self._ids))
+
+            self.documents.append(document)
+
+    def count_documents(self, filter: Optional[dict] = None) -> int:
+        return sum(1 for _ in self.find(filter))
+
+    def estimated_document_count(self) -> int:
+        return len(self.documents)
+
+    def find(
+        self, filter: Optional[dict] = None, projection: Optional[dict] = None, **kwargs
+    ) -> "LocalCursor":
+        return LocalCursor(self, filter, projection)
+
+    def drop(self) -> None:
+        self.documents = []
+
+
+class LocalCursor:
+    """
+    Lazy cursor over a LocalCollection supporting sort, skip and limit.
+    """
+
+    def __init__(self, collection: LocalCollection, filter: Optional[dict], projection: Optional[dict]):
+        self._collection = collection
+
+        self._filter = filter
+
+        self._projection = projection
+
+        self._sort: Optional[tuple] = None
+
+        self._skip = 0
+
+        self._limit = 0
+
+        self._iterator: Optional[Iterator[Dict[str, Any]]] = None
+
+    def sort(self, key: str, direction: int = 1) -> "LocalCursor":
+        self._sort = (key, direction)
+
+        return self
+
+    def skip(self, skip: int) -> "LocalCursor":
+        self._skip = skip
+
+        return self
+
+    def limit(self, limit: int) -> "LocalCursor":
+        self._limit = limit
+
+        return self
+
+    def batch_size(self, batch_size: int) -> "LocalCursor":
+        return self
+
+    def __iter__(self) -> "LocalCursor":
+        return self
+
+    def __next__(self) -> Dict[str, Any]:
+        # like a pymongo cursor, iteration resumes where the last read stopped
+        if self._iterator is None:
+            self._iterator = self._documents()
+
+        return next(self._iterator)
+
+    def _documents(self) -> Iterator[Dict[str, Any]]:
+        documents = (
+            document
+            for document in self._collection.documents
+            if not self._filter or _matches(document, self._filter)
+        )
+
+        if self._sort is not None:
+            key, direction = self._sort
+
+            documents = iter(
+                sorted(documents, key=lambda document: document.get(key), reverse=direction < 0)
+            )
+
+        stop = None if not self._limit else self._skip + self._limit
+
+        # pymongo hands out a fresh dict per document, so copy them here too
+        for document in itertools.islice(documents, self._skip, stop):
+            yield _project(document, self._projection) if self._projection else dict(document)
+
+
+def _matches(document: Dict[str, Any], filter: dict) -> bool:
+    for field, condition in filter.items():
+        if field == "$and":
+            if not all(_matches(document, query) for query in condition):
+                return False
+
+            continue
+
+        if field == "$or":
+            if not any(_matches(document, query) for query in condition):
+                return False
+
+            continue
+
+        value = document.get(field)
+
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+
+            continue
+
+        for operator, operand in condition.items():
+            if operator == "$gte" and not value >= operand:
+                return False
+
+            if operator == "$gt" and not value > operand:
+                return False
+
+            if operator == "$lt" and not value < operand:
+                return False
+
+            if operator == "$lte" and not value <= operand:
+                return False
+
+            if operator == "$in" and value not in operand:
+                return False
+
+            if operator == "$ne" and value == operand:
+                return False
+
+    return True
+
+
+def _project(document: Dict[str, Any], projection: dict) -> Dict[str, Any]:
+    included = [field for field, flag in projection.items() if flag]
+
+    if included:
+        fields = set(included)
+
+        if projection.get("_id", 1):
+            fields.add("_id")
+
+        return {field: value for field, value in document.items() if field in fields}
+
+    excluded = set(projection)
+
+    return {field: value for field, value in document.items() if field not in excluded}
+
+
+class LocalDatabase(dict):
+    def __missing__(self, collection_name: str) -> LocalCollection:
+        collection = self[collection_name] = LocalCollection(collection_name)
+
+        return collection
+
+
+class LocalMongoClient(dict):
+    """
+    Replacement for pymongo.MongoClient holding databases in memory.
+    """
+
+    def __missing__(self, database_name: str) -> LocalDatabase:
+        database = self[database_name] = LocalDatabase()
+
+        return database
+
+
+def install_local_stores():
+    """
+    Point the shared S3 and MongoDB connections at fresh in-memory stores
+    and return them as (s3_client, mongo_client).
+    """
+
+    s3_client = LocalS3Client()
+
+    S3Client.s3_client = s3_client
+
+    S3Client.s3_resource = LocalS3Resource(s3_client)
+
+    mongo_client = LocalMongoClient()
+
+    MongoDBClient.client = mongo_client
+
+    return s3_client, mongo_client
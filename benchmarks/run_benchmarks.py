@@ -0,0 +1,340 @@
+"""
+Scale benchmark of the back-order pipeline components.
+
+For every requested row count, synthetic data following config/schema.yaml is
+loaded into in-memory stand-ins for MongoDB and S3, and the training pipeline
+components and the batch PredictionPipeline are run end to end against them.
+Each component is profiled with the StageProfiler, so the results carry wall
+time, CPU time and peak RSS per component and for the sub-steps nested in it.
+
+Results are written to a JSON file meant to be diffed between releases with
+benchmarks/compare_results.py.
+
+Usage, from the repository root:
+```
+python -m benchmarks.run_benchmarks --sizes 10000,100000
+```
+"""
+
+import argparse
+import dataclasses
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import traceback
+from datetime import datetime
+from typing import Any, Dict, List
+
+from benchmarks.local_stores import install_local_stores
+from benchmarks.synthetic_data import (
+    generate_back_order_data,
+    sample_prediction_input,
+    to_mongo_documents,
+)
+from source.components.data_ingestion import DataIngestion
+from source.components.data_transformation import DataTransformation
+from source.components.data_validation import DataValidation
+from source.components.model_evaluation import ModelEvaluation
+from source.components.model_pusher import ModelPusher
+from source.components.model_trainer import ModelTrainer
+from source.constants.database import DATABASE_NAME
+from source.entity.config_entity import (
+    DataIngestionConfig,
+    DataTransformationConfig,
+    DataValidationConfig,
+    ModelEvaluationConfig,
+    ModelPusherConfig,
+    ModelTrainerConfig,
+    PredictionPipelineConfig,
+    training_pipeline_config,
+)
+from source.logger import logging
+from source.ml.model_cache import ModelCache
+from source.ml.s3_estimator import BackOrderEstimator
+from source.monitoring.profiler import StageProfiler
+from source.pipeline.prediction_pipeline import PredictionPipeline
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+
+RESULT_SCHEMA_VERSION = 1
+
+
+def relocate_config(config, artifact_dir: str):
+    """
+    Copy of a config dataclass with every path under the training artifact
+    directory moved under artifact_dir.
+    """
+
+    changes = {
+        field.name: artifact_dir
+        + getattr(config, field.name)[len(training_pipeline_config.artifact_dir) :]
+        for field in dataclasses.fields(config)
+        if isinstance(getattr(config, field.name), str)
+        and getattr(config, field.name).startswith(training_pipeline_config.artifact_dir)
+    }
+
+    return dataclasses.replace(config, **changes)
+
+
+def run_size(n_rows: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Run every component on n_rows of synthetic data and return the profiled stages.
+    """
+
+    artifact_dir = os.path.join(args.work_dir, f"rows_{n_rows}")
+
+    s3_client, mongo_client = install_local_stores()
+
+    ModelCache._instances.clear()
+
+    profiler = StageProfiler(
+        report_file_path=os.path.join(artifact_dir, "profile", "run_report.json"),
+        trace_allocations=args.trace_allocations,
+    )
+
+    # a fresh snapshot per size, so ingestion measures the full first export
+    data_ingestion_config = dataclasses.replace(
+        relocate_config(DataIngestionConfig(), artifact_dir),
+        snapshot_file_path=os.path.join(artifact_dir, "snapshot", "back_order.parquet"),
+        watermark_file_path=os.path.join(artifact_dir, "snapshot", "watermark.yaml"),
+    )
+
+    model_evaluation_config = ModelEvaluationConfig()
+
+    prediction_pipeline_config = PredictionPipelineConfig()
+
+    status, error = "succeeded", None
+
+    with profiler.activate():
+        try:
+            with profiler.stage("generate_data") as record:
+                dataframe = generate_back_order_data(n_rows, seed=args.seed)
+
+                mongo_client[DATABASE_NAME][data_ingestion_config.collection_name].insert_many(
+                    to_mongo_documents(dataframe)
+                )
+
+                s3_client.put_object(
+                    Bucket=prediction_pipeline_config.data_bucket_name,
+                    Key=prediction_pipeline_config.data_file_path,
+                    Body=sample_prediction_input(dataframe, args.prediction_rows)
+                    .to_csv(index=False, na_rep="na")
+                    .encode(),
+                )
+
+                record["rows"] = n_rows
+
+                del dataframe
+
+            with profiler.stage("data_ingestion") as record:
+                data_ingestion_artifact = DataIngestion(
+                    data_ingestion_config
+                ).initiate_data_ingestion()
+
+                record["rows"] = n_rows
+
+            with profiler.stage("data_validation") as record:
+                data_validation_artifact = DataValidation(
+                    data_ingestion_artifact=data_ingestion_artifact,
+                    data_validation_config=relocate_config(
+                        DataValidationConfig(), artifact_dir
+                    ),
+                ).initiate_data_validation()
+
+                record["rows"] = n_rows
+
+            with profiler.stage("data_transformation") as record:
+                data_transformation_artifact = DataTransformation(
+                    data_validation_artifact,
+                    relocate_config(DataTransformationConfig(), artifact_dir),
+                ).initiate_data_transformation()
+
+                record["rows"] = n_rows
+
+            with profiler.stage("model_trainer") as record:
+                model_trainer_artifact = ModelTrainer(
+                    data_transformation_artifact=data_transformation_artifact,
+                    model_trainer_config=relocate_config(ModelTrainerConfig(), artifact_dir),
+                ).initiate_model_trainer()
+
+                record["rows"] = n_rows
+
+            # seed the registry with a champion so evaluation scores both models
+            BackOrderEstimator(
+                bucket_name=model_evaluation_config.bucket_name,
+                model_path=model_evaluation_config.s3_model_key_path,
+            ).save_model(model_trainer_artifact.trained_model_file_path)
+
+            with profiler.stage("model_evaluation") as record:
+                ModelEvaluation(
+                    model_eval_config=model_evaluation_config,
+                    data_validation_artifact=data_validation_artifact,
+                    data_transformation_artifact=data_transformation_artifact,
+                    model_trainer_artifact=model_trainer_artifact,
+                ).initiate_model_evaluation()
+
+                record["rows"] = n_rows
+
+            with profiler.stage("model_pusher"):
+                ModelPusher(
+                    model_trainer_artifact=model_trainer_artifact,
+                    model_pusher_config=relocate_config(ModelPusherConfig(), artifact_dir),
+                ).initiate_model_pusher()
+
+            with profiler.stage("prediction_pipeline") as record:
+                PredictionPipeline(prediction_pipeline_config).initiate_prediction()
+
+                record["rows"] = args.prediction_rows or n_rows
+
+        except Exception as e:
+            status, error = "failed", f"{type(e).__name__}: {e}"
+
+            logging.info(f"Benchmark at {n_rows} rows failed: {traceback.format_exc()}")
+
+    return {
+        "rows": n_rows,
+        "status": status,
+        "error": error,
+        "stages": profiler.stages,
+    }
+
+
+def flatten_stages(n_rows: int, stages: List[Dict[str, Any]], prefix: str = "") -> List[Dict[str, Any]]:
+    """
+    One row per component and sub-step, keyed by (rows, stage) for diffing.
+    """
+
+    rows = []
+
+    for stage in stages:
+        name = prefix + stage["name"]
+
+        wall_time = stage.get("wall_time_s")
+
+        stage_rows = stage.get("rows")
+
+        rows.append(
+            {
+                "rows": n_rows,
+                "stage": name,
+                "status": stage["status"],
+                "wall_time_s": wall_time,
+                "cpu_time_s": stage.get("cpu_time_s"),
+                "peak_rss_bytes": stage.get("peak_rss_bytes"),
+                "rows_per_s": stage_rows / wall_time if stage_rows and wall_time else None,
+            }
+        )
+
+        rows += flatten_stages(n_rows, stage["steps"], prefix=name + "/")
+
+    return rows
+
+
+def environment() -> Dict[str, Any]:
+    """
+    Interpreter, machine, library versions and git revision of the run.
+    """
+
+    import numpy
+    import pandas
+    import sklearn
+    import xgboost
+
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+
+    return {
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "scikit-learn": sklearn.__version__,
+        "xgboost": xgboost.__version__,
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="comma separated row counts",
+    )
+
+    parser.add_argument(
+        "--prediction-rows",
+        type=int,
+        default=None,
+        help="rows scored by the prediction pipeline, defaults to every row",
+    )
+
+    parser.add_argument("--seed", type=int, default=42)
+
+    parser.add_argument("--work-dir", default="benchmark_artifact")
+
+    parser.add_argument("--output-dir", default="benchmark_results")
+
+    parser.add_argument("--trace-allocations", action="store_true")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> str:
+    args = parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    started_at = datetime.now()
+
+    runs = []
+
+    for n_rows in sizes:
+        print(f"Benchmarking {n_rows} rows", flush=True)
+
+        start = time.perf_counter()
+
+        runs.append(run_size(n_rows, args))
+
+        print(
+            f"  {runs[-1]['status']} in {time.perf_counter() - start:.1f}s", flush=True
+        )
+
+    results = {
+        "schema_version": RESULT_SCHEMA_VERSION,
+        "started_at": started_at.isoformat(),
+        "finished_at": datetime.now().isoformat(),
+        "environment": environment(),
+        "seed": args.seed,
+        "results": [
+            row for run in runs for row in flatten_stages(run["rows"], run["stages"])
+        ],
+        "runs": runs,
+    }
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    output_file_path = os.path.join(
+        args.output_dir, f"benchmark_{started_at.strftime('%m_%d_%Y_%H_%M_%S')}.json"
+    )
+
+    with open(output_file_path, "w") as output_file:
+        json.dump(results, output_file, indent=2, default=str)
+
+    print(f"Results written to {output_file_path}")
+
+    return output_file_path
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
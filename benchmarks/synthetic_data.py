@@ -0,0 +1,174 @@
+"""
+Schema-driven synthetic back-order data.
+
+Every column listed in config/schema.yaml is generated from its declared type.
+Known columns follow distributions close to the production SKU snapshot
+(zero-inflated heavy-tailed quantities, -99 sentinels in the performance
+averages, missing lead times, rare Yes flags), and the target is drawn from
+a logistic model of stock cover so that about 0.7% of rows go on back-order
+and the classifier has signal to learn.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from source.constants.training_pipeline import SCHEMA_FILE_PATH, TARGET_COLUMN
+from source.utils import read_yaml_file
+
+# (zero probability, lognormal mean, lognormal sigma, nan rate)
+QUANTITY_PROFILES: Dict[str, tuple] = {
+    "national_inv": (0.07, 3.0, 2.0, 0.0),
+    "in_transit_qty": (0.80, 2.5, 1.8, 0.0),
+    "forecast_3_month": (0.68, 3.0, 1.9, 0.0),
+    "forecast_6_month": (0.64, 3.6, 1.9, 0.0),
+    "forecast_9_month": (0.62, 4.0, 1.9, 0.0),
+    "sales_1_month": (0.55, 2.0, 1.8, 0.0),
+    "sales_3_month": (0.40, 2.9, 1.9, 0.0),
+    "sales_6_month": (0.34, 3.5, 1.9, 0.0),
+    "sales_9_month": (0.30, 3.9, 1.9, 0.0),
+    "min_bank": (0.49, 2.0, 1.8, 0.0),
+    "pieces_past_due": (0.98, 1.5, 1.5, 0.0),
+    "local_bo_qty": (0.98, 1.0, 1.4, 0.0),
+}
+
+# probability of "Yes" for each flag
+FLAG_RATES: Dict[str, float] = {
+    "potential_issue": 0.0005,
+    "deck_risk": 0.23,
+    "oe_constraint": 0.0001,
+    "ppap_risk": 0.12,
+    "stop_auto_buy": 0.96,
+    "rev_stop": 0.0004,
+}
+
+TARGET_POSITIVE_RATE = 0.007
+
+# share of missing values in the categorical flags, written as "na" like the source data
+FLAG_NAN_RATE = 0.0001
+
+
+def generate_back_order_data(
+    n_rows: int,
+    seed: int = 42,
+    schema_file_path: str = SCHEMA_FILE_PATH,
+    positive_rate: float = TARGET_POSITIVE_RATE,
+) -> pd.DataFrame:
+    """
+    Generate n_rows of synthetic back-order data following the schema.
+    Missing values are NaN.
+    """
+
+    rng = np.random.default_rng(seed)
+
+    schema_config = read_yaml_file(file_path=schema_file_path)
+
+    columns: Dict[str, np.ndarray] = {}
+
+    for column_spec in schema_config["columns"]:
+        column, dtype = list(column_spec.items())[0]
+
+        if column == TARGET_COLUMN:
+            continue
+
+        if dtype == "int":
+            columns[column] = rng.permutation(n_rows) + 1_000_000
+
+        elif dtype == "float":
+            columns[column] = _generate_float(column, n_rows, rng)
+
+        else:
+            columns[column] = _generate_flag(column, n_rows, rng)
+
+    dataframe = pd.DataFrame(columns)
+
+    dataframe[TARGET_COLUMN] = _generate_target(dataframe, rng, positive_rate)
+
+    return dataframe
+
+
+def _generate_float(column: str, n_rows: int, rng: np.random.Generator) -> np.ndarray:
+    if column == "lead_time":
+        values = rng.choice(
+            [2.0, 4.0, 8.0, 12.0, 16.0, 52.0], size=n_rows, p=[0.2, 0.15, 0.45, 0.1, 0.07, 0.03]
+        )
+
+        values[rng.random(n_rows) < 0.06] = np.nan
+
+        return values
+
+    if column.startswith("perf_"):
+        values = np.clip(rng.beta(8, 1.2, size=n_rows), 0, 1).round(2)
+
+        values[rng.random(n_rows) < 0.077] = -99.0
+
+        return values
+
+    zero_rate, mean, sigma, nan_rate = QUANTITY_PROFILES.get(column, (0.5, 2.0, 1.5, 0.0))
+
+    values = np.floor(rng.lognormal(mean, sigma, size=n_rows))
+
+    values[rng.random(n_rows) < zero_rate] = 0.0
+
+    if column == "national_inv":
+        # a small share of negative inventory, as in the ERP extract
+        negative = rng.random(n_rows) < 0.005
+
+        values[negative] = -values[negative]
+
+    if nan_rate > 0:
+        values[rng.random(n_rows) < nan_rate] = np.nan
+
+    return values
+
+
+def _generate_flag(column: str, n_rows: int, rng: np.random.Generator) -> np.ndarray:
+    values = np.where(rng.random(n_rows) < FLAG_RATES.get(column, 0.1), "Yes", "No").astype(object)
+
+    values[rng.random(n_rows) < FLAG_NAN_RATE] = np.nan
+
+    return values
+
+
+def _generate_target(
+    dataframe: pd.DataFrame, rng: np.random.Generator, positive_rate: float
+) -> np.ndarray:
+    # low stock cover against the 3 month forecast drives back-orders
+    forecast = dataframe.get("forecast_3_month", pd.Series(0.0, index=dataframe.index))
+
+    inventory = dataframe.get("national_inv", pd.Series(0.0, index=dataframe.index))
+
+    cover = np.log1p(np.clip(inventory, 0, None)) - np.log1p(forecast)
+
+    score = -1.5 * cover.to_numpy() + rng.normal(0, 1.0, size=len(dataframe))
+
+    # intercept chosen so that the expected positive share matches positive_rate
+    threshold = np.quantile(score, 1 - positive_rate)
+
+    return np.where(score > threshold, "Yes", "No").astype(object)
+
+
+def to_mongo_documents(dataframe: pd.DataFrame) -> list:
+    """
+    Convert a DataFrame to documents shaped like the back_orders collection,
+    with missing values stored as the string "na".
+    """
+
+    return (
+        dataframe.astype(object)
+        .where(dataframe.notna(), "na")
+        .to_dict(orient="records")
+    )
+
+
+def sample_prediction_input(
+    dataframe: pd.DataFrame, n_rows: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Prediction input shaped like prediction_data.csv: the schema columns without the target.
+    """
+
+    dataframe = dataframe.drop(columns=[TARGET_COLUMN])
+
+    return dataframe if n_rows is None else dataframe.head(n_rows)
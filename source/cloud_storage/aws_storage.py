@@ -1,16 +1,22 @@
 import os
 import pickle
 import sys
-from io import StringIO
-from typing import List, Union
+import zlib
+from contextlib import nullcontext
+from io import BytesIO, RawIOBase, StringIO
+from typing import Callable, ContextManager, Iterable, Iterator, List, Optional, Tuple, Union
 
+import pyarrow as pa
+import pyarrow.parquet as pq
 from botocore.exceptions import ClientError
 from mypy_boto3_s3.service_resource import Bucket
-from pandas import DataFrame, read_csv
+from pandas import DataFrame
 
 from source.configuration.aws_connection import S3Client
+from source.constants.s3_bucket import COMPRESSION_EXTENSIONS, S3_MULTIPART_PART_SIZE
 from source.exception import BackOrderException
 from source.logger import logging
+from source.utils import read_csv_with_schema
 
 
 class SimpleStorageService:
@@ -48,6 +54,7 @@ class SimpleStorageService:
             raise BackOrderException(e, sys)
 
     def read_object(
+        self,
         object_name: str, decode: bool = True, make_readable: bool = False
     ) -> Union[StringIO, str]:
         """
@@ -152,6 +159,93 @@ class SimpleStorageService:
         except Exception as e:
             raise BackOrderException(e, sys) from e
 
+    def get_object_etag(self, s3_key: str, bucket_name: str) -> str:
+        """
+        Get the ETag of an S3 object without downloading its body.
+        """
+
+        logging.info("Entered the get_object_etag method of SimpleStorageService class")
+
+        try:
+            response = self.s3_client.head_object(Bucket=bucket_name, Key=s3_key)
+
+            logging.info("Exited the get_object_etag method of SimpleStorageService class")
+
+            return response["ETag"]
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def read_bytes(self, s3_key: str, bucket_name: str) -> bytes:
+        """
+        Read the raw content of an S3 object.
+        """
+
+        try:
+            return self.s3_client.get_object(Bucket=bucket_name, Key=s3_key)[
+                "Body"
+            ].read()
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def read_bytes_with_etag(self, s3_key: str, bucket_name: str) -> Tuple[bytes, str]:
+        """
+        Read the raw content of an S3 object together with the ETag of the
+        version that was actually read.
+        """
+
+        try:
+            response = self.s3_client.get_object(Bucket=bucket_name, Key=s3_key)
+
+            return response["Body"].read(), response["ETag"]
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def delete_object(self, s3_key: str, bucket_name: str) -> None:
+        """
+        Delete an object from the specified S3 bucket.
+        """
+
+        logging.info("Entered the delete_object method of SimpleStorageService class")
+
+        try:
+            self.s3_client.delete_object(Bucket=bucket_name, Key=s3_key)
+
+            logging.info(f"Deleted {s3_key} from {bucket_name} bucket")
+
+            logging.info("Exited the delete_object method of SimpleStorageService class")
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def load_model_with_etag(
+        self, model_name: str, bucket_name: str
+    ) -> Tuple[object, str]:
+        """
+        Load a machine learning model from an S3 bucket together with the ETag
+        of the object that was actually read.
+        """
+
+        logging.info(
+            "Entered the load_model_with_etag method of SimpleStorageService class"
+        )
+
+        try:
+            response = self.s3_client.get_object(Bucket=bucket_name, Key=model_name)
+
+            model = pickle.loads(response["Body"].read())
+
+            logging.info(
+                "Exited the load_model_with_etag method of SimpleStorageService class"
+            )
+
+            return model, response["ETag"]
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
     def create_folder(self, folder_name: str, bucket_name: str) -> None:
         """
         Create a folder in the specified S3 bucket.
@@ -181,10 +275,11 @@ class SimpleStorageService:
         to_filename: str,
         bucket_name: str,
         remove: bool = True,
+        compression: Optional[str] = None,
     ):
         """
-        Upload a file to the specified location in an S3 bucket, optionally removing
-        the local file afterwards.
+        Upload a file to the specified location in an S3 bucket, optionally
+        compressing it on the fly and removing the local file afterwards.
         """
         logging.info("Entered the upload_file method of SimpleStorageService class")
 
@@ -193,9 +288,18 @@ class SimpleStorageService:
                 f"Uploading {from_filename} file to {to_filename} file in {bucket_name} bucket"
             )
 
-            self.s3_resource.meta.client.upload_file(
-                from_filename, bucket_name, to_filename
-            )
+            if compression is None:
+                self.s3_resource.meta.client.upload_file(
+                    from_filename, bucket_name, to_filename
+                )
+
+            else:
+                with open(from_filename, "rb") as file_obj:
+                    blocks = iter(lambda: file_obj.read(S3_MULTIPART_PART_SIZE), b"")
+
+                    self.upload_parts(
+                        blocks, to_filename, bucket_name, compression=compression
+                    )
 
             logging.info(
                 f"Uploaded {from_filename} file to {to_filename} file in {bucket_name} bucket"
@@ -253,7 +357,7 @@ class SimpleStorageService:
         try:
             content = self.read_object(object_, make_readable=True)
 
-            df = read_csv(content, na_values="na")
+            df = read_csv_with_schema(content, na_values="na")
             logging.info(
                 "Exited the get_df_from_object method of SimpleStorageService class"
             )
@@ -281,3 +385,400 @@ class SimpleStorageService:
 
         except Exception as e:
             raise BackOrderException(e, sys) from e
+
+    def read_csv_chunks(
+        self, filename: str, bucket_name: str, chunksize: int
+    ) -> Iterator[DataFrame]:
+        """
+        Read a CSV file from an S3 bucket as an iterator of DataFrames of at most
+        chunksize rows, streaming the object body instead of loading it whole.
+        """
+
+        logging.info("Entered the read_csv_chunks method of SimpleStorageService class")
+
+        try:
+            response = self.s3_client.get_object(Bucket=bucket_name, Key=filename)
+
+            return read_csv_with_schema(
+                response["Body"], na_values="na", chunksize=chunksize
+            )
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def get_parquet_file(self, filename: str, bucket_name: str) -> pq.ParquetFile:
+        """
+        Download a Parquet file from an S3 bucket and open it for columnar reads.
+        """
+
+        try:
+            response = self.s3_client.get_object(Bucket=bucket_name, Key=filename)
+
+            return pq.ParquetFile(BytesIO(response["Body"].read()))
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def read_parquet(
+        self, filename: str, bucket_name: str, columns: Optional[List[str]] = None
+    ) -> DataFrame:
+        """
+        Read a Parquet file from an S3 bucket and return it as a DataFrame.
+        Only the requested columns that exist in the file are decoded.
+        """
+
+        logging.info("Entered the read_parquet method of SimpleStorageService class")
+
+        try:
+            parquet_file = self.get_parquet_file(filename, bucket_name)
+
+            df = parquet_file.read(
+                columns=_existing_columns(parquet_file, columns)
+            ).to_pandas()
+
+            logging.info("Exited the read_parquet method of SimpleStorageService class")
+
+            return df
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def read_parquet_chunks(
+        self,
+        filename: str,
+        bucket_name: str,
+        chunksize: int,
+        columns: Optional[List[str]] = None,
+    ) -> Iterator[DataFrame]:
+        """
+        Read a Parquet file from an S3 bucket as an iterator of DataFrames of at
+        most chunksize rows. The compressed file is held in memory, rows are only
+        decoded one batch at a time.
+        """
+
+        logging.info(
+            "Entered the read_parquet_chunks method of SimpleStorageService class"
+        )
+
+        try:
+            parquet_file = self.get_parquet_file(filename, bucket_name)
+
+            batches = parquet_file.iter_batches(
+                batch_size=chunksize, columns=_existing_columns(parquet_file, columns)
+            )
+
+            return (batch.to_pandas() for batch in batches)
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def upload_parts(
+        self,
+        parts: Iterable[bytes],
+        bucket_filename: str,
+        bucket_name: str,
+        compression: Optional[str] = None,
+        part_size: int = S3_MULTIPART_PART_SIZE,
+        part_timer: Optional[Callable[[], ContextManager]] = None,
+    ) -> None:
+        """
+        Upload a stream of byte blocks to an S3 object, optionally compressing
+        them with gzip or zstd on the fly. At most one part is buffered in memory.
+        Small objects are sent with a single put_object call, larger ones through
+        a multipart upload that is aborted on failure. part_timer returns a
+        context manager entered around each request sending data, so callers
+        can time the uploads apart from producing the blocks.
+        """
+
+        logging.info("Entered the upload_parts method of SimpleStorageService class")
+
+        upload_id = None
+
+        part_timer = part_timer or nullcontext
+
+        try:
+            completed_parts = []
+
+            buffer = bytearray()
+
+            def flush() -> None:
+                nonlocal upload_id
+
+                if upload_id is None:
+                    upload_id = self.s3_client.create_multipart_upload(
+                        Bucket=bucket_name, Key=bucket_filename
+                    )["UploadId"]
+
+                part_number = len(completed_parts) + 1
+
+                with part_timer():
+                    response = self.s3_client.upload_part(
+                        Bucket=bucket_name,
+                        Key=bucket_filename,
+                        UploadId=upload_id,
+                        PartNumber=part_number,
+                        Body=bytes(buffer),
+                    )
+
+                completed_parts.append(
+                    {"ETag": response["ETag"], "PartNumber": part_number}
+                )
+
+                buffer.clear()
+
+            for block in compress_blocks(parts, compression):
+                buffer.extend(block)
+
+                if len(buffer) >= part_size:
+                    flush()
+
+            if upload_id is None:
+                with part_timer():
+                    self.s3_client.put_object(
+                        Bucket=bucket_name, Key=bucket_filename, Body=bytes(buffer)
+                    )
+
+            else:
+                if len(buffer) > 0:
+                    flush()
+
+                with part_timer():
+                    self.s3_client.complete_multipart_upload(
+                        Bucket=bucket_name,
+                        Key=bucket_filename,
+                        UploadId=upload_id,
+                        MultipartUpload={"Parts": completed_parts},
+                    )
+
+            logging.info(
+                f"Uploaded {max(len(completed_parts), 1)} parts to {bucket_filename} file in {bucket_name} bucket"
+            )
+
+            logging.info("Exited the upload_parts method of SimpleStorageService class")
+
+        except Exception as e:
+            if upload_id is not None:
+                self.s3_client.abort_multipart_upload(
+                    Bucket=bucket_name, Key=bucket_filename, UploadId=upload_id
+                )
+
+            raise BackOrderException(e, sys) from e
+
+    def upload_df_chunks_as_csv(
+        self,
+        data_frames: Iterable[DataFrame],
+        bucket_filename: str,
+        bucket_name: str,
+        compression: Optional[str] = None,
+        part_timer: Optional[Callable[[], ContextManager]] = None,
+    ) -> None:
+        """
+        Upload a stream of DataFrames as a single CSV file to an S3 bucket
+        from memory. Only the first chunk writes the header.
+        """
+
+        logging.info(
+            "Entered the upload_df_chunks_as_csv method of SimpleStorageService class"
+        )
+
+        try:
+            def csv_blocks() -> Iterator[bytes]:
+                for i, data_frame in enumerate(data_frames):
+                    yield data_frame.to_csv(index=None, header=i == 0).encode()
+
+            self.upload_parts(
+                csv_blocks(),
+                bucket_filename,
+                bucket_name,
+                compression=compression,
+                part_timer=part_timer,
+            )
+
+            logging.info(
+                "Exited the upload_df_chunks_as_csv method of SimpleStorageService class"
+            )
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def upload_df_chunks_as_parquet(
+        self,
+        data_frames: Iterable[DataFrame],
+        bucket_filename: str,
+        bucket_name: str,
+        compression: Optional[str] = None,
+        part_timer: Optional[Callable[[], ContextManager]] = None,
+    ) -> None:
+        """
+        Upload a stream of DataFrames as a single Parquet file to an S3 bucket
+        from memory, writing one row group per DataFrame. The compression is
+        applied by Parquet itself, snappy is used when it is None.
+        """
+
+        logging.info(
+            "Entered the upload_df_chunks_as_parquet method of SimpleStorageService class"
+        )
+
+        try:
+            def parquet_blocks() -> Iterator[bytes]:
+                sink = _BlockSink()
+
+                writer = None
+
+                for data_frame in data_frames:
+                    if writer is None:
+                        table = pa.Table.from_pandas(data_frame, preserve_index=False)
+
+                        writer = pq.ParquetWriter(
+                            sink, table.schema, compression=compression or "snappy"
+                        )
+
+                    else:
+                        table = pa.Table.from_pandas(
+                            data_frame, schema=writer.schema, preserve_index=False
+                        )
+
+                    writer.write_table(table)
+
+                    yield sink.drain()
+
+                if writer is not None:
+                    writer.close()
+
+                yield sink.drain()
+
+            self.upload_parts(
+                parquet_blocks(), bucket_filename, bucket_name, part_timer=part_timer
+            )
+
+            logging.info(
+                "Exited the upload_df_chunks_as_parquet method of SimpleStorageService class"
+            )
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def upload_df(
+        self,
+        data_frame: DataFrame,
+        bucket_filename: str,
+        bucket_name: str,
+        compression: Optional[str] = None,
+        chunksize: int = 100_000,
+        file_format: str = "csv",
+    ) -> None:
+        """
+        Upload a DataFrame as a CSV or Parquet file to an S3 bucket straight from
+        memory, without writing a local file. The frame is encoded chunksize rows
+        at a time so only one encoded chunk and one upload part are held at once.
+        """
+
+        logging.info("Entered the upload_df method of SimpleStorageService class")
+
+        try:
+            data_frames = (
+                data_frame.iloc[start : start + chunksize]
+                for start in range(0, max(len(data_frame), 1), chunksize)
+            )
+
+            upload_chunks = (
+                self.upload_df_chunks_as_parquet
+                if file_format == "parquet"
+                else self.upload_df_chunks_as_csv
+            )
+
+            upload_chunks(
+                data_frames, bucket_filename, bucket_name, compression=compression
+            )
+
+            logging.info("Exited the upload_df method of SimpleStorageService class")
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+
+def compress_blocks(
+    blocks: Iterable[bytes], compression: Optional[str] = None
+) -> Iterator[bytes]:
+    """
+    Compress a stream of byte blocks with gzip or zstd, or pass it through
+    unchanged when compression is None.
+    """
+
+    if compression is None:
+        yield from blocks
+        return
+
+    if compression == "gzip":
+        compressor = zlib.compressobj(wbits=31)
+
+    elif compression == "zstd":
+        try:
+            import zstandard
+
+        except ImportError as e:
+            raise BackOrderException(
+                "zstd compression requires the zstandard package", sys
+            ) from e
+
+        compressor = zstandard.ZstdCompressor().compressobj()
+
+    else:
+        raise ValueError(
+            f"Unsupported compression {compression}, expected one of {list(COMPRESSION_EXTENSIONS)}"
+        )
+
+    for block in blocks:
+        compressed = compressor.compress(block)
+
+        if compressed:
+            yield compressed
+
+    yield compressor.flush()
+
+
+def _existing_columns(
+    parquet_file: pq.ParquetFile, columns: Optional[List[str]]
+) -> Optional[List[str]]:
+    if columns is None:
+        return None
+
+    available_columns = set(parquet_file.schema_arrow.names)
+
+    return [column for column in columns if column in available_columns]
+
+
+class _BlockSink(RawIOBase):
+    """
+    Write-only file that hands out what was written since the last drain.
+    tell() keeps counting across drains so the Parquet footer offsets stay valid.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+        self._blocks: List[bytes] = []
+
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        block = bytes(data)
+
+        self._blocks.append(block)
+
+        self._position += len(block)
+
+        return len(block)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._blocks)
+
+        self._blocks.clear()
+
+        return data
@@ -1,16 +1,23 @@
 import os
 import sys
+from datetime import datetime
+from typing import Any, List, Optional
 
+import numpy as np
+import pandas as pd
+from bson import ObjectId
 from pandas import DataFrame
 from sklearn.model_selection import train_test_split
 
 from source.constants.training_pipeline import SCHEMA_DROP_COLS, SCHEMA_FILE_PATH
-from source.data_access.back_order_data import BackOrderData
+from source.data_access.back_order_data import INCREMENT_MATCH_COLUMN, BackOrderData
+from source.data_access.feature_store import dataset_exists, write_dataset
 from source.entity.artifact_entity import DataIngestionArtifact
 from source.entity.config_entity import DataIngestionConfig
 from source.exception import BackOrderException
 from source.logger import logging
-from source.utils import read_yaml_file
+from source.monitoring.profiler import profile_step
+from source.utils import apply_schema_dtypes, read_yaml_file, write_yaml_file
 
 
 class DataIngestion:
@@ -25,6 +32,9 @@ class DataIngestion:
         export_data_into_feature_store() -> DataFrame:
             Export data from MongoDB to a feature store file.
 
+        sync_snapshot() -> DataFrame:
+            Bring the local snapshot of the collection up to date and return it.
+
         split_data_as_train_test(dataframe: DataFrame) -> None:
             Split the given dataframe into training and testing datasets and export them.
 
@@ -56,29 +66,200 @@ class DataIngestion:
 
             back_order_data = BackOrderData()
 
-            dataframe = back_order_data.export_collection_as_dataframe(
-                collection_name=self.data_ingestion_config.collection_name
-            )
+            if self.data_ingestion_config.incremental:
+                snapshot = self.sync_snapshot(back_order_data)
 
-            logging.info(f"Shape of dataframe: {dataframe.shape}")
+                dataframe = snapshot.drop(
+                    columns=[
+                        column
+                        for column in ("_id", self.data_ingestion_config.watermark_field)
+                        if column in snapshot.columns
+                        and column not in back_order_data.schema_columns
+                    ]
+                )
 
-            feature_store_file_path = self.data_ingestion_config.feature_store_file_path
+            else:
+                with profile_step("mongo_export"):
+                    dataframe = back_order_data.export_collection_as_dataframe(
+                        collection_name=self.data_ingestion_config.collection_name,
+                        columns=back_order_data.get_export_columns(
+                            self.data_ingestion_config.project_schema_columns
+                        ),
+                        n_partitions=self.data_ingestion_config.export_partitions,
+                        partition_field=self.data_ingestion_config.export_partition_field,
+                        query=back_order_data.ingestion_filter,
+                    )
+
+            logging.info(f"Shape of dataframe: {dataframe.shape}")
 
-            dir_path = os.path.dirname(feature_store_file_path)
+            dataframe = apply_schema_dtypes(dataframe)
 
-            os.makedirs(dir_path, exist_ok=True)
+            feature_store_file_path = self.data_ingestion_config.feature_store_file_path
 
             logging.info(
                 f"Saving exported data into feature store file path: {feature_store_file_path}"
             )
 
-            dataframe.to_csv(feature_store_file_path, index=False, header=True)
+            write_dataset(dataframe, feature_store_file_path)
 
             return dataframe
 
         except Exception as e:
             raise BackOrderException(e, sys)
         
+    def sync_snapshot(self, back_order_data: Optional[BackOrderData] = None) -> DataFrame:
+        """
+        Bring the local snapshot of the collection up to date and return it.
+
+        Only documents whose watermark field is at or past the stored watermark
+        are pulled from MongoDB, and they replace snapshot rows with the same
+        _id. Pulled documents no longer matching the ingestion filter are
+        removed from the snapshot instead.
+        The watermark field must be an update timestamp set on every insert and
+        update, _id is refused: an ObjectId watermark never sees updates, and
+        misses inserts with client generated ids lower than the watermark.
+        Without a snapshot, or when the watermark field changed, the whole
+        collection is exported. The snapshot is written before the watermark,
+        so an interrupted run pulls the same documents again on the next run.
+        Documents deleted from MongoDB stay in the snapshot until it is removed.
+        """
+
+        try:
+            config = self.data_ingestion_config
+
+            if config.watermark_field == "_id":
+                raise ValueError(
+                    "Incremental ingestion needs an update timestamp as watermark field, "
+                    "_id misses updated documents and late inserts"
+                )
+
+            back_order_data = back_order_data or BackOrderData()
+
+            columns = back_order_data.get_export_columns(config.project_schema_columns)
+
+            query = back_order_data.ingestion_filter
+
+            # a snapshot taken with other columns or another filter is rebuilt
+            watermark = self.read_watermark(columns=list(columns), query=query)
+
+            snapshot = None
+
+            if watermark is not None and os.path.isfile(config.snapshot_file_path):
+                snapshot = pd.read_parquet(config.snapshot_file_path)
+
+            else:
+                watermark = None
+
+            logging.info(
+                f"Pulling documents of {config.collection_name} with {config.watermark_field} after {watermark}"
+            )
+
+            with profile_step("mongo_export"):
+                delta = back_order_data.export_collection_increment(
+                    collection_name=config.collection_name,
+                    watermark_field=config.watermark_field,
+                    watermark=watermark,
+                    columns=columns,
+                    n_partitions=config.export_partitions,
+                    partition_field=config.export_partition_field,
+                    query=query,
+                )
+
+            logging.info(f"Pulled {len(delta)} new or changed documents")
+
+            if snapshot is not None and len(delta) == 0:
+                return snapshot
+
+            new_watermark = delta[config.watermark_field].dropna().max()
+
+            delta["_id"] = delta["_id"].astype(str)
+
+            if snapshot is not None:
+                delta = (
+                    pd.concat([snapshot, delta], ignore_index=True)
+                    .drop_duplicates(subset="_id", keep="last", ignore_index=True)
+                )
+
+            # snapshot rows carry no match flag, they matched when they were pulled
+            delta = delta[delta[INCREMENT_MATCH_COLUMN].fillna(True).astype(bool)].drop(
+                columns=INCREMENT_MATCH_COLUMN
+            ).reset_index(drop=True)
+
+            os.makedirs(os.path.dirname(config.snapshot_file_path), exist_ok=True)
+
+            snapshot_tmp_path = config.snapshot_file_path + ".tmp"
+
+            delta.to_parquet(snapshot_tmp_path, index=False)
+
+            os.replace(snapshot_tmp_path, config.snapshot_file_path)
+
+            self.write_watermark(
+                new_watermark if pd.notna(new_watermark) else watermark,
+                columns=list(columns),
+                query=query,
+            )
+
+            logging.info(f"Snapshot updated to {len(delta)} documents")
+
+            return delta
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def read_watermark(self, columns: List[str], query: dict) -> Any:
+        """
+        Read the stored watermark, None if there is none for the configured
+        field, columns and query.
+        """
+
+        watermark_file_path = self.data_ingestion_config.watermark_file_path
+
+        if not os.path.isfile(watermark_file_path):
+            return None
+
+        content = read_yaml_file(file_path=watermark_file_path)
+
+        if (
+            content.get("field") != self.data_ingestion_config.watermark_field
+            or content.get("columns") != columns
+            or content.get("query") != query
+        ):
+            return None
+
+        if content.get("type") == "object_id":
+            return ObjectId(content["value"])
+
+        return content["value"]
+
+    def write_watermark(self, watermark: Any, columns: List[str], query: dict) -> None:
+        """
+        Store the watermark of the configured field, with the columns and
+        query the snapshot was taken with.
+        """
+
+        if isinstance(watermark, np.generic):
+            watermark = watermark.item()
+
+        if isinstance(watermark, pd.Timestamp):
+            watermark = watermark.to_pydatetime()
+
+        content = {
+            "field": self.data_ingestion_config.watermark_field,
+            "value": watermark,
+            "columns": columns,
+            "query": query,
+            "updated_at": datetime.now(),
+        }
+
+        if isinstance(watermark, ObjectId):
+            content.update(type="object_id", value=str(watermark))
+
+        write_yaml_file(
+            file_path=self.data_ingestion_config.watermark_file_path,
+            content=content,
+            replace=True,
+        )
+
     def split_data_as_train_test(self, dataframe: DataFrame) -> None:
         """
         Split the given dataframe into training and testing datasets and export them.
@@ -88,7 +269,9 @@ class DataIngestion:
 
         try:
             train_set, test_set = train_test_split(
-                dataframe, test_size=self.data_ingestion_config.train_test_split_ratio
+                dataframe,
+                test_size=self.data_ingestion_config.train_test_split_ratio,
+                random_state=self.data_ingestion_config.train_test_split_random_state,
             )
 
             logging.info("Performed train test split on the dataframe")
@@ -97,19 +280,11 @@ class DataIngestion:
                 "Exited split_data_as_train_test method of Data_Ingestion class"
             )
 
-            dir_path = os.path.dirname(self.data_ingestion_config.training_file_path)
-
-            os.makedirs(dir_path, exist_ok=True)
-
             logging.info(f"Exporting train and test file path.")
 
-            train_set.to_csv(
-                self.data_ingestion_config.training_file_path, index=False, header=True
-            )
+            write_dataset(train_set, self.data_ingestion_config.training_file_path)
 
-            test_set.to_csv(
-                self.data_ingestion_config.testing_file_path, index=False, header=True
-            )
+            write_dataset(test_set, self.data_ingestion_config.testing_file_path)
 
             logging.info(f"Exported train and test file path.")
 
@@ -123,8 +298,8 @@ class DataIngestion:
         
         logging.info("Entered initiate_data_ingestion method of Data_Ingestion class")
         try: 
-            if not (os.path.isfile(self.data_ingestion_config.training_file_path) and \
-                    os.path.isfile(self.data_ingestion_config.testing_file_path)):
+            if not (dataset_exists(self.data_ingestion_config.training_file_path) and \
+                    dataset_exists(self.data_ingestion_config.testing_file_path)):
                               
                 dataframe = self.export_data_into_feature_store()
 
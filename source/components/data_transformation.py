@@ -2,10 +2,12 @@ import sys
 
 import numpy as np
 import pandas as pd
-from imblearn.combine import SMOTETomek
-from source.ml.pre_processing import Winsorizer,drop_columns
-from sklearn.impute import SimpleImputer
-from sklearn.pipeline import Pipeline
+from scipy import sparse
+from source.ml.pre_processing import drop_columns
+from source.ml.balancing import ClassBalancer, stratify_column_indices
+from source.ml.chunked_preprocessing import fit_preprocessor_in_chunks, transform_in_chunks
+from source.ml.preprocessing_spec import PreprocessingSpec
+from source.ml.compiled_preprocessor import compile_preprocessor
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import RobustScaler
 
@@ -17,11 +19,13 @@ from source.entity.artifact_entity import (
 from source.entity.config_entity import DataTransformationConfig
 from source.exception import BackOrderException
 from source.logger import logging
+from source.monitoring.profiler import profile_step
 # from sensor.ml.model.estimator import TargetValueMapping
-from source.utils import save_numpy_array_data, save_object
+from source.data_access.feature_store import iter_dataset, read_dataset
+from source.utils import get_feature_columns, save_numpy_array_data, save_object
 from source.utils import read_yaml_file
-from source.constants.training_pipeline import SCHEMA_DROP_COLS, SCHEMA_FILE_PATH
-from sklearn.preprocessing import StandardScaler,OneHotEncoder,LabelEncoder
+from source.constants.training_pipeline import SCHEMA_FILE_PATH
+from sklearn.preprocessing import LabelEncoder
 
 
 class DataTransformation:
@@ -33,11 +37,17 @@ class DataTransformation:
         data_transformation_config (DataTransformationConfig): Configuration for data transformation.
 
     Methods:
-        read_data(file_path) -> pd.DataFrame:
-            Read data from the specified file path into a DataFrame.
+        read_data(file_path, columns=None) -> pd.DataFrame:
+            Read the given columns of a feature store dataset into a DataFrame.
 
-        get_data_transformer_object() -> Pipeline:
-            Get the data transformer object based on schema configuration.
+        get_data_transformer_object() -> ColumnTransformer:
+            Get the data transformer object compiled from the preprocessing spec.
+
+        fit_transform_in_chunks(preprocessor) -> tuple:
+            Fit the preprocessor in chunks and transform both sets into memory-mapped arrays.
+
+        get_class_balancer(preprocessor) -> ClassBalancer:
+            Get the class balancer configured in the data transformation config.
 
         initiate_data_transformation() -> DataTransformationArtifact:
             Initiate the data transformation process, including feature engineering and saving artifacts.
@@ -61,26 +71,31 @@ class DataTransformation:
             
             self._schema_config = read_yaml_file(file_path=SCHEMA_FILE_PATH)
 
+            self._preprocessing_spec = PreprocessingSpec.from_file(
+                self._schema_config,
+                file_path=data_transformation_config.preprocessing_config_file_path,
+            )
+
         except Exception as e:
             raise BackOrderException(e, sys)
         
     @staticmethod
-    def read_data(file_path) -> pd.DataFrame:
+    def read_data(file_path, columns=None) -> pd.DataFrame:
         """
-        Read data from the specified file path into a DataFrame.
+        Read the given columns of a feature store dataset into a DataFrame.
         """
 
         try:
-            return pd.read_csv(file_path)
+            return read_dataset(file_path, columns=columns)
 
         except Exception as e:
             raise BackOrderException(e, sys)
         
 
 
-    def get_data_transformer_object(self) -> Pipeline:
+    def get_data_transformer_object(self) -> ColumnTransformer:
         """
-        Get the data transformer object based on schema configuration.
+        Get the data transformer object compiled from the preprocessing spec.
         """
 
         logging.info(
@@ -88,73 +103,122 @@ class DataTransformation:
         )
 
         try:
-            logging.info("Got numerical cols from schema config")
+            input_preprocessor = self._preprocessing_spec.build_preprocessor()
 
-            numerical_cols = list(
-                set(self._schema_config["numerical"]) - set(self._schema_config[SCHEMA_DROP_COLS])
-                )
+            logging.info(
+                f"created preprocessor object from {self.data_transformation_config.preprocessing_config_file_path}"
+            )
 
-            logging.info(f"Numerical cols: {numerical_cols}")
+            logging.info(
+                "Exited get_data_transformer_object method of DataTransformation class"
+            )
 
-            logging.info("Got categorical cols from schema config")
+            return input_preprocessor
 
-            categorical_cols = list(
-                set(self._schema_config["categorical"]) - set(self._schema_config[SCHEMA_DROP_COLS]) -{TARGET_COLUMN}
-                )
-            
-            logging.info(f"Categorical cols: {categorical_cols}")
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
 
-            # components of numerical pipeline
-            numerical_imputer = SimpleImputer(strategy="median", add_indicator=False)
-            standard_scaler = StandardScaler()
 
-            # logging.info(f"initialized standard scaler, simple imputer with median to transform numerical columns")
+    def fit_transform_in_chunks(self, preprocessor: ColumnTransformer) -> tuple:
+        """
+        Fit the preprocessor on the training set chunk by chunk and transform
+        both sets in chunks into memory-mapped arrays at the transformed file
+        paths. Returns the train features, train target, test features, test
+        target and a sample of the test features for compiling the preprocessor.
+        """
 
-            # Constructing the numerical pipeline
-            num_pipeline = Pipeline([
-                ('scaler', standard_scaler),
-                ('imputer', numerical_imputer),
-                ('outlier_clipping', Winsorizer()),
-            ])
+        try:
+            config = self.data_transformation_config
 
-            logging.info("pipeline to transform numerical columns is complete")
+            feature_columns = get_feature_columns(self._schema_config)
 
-            # components of caegorical pipeline
-            categorical_imputer = SimpleImputer(strategy="most_frequent", add_indicator=False)
-            categorical_encoder = OneHotEncoder(drop='first')
+            def chunk_source(file_path):
+                return lambda columns=None: iter_dataset(
+                    file_path,
+                    columns=feature_columns if columns is None else columns,
+                    batch_rows=config.chunk_rows,
+                )
 
-            # logging.info(f"initialized categorical_imputer with most frequent strategey , simple imputer with median to transform numerical columns")
+            train_chunks = chunk_source(self.data_validation_artifact.valid_train_file_path)
 
-            # construting categorical pipeline
-            cat_pipeline = Pipeline([
-                ('imputer', categorical_imputer),
-                ('encoder', categorical_encoder),
-            ])
+            test_chunks = chunk_source(self.data_validation_artifact.valid_test_file_path)
 
-            logging.info("pipeline to transform categorical columns is complete")
+            fit_preprocessor_in_chunks(
+                preprocessor,
+                train_chunks,
+                sketch_size=config.sketch_size,
+                random_state=config.balancing_random_state,
+            )
+
+            logging.info("Fitted the preprocessor object in chunks")
+
+            # the target is one column, it is read whole
+            target_feature_train_df = DataTransformation.read_data(
+                self.data_validation_artifact.valid_train_file_path, columns=[TARGET_COLUMN]
+            )[TARGET_COLUMN]
 
-            # combining numerical and categorical pipelines
-            input_preprocessor = ColumnTransformer(
-                transformers=[
-                    ('num', num_pipeline, numerical_cols),
-                    ('cat', cat_pipeline, categorical_cols),
-                ]
+            target_feature_test_df = DataTransformation.read_data(
+                self.data_validation_artifact.valid_test_file_path, columns=[TARGET_COLUMN]
+            )[TARGET_COLUMN]
+
+            input_feature_train_arr = transform_in_chunks(
+                preprocessor,
+                train_chunks(),
+                n_rows=len(target_feature_train_df),
+                file_path=config.transformed_train_file_path,
+                dtype=config.array_dtype,
             )
-           
-            logging.info(
-                "created preprocessor object by combining numerical and categorical pipelines using ColumnTransformer"
-                )
 
-            logging.info(
-                "Exited get_data_transformer_object method of DataTransformation class"
+            input_feature_test_arr = transform_in_chunks(
+                preprocessor,
+                test_chunks(),
+                n_rows=len(target_feature_test_df),
+                file_path=config.transformed_test_file_path,
+                dtype=config.array_dtype,
             )
-            
 
-            return input_preprocessor
+            logging.info("Transformed the train and test features in chunks")
+
+            return (
+                input_feature_train_arr,
+                target_feature_train_df,
+                input_feature_test_arr,
+                target_feature_test_df,
+                next(iter(test_chunks())),
+            )
 
         except Exception as e:
             raise BackOrderException(e, sys) from e
 
+    def get_class_balancer(self, preprocessor: ColumnTransformer) -> ClassBalancer:
+        """
+        Get the class balancer configured in the data transformation config.
+        The stratification columns are mapped to the features of the fitted preprocessor.
+        """
+
+        config = self.data_transformation_config
+
+        stratify_on = None
+
+        if config.balancing_method == "undersample" and config.balancing_stratify_on:
+            stratify_on = stratify_column_indices(
+                preprocessor.get_feature_names_out(),
+                config.balancing_stratify_on,
+                preprocessor.feature_names_in_,
+            )
+
+        return ClassBalancer(
+            method=self.data_transformation_config.balancing_method,
+            sampling_ratio=self.data_transformation_config.balancing_sampling_ratio,
+            k_neighbors=self.data_transformation_config.balancing_k_neighbors,
+            n_jobs=self.data_transformation_config.balancing_n_jobs,
+            max_neighbor_candidates=self.data_transformation_config.balancing_max_neighbor_candidates,
+            reweight=self.data_transformation_config.balancing_reweight,
+            random_state=self.data_transformation_config.balancing_random_state,
+            chunk_rows=self.data_transformation_config.chunk_rows,
+            stratify_on=stratify_on,
+            n_bins=self.data_transformation_config.balancing_stratify_bins,
+        )
 
     def initiate_data_transformation(self,) -> DataTransformationArtifact:
         """
@@ -168,54 +232,71 @@ class DataTransformation:
 
             logging.info("Got the preprocessor object")
 
-            # getting train and test data set
-            train_df = DataTransformation.read_data(
-                self.data_validation_artifact.valid_train_file_path
-            )
+            if self.data_transformation_config.chunked_fit:
+                logging.info("Fitting and applying the preprocessing object in chunks")
 
-            test_df = DataTransformation.read_data(
-                file_path=self.data_validation_artifact.valid_test_file_path
-            )
+                with profile_step("fit_transform"):
+                    (
+                        input_feature_train_arr,
+                        target_feature_train_df,
+                        input_feature_test_arr,
+                        target_feature_test_df,
+                        input_feature_test_df,
+                    ) = self.fit_transform_in_chunks(preprocessor)
+
+            else:
+                # getting train and test data set, only the columns the model uses
+                columns = get_feature_columns(self._schema_config) + [TARGET_COLUMN]
+
+                train_df = DataTransformation.read_data(
+                    self.data_validation_artifact.valid_train_file_path, columns=columns
+                )
+
+                test_df = DataTransformation.read_data(
+                    file_path=self.data_validation_artifact.valid_test_file_path,
+                    columns=columns,
+                )
 
-            # dropping unnecessary features
-            logging.info("dropping unnecessary features from train data set")
+                # dropping unnecessary features
+                logging.info("dropping unnecessary features from train data set")
 
-            train_df = drop_columns(train_df)
+                train_df = drop_columns(train_df)
 
-            logging.info("dropping unnecessary features from test data set")
+                logging.info("dropping unnecessary features from test data set")
             
-            test_df = drop_columns(test_df)
+                test_df = drop_columns(test_df)
 
-            # getting train and target features
-            # logging.info(f"trainging feature from train data set:{train_df.columns}")
+                # getting train and target features
+                # logging.info(f"trainging feature from train data set:{train_df.columns}")
 
-            input_feature_train_df = train_df.drop(columns=[TARGET_COLUMN], axis=1)
+                input_feature_train_df = train_df.drop(columns=[TARGET_COLUMN], axis=1)
 
-            target_feature_train_df = train_df[TARGET_COLUMN]
+                target_feature_train_df = train_df[TARGET_COLUMN]
 
 
-            logging.info("Got train features and target features of Training dataset")
+                logging.info("Got train features and target features of Training dataset")
 
-            input_feature_test_df = test_df.drop(columns=[TARGET_COLUMN], axis=1)
+                input_feature_test_df = test_df.drop(columns=[TARGET_COLUMN], axis=1)
 
-            target_feature_test_df = test_df[TARGET_COLUMN]
+                target_feature_test_df = test_df[TARGET_COLUMN]
 
-            logging.info("Got train features and target features of Testing dataset")
+                logging.info("Got train features and target features of Testing dataset")
 
-            # Transforming the training features 
-            logging.info(
-                "Applying preprocessing object on training dataframe and testing dataframe"
-            )
+                # Transforming the training features 
+                logging.info(
+                    "Applying preprocessing object on training dataframe and testing dataframe"
+                )
 
-            input_feature_train_arr = preprocessor.fit_transform(input_feature_train_df)
+                with profile_step("fit_transform"):
+                    input_feature_train_arr = preprocessor.fit_transform(input_feature_train_df)
 
-            logging.info(
-                "Used the preprocessor object to fit transform the train features"
-            )
+                logging.info(
+                    "Used the preprocessor object to fit transform the train features"
+                )
 
-            input_feature_test_arr = preprocessor.transform(input_feature_test_df)
+                input_feature_test_arr = preprocessor.transform(input_feature_test_df)
 
-            logging.info("Used the preprocessor object to transform the test features")
+                logging.info("Used the preprocessor object to transform the test features")
 
             # transforming the taget feature
             logging.info("Using the LabelEncoder to transform  input and test target feature")
@@ -232,23 +313,39 @@ class DataTransformation:
             logging.info("Applied LabelEncoder on test feature")
 
             # handling data imbalance
-            logging.info("Applying SMOTETomek on Training dataset")
-
-            smt = SMOTETomek(sampling_strategy="minority")
-
-            input_feature_train_arr, target_feature_train_arr = smt.fit_resample(
-                input_feature_train_arr, target_feature_train_arr
-            )
+            balancing_method = self.data_transformation_config.balancing_method
+
+            logging.info(f"Balancing the training dataset with {balancing_method}")
+
+            balancer = self.get_class_balancer(preprocessor)
+
+            # a chunked fit leaves the train features memory-mapped, the resampled
+            # rows are written back to the same file so they stay out of memory
+            with profile_step(f"balancing_{balancing_method}"):
+                (
+                    input_feature_train_arr,
+                    target_feature_train_arr,
+                    sample_weight_train_arr,
+                ) = balancer.fit_resample(
+                    input_feature_train_arr,
+                    target_feature_train_arr,
+                    file_path=(
+                        self.data_transformation_config.transformed_train_file_path
+                        if self.data_transformation_config.chunked_fit
+                        else None
+                    ),
+                )
 
-            logging.info("Applied SMOTETomek on training dataset")
+            logging.info(f"Balanced the training dataset with {balancing_method}")
 
-            train_arr = np.c_[
-                input_feature_train_arr, target_feature_train_arr
-            ]
+            if sparse.issparse(input_feature_train_arr):
+                logging.info(
+                    f"Transformed features are sparse: {input_feature_train_arr.shape[1]} columns, "
+                    f"{input_feature_train_arr.nnz} stored values in the training set"
+                )
 
-            test_arr = np.c_[
-                input_feature_test_arr, target_feature_test_arr
-            ]
+            # serving transforms small batches, parallel column groups only pay off here
+            preprocessor.set_params(n_jobs=None)
 
             save_object(
                 self.data_transformation_config.preprocessor_object_file_path,
@@ -258,18 +355,60 @@ class DataTransformation:
             save_object(
                 self.data_transformation_config.label_encoder_object_file_path,
                 label_encoder,
-            )            
+            )
 
-            save_numpy_array_data(
+            # inference kernel for serving, verified against the test features
+            compiled_preprocessor = compile_preprocessor(
+                preprocessor, input_feature_test_df, dtype=self._preprocessing_spec.dtype
+            )
+
+            save_object(
+                self.data_transformation_config.compiled_preprocessor_object_file_path,
+                compiled_preprocessor,
+            )
+
+            # features and target go to separate contiguous arrays, so the trainer
+            # can memory-map them instead of slicing a combined copy. Sparse
+            # features are saved as CSR .npz files next to the configured paths
+            array_dtype = self.data_transformation_config.array_dtype
+
+            transformed_train_file_path = save_numpy_array_data(
                 self.data_transformation_config.transformed_train_file_path,
-                array=train_arr,
+                array=input_feature_train_arr,
+                dtype=array_dtype,
             )
 
             save_numpy_array_data(
+                self.data_transformation_config.transformed_train_target_file_path,
+                array=target_feature_train_arr,
+                dtype=array_dtype,
+            )
+
+            transformed_test_file_path = save_numpy_array_data(
                 self.data_transformation_config.transformed_test_file_path,
-                array=test_arr,
+                array=input_feature_test_arr,
+                dtype=array_dtype,
             )
 
+            save_numpy_array_data(
+                self.data_transformation_config.transformed_test_target_file_path,
+                array=target_feature_test_arr,
+                dtype=array_dtype,
+            )
+
+            transformed_train_weight_file_path = None
+
+            if sample_weight_train_arr is not None:
+                transformed_train_weight_file_path = (
+                    self.data_transformation_config.transformed_train_weight_file_path
+                )
+
+                save_numpy_array_data(
+                    transformed_train_weight_file_path,
+                    array=sample_weight_train_arr,
+                    dtype=array_dtype,
+                )
+
             logging.info("Saved the preprocessor and label_encoder object")
 
             logging.info(
@@ -279,8 +418,13 @@ class DataTransformation:
             data_transformation_artifact = DataTransformationArtifact(
                 preprocessor_object_file_path=self.data_transformation_config.preprocessor_object_file_path,
                 label_encoder_object_file_path=self.data_transformation_config.label_encoder_object_file_path,
-                transformed_train_file_path=self.data_transformation_config.transformed_train_file_path,
-                transformed_test_file_path=self.data_transformation_config.transformed_test_file_path,
+                transformed_train_file_path=transformed_train_file_path,
+                transformed_test_file_path=transformed_test_file_path,
+                compiled_preprocessor_object_file_path=self.data_transformation_config.compiled_preprocessor_object_file_path,
+                transformed_train_target_file_path=self.data_transformation_config.transformed_train_target_file_path,
+                transformed_test_target_file_path=self.data_transformation_config.transformed_test_target_file_path,
+                transformed_train_weight_file_path=transformed_train_weight_file_path,
+                scale_pos_weight=balancer.scale_pos_weight_,
             )
 
             return data_transformation_artifact
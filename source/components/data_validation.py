@@ -6,11 +6,12 @@ import pandas as pd
 # from evidently.model_profile.sections import DataDriftProfileSection
 from pandas import DataFrame
 
-from source.constants.training_pipeline import SCHEMA_FILE_PATH
+from source.constants.training_pipeline import SCHEMA_DROP_COLS, SCHEMA_FILE_PATH
 from source.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
 from source.entity.config_entity import DataValidationConfig
 from source.exception import BackOrderException
 from source.logger import logging
+from source.data_access.feature_store import read_dataset
 from source.utils import read_yaml_file, write_yaml_file
 
 
@@ -27,7 +28,7 @@ class DataValidation:
 
     Methods:
         read_data(file_path: str) -> pd.DataFrame:
-            Read data from a CSV file.
+            Read a dataset from the feature store.
 
         validate_number_of_columns(dataframe: pd.DataFrame) -> bool:
             Validate the number of columns in the dataframe.
@@ -64,20 +65,29 @@ class DataValidation:
     @ staticmethod
     def read_data(file_path) -> pd.DataFrame:
         """
-        Read data from a CSV file.
+        Read a dataset from the feature store.
         """
         try:
-            return pd.read_csv(file_path)
+            return read_dataset(file_path)
         except Exception as e:
             raise BackOrderException(e, sys)
 
     def validate_number_of_columns(self, dataframe: DataFrame) -> bool:
         """
-        Validate the number of columns in the dataframe.
+        Validate the columns of the dataframe against the schema. The
+        drop_columns of the schema may have been left out at ingestion.
         """
 
         try:
-            status = len(dataframe.columns) == len(self._schema_config["columns"])
+            schema_columns = [list(column.keys())[0] for column in self._schema_config["columns"]]
+
+            optional_columns = set(self._schema_config[SCHEMA_DROP_COLS])
+
+            status = set(dataframe.columns) <= set(schema_columns) and all(
+                column in dataframe.columns
+                for column in schema_columns
+                if column not in optional_columns
+            )
 
             logging.info(f"Is required column present: [{status}]")
 
@@ -99,6 +109,9 @@ class DataValidation:
             missing_numerical_columns = []
 
             for column in self._schema_config["numerical"]:
+                if column in self._schema_config[SCHEMA_DROP_COLS]:
+                    continue
+
                 if column not in dataframe_columns:
                     status = False
 
@@ -124,6 +137,9 @@ class DataValidation:
             missing_categorical_columns = []
 
             for column in self._schema_config["categorical"]:
+                if column in self._schema_config[SCHEMA_DROP_COLS]:
+                    continue
+
                 if column not in dataframe_columns:
                     status = False
 
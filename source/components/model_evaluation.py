@@ -1,5 +1,7 @@
 from source.exception import BackOrderException
 from source.logger import logging
+from source.monitoring.metrics import phase_timer
+from source.monitoring.profiler import profile_step
 
 from source.entity.artifact_entity import (
     DataValidationArtifact,ModelTrainerArtifact,
@@ -11,7 +13,8 @@ from source.entity.config_entity import ModelEvaluationConfig
 import os,sys
 from source.ml.metric import calculate_metric
 from source.ml.estimator import BackOrderPredictionModel
-from source.utils import save_object,load_object,write_yaml_file
+from source.utils import save_object,load_object,write_yaml_file,get_feature_columns
+from source.data_access.feature_store import read_dataset
 from source.ml.s3_estimator import BackOrderEstimator
 from source.constants.training_pipeline import *
 import pandas  as  pd
@@ -70,7 +73,8 @@ class ModelEvaluation:
             )
 
             if back_order_estimator.is_model_present(model_path=model_path):
-                return back_order_estimator.load_model()
+                with profile_step("s3_champion_download"):
+                    return back_order_estimator.load_model()
 
             return None
 
@@ -83,7 +87,10 @@ class ModelEvaluation:
         """
 
         try:
-            test_df = pd.read_csv(self.data_validation_artifact.valid_test_file_path)
+            test_df = read_dataset(
+                self.data_validation_artifact.valid_test_file_path,
+                columns=get_feature_columns() + [TARGET_COLUMN],
+            )
 
             x, y = test_df.drop(TARGET_COLUMN, axis=1), test_df[TARGET_COLUMN]
 
@@ -96,7 +103,8 @@ class ModelEvaluation:
 
             y = label_encoder.fit_transform(y)
 
-            trained_model_score : ClassificationMetricArtifact = calculate_metric(trained_model, x, y)
+            with phase_timer("model_evaluation", "trained_model_predict"):
+                trained_model_score : ClassificationMetricArtifact = calculate_metric(trained_model, x, y)
 
             trained_model_balanced_accuracy = trained_model_score.balanced_accuracy_score
 
@@ -108,7 +116,8 @@ class ModelEvaluation:
 
             else:
 
-                best_model_score = calculate_metric(best_model, x, y)
+                with phase_timer("model_evaluation", "best_model_predict"):
+                    best_model_score = calculate_metric(best_model, x, y)
 
                 best_model_balanced_accuracy = best_model_score.balanced_accuracy_score
 
@@ -1,10 +1,13 @@
+import os
 import sys
 
 from source.entity.artifact_entity import ModelPusherArtifact, ModelTrainerArtifact
 from source.entity.config_entity import ModelPusherConfig
 from source.exception import BackOrderException
 from source.logger import logging
+from source.ml.estimator import BackOrderPredictionModel
 from source.ml.s3_estimator import BackOrderEstimator
+from source.utils import load_object, save_object
 
 
 class ModelPusher:
@@ -47,6 +50,32 @@ class ModelPusher:
             model_path=model_pusher_config.s3_model_key_path,
         )
 
+    def export_native_model(self, model: BackOrderPredictionModel) -> bool:
+        """
+        Export the trained XGBoost booster in the native UBJSON format.
+        Returns False when the trained model is not an XGBoost model.
+        """
+
+        try:
+            if not hasattr(model.trained_model_object, "get_booster"):
+                logging.info("Trained model has no native booster to export")
+
+                return False
+
+            native_model_file_path = self.model_pusher_config.native_model_file_path
+
+            os.makedirs(os.path.dirname(native_model_file_path), exist_ok=True)
+
+            # the .ubj extension makes XGBoost write UBJSON
+            model.trained_model_object.get_booster().save_model(native_model_file_path)
+
+            logging.info(f"Exported native booster to {native_model_file_path}")
+
+            return True
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
     def initiate_model_pusher(self) -> ModelPusherArtifact:
         """
         Retrieve the best model from the specified S3 bucket.
@@ -57,8 +86,35 @@ class ModelPusher:
         try:
             logging.info("Uploading artifacts folder to s3 bucket")
 
+            model = load_object(self.model_trainer_artifact.trained_model_file_path)
+
+            s3_native_model_key_path = self.model_pusher_config.s3_native_model_key_path
+
+            # the booster goes first and the model records its ETag, so a booster
+            # is only ever served with the model it was exported from
+            if self.export_native_model(model):
+                self.back_order_estimator.save_native_model(
+                    from_file=self.model_pusher_config.native_model_file_path,
+                    native_model_path=s3_native_model_key_path,
+                )
+
+                model.native_model_etag = self.back_order_estimator.get_native_model_etag(
+                    s3_native_model_key_path
+                )
+
+            else:
+                model.native_model_etag = None
+
+                # a booster left by a previous model must not be served with this one
+                if self.back_order_estimator.is_model_present(s3_native_model_key_path):
+                    self.back_order_estimator.remove_native_model(s3_native_model_key_path)
+
+                    logging.info(f"Removed stale native booster {s3_native_model_key_path}")
+
+            save_object(self.model_pusher_config.model_file_path, model)
+
             self.back_order_estimator.save_model(
-                from_file=self.model_trainer_artifact.trained_model_file_path
+                from_file=self.model_pusher_config.model_file_path
             )
 
             model_pusher_artifact = ModelPusherArtifact(
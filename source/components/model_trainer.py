@@ -1,4 +1,8 @@
 import sys
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy import sparse
 
 # from neuro_mf import ModelFactory
 
@@ -10,7 +14,9 @@ from source.entity.artifact_entity import (
 from source.entity.config_entity import ModelTrainerConfig
 from source.exception import BackOrderException
 from source.logger import logging
+from source.monitoring.profiler import profile_step
 from source.ml import metric
+from source.ml.balancing import fit_with_balancing
 from source.ml.estimator import BackOrderPredictionModel
 from source.utils import load_numpy_array_data, load_object, save_object
 from source.ml.model import TunedModel
@@ -26,6 +32,9 @@ class ModelTrainer:
         model_trainer_config (ModelTrainerConfig): Model trainer configuration.
 
     Methods:
+        load_transformed_data(file_path, target_file_path=None) -> Tuple[np.ndarray, np.ndarray]:
+            Load the transformed features and target, memory-mapped.
+
         initiate_model_trainer() -> ModelTrainerArtifact:
             Initiate the model training process and return the model trainer artifact.
 
@@ -44,6 +53,30 @@ class ModelTrainer:
 
         self.model_trainer_config = model_trainer_config
 
+    def load_transformed_data(
+        self, file_path: str, target_file_path: Optional[str] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Load the transformed features and target. They are memory-mapped with
+        the configured mmap_mode, so pages are read from disk as the model
+        touches them. Sparse features are stored as a CSR .npz file and loaded
+        whole as a CSR matrix, which the model trains on without densifying.
+        Artifacts without a target file hold the target as the last column of
+        the feature array.
+        """
+
+        if target_file_path is None:
+            arr = load_numpy_array_data(file_path=file_path)
+
+            return arr[:, :-1], arr[:, -1]
+
+        mmap_mode = self.model_trainer_config.mmap_mode
+
+        return (
+            load_numpy_array_data(file_path=file_path, mmap_mode=mmap_mode),
+            load_numpy_array_data(file_path=target_file_path, mmap_mode=mmap_mode),
+        )
+
     def initiate_model_trainer(self,) -> ModelTrainerArtifact:
         """
         Initiate the model training process and return the model trainer artifact.
@@ -52,24 +85,47 @@ class ModelTrainer:
         logging.info("Entered initiate_model_trainer method of ModelTrainer class")
 
         try:
-            train_arr = load_numpy_array_data(
-                file_path=self.data_transformation_artifact.transformed_train_file_path
-            )
-
-            test_arr = load_numpy_array_data(
-                file_path=self.data_transformation_artifact.transformed_test_file_path
+            x_train, y_train = self.load_transformed_data(
+                self.data_transformation_artifact.transformed_train_file_path,
+                self.data_transformation_artifact.transformed_train_target_file_path,
             )
 
-            x_train, y_train, x_test, y_test = (
-                train_arr[:, :-1],
-                train_arr[:, -1],
-                test_arr[:, :-1],
-                test_arr[:, -1],
+            x_test, y_test = self.load_transformed_data(
+                self.data_transformation_artifact.transformed_test_file_path,
+                self.data_transformation_artifact.transformed_test_target_file_path,
             )
 
             model= TunedModel().initiate_model()
 
-            model.fit(x_train,y_train)
+            sparse_tree_method = self.model_trainer_config.sparse_tree_method
+
+            # histogram splits only scan the stored values of sparse one-hot features,
+            # dense features keep the tree method of the model config
+            if (
+                sparse.issparse(x_train)
+                and sparse_tree_method is not None
+                and model.get_params().get("tree_method", "") is None
+            ):
+                model.set_params(tree_method=sparse_tree_method)
+
+                logging.info(f"Training on sparse features with tree_method={sparse_tree_method}")
+
+            sample_weight = None
+
+            if self.data_transformation_artifact.transformed_train_weight_file_path is not None:
+                sample_weight = load_numpy_array_data(
+                    file_path=self.data_transformation_artifact.transformed_train_weight_file_path,
+                    mmap_mode=self.model_trainer_config.mmap_mode,
+                )
+
+            with profile_step("model_fit"):
+                fit_with_balancing(
+                    model,
+                    x_train,
+                    y_train,
+                    sample_weight=sample_weight,
+                    scale_pos_weight=self.data_transformation_artifact.scale_pos_weight,
+                )
 
             model_train_metrics : ClassificationMetricArtifact  = calculate_metric(model,x_train,y_train)
 
@@ -94,10 +150,18 @@ class ModelTrainer:
                 file_path=self.data_transformation_artifact.label_encoder_object_file_path
             )
 
+            compiled_preprocessing_obj = None
+
+            if self.data_transformation_artifact.compiled_preprocessor_object_file_path is not None:
+                compiled_preprocessing_obj = load_object(
+                    file_path=self.data_transformation_artifact.compiled_preprocessor_object_file_path
+                )
+
             backOrder_prediction_model = BackOrderPredictionModel(
                 preprocessing_object=preprocessing_obj,
                 trained_model_object=model,
-                label_encoder_object= label_encoder_obj
+                label_encoder_object= label_encoder_obj,
+                compiled_preprocessing_object=compiled_preprocessing_obj,
             )
 
             logging.info(
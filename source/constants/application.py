@@ -1,3 +1,7 @@
 APP_HOST = "0.0.0.0"
 
 APP_PORT = 8080
+
+JOB_MAX_WORKERS = 2
+
+JOB_HISTORY_SIZE = 100
@@ -1,3 +1,9 @@
 DATABASE_NAME = "ineuron"
 
-COLLECTION_NAME = "back_orders"
\ No newline at end of file
+COLLECTION_NAME = "back_orders"
+
+# documents fetched per cursor round-trip and decoded together during export
+MONGO_EXPORT_BATCH_SIZE = 10_000
+
+# field values exported as missing
+MONGO_NA_VALUES = ("na",)
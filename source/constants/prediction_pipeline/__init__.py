@@ -7,3 +7,34 @@ PREDICTION_INPUT_FILE_NAME = "prediction_data.csv"
 PREDICTION_OUTPUT_FILE_NAME = "back_order__predictions.csv"
 
 MODEL_BUCKET_NAME = TRAINING_BUCKET_NAME
+
+USE_NATIVE_BOOSTER: bool = True
+
+# threads used by the native booster, 0 keeps the XGBoost default
+NATIVE_BOOSTER_NTHREAD: int = 0
+
+MODEL_CACHE_TTL_SECONDS: int = 300
+
+ONLINE_SCORING_MAX_BATCH_SIZE: int = 512
+
+ONLINE_SCORING_MAX_WAIT_MS: float = 5.0
+
+PREDICTION_STREAMING: bool = False
+
+PREDICTION_CHUNK_SIZE: int = 100_000
+
+# number of worker processes for batch prediction, -1 uses every core
+PREDICTION_N_JOBS: int = 1
+
+PREDICTION_SHARD_SIZE: int = 50_000
+
+# None, "gzip" or "zstd"
+PREDICTION_OUTPUT_COMPRESSION = None
+
+# None infers "csv" or "parquet" from the input file extension
+PREDICTION_DATA_FORMAT = None
+
+PARQUET_FILE_EXTENSION = ".parquet"
+
+# identifier columns kept in the output even though the model drops them
+PREDICTION_ID_COLUMNS = ["sku"]
@@ -1,3 +1,8 @@
 TRAINING_BUCKET_NAME = "back-order-prediction-model"
 
 PREDICTION_BUCKET_NAME = "back-order-prediction-data"
+
+# S3 requires every part except the last one to be at least 5 MiB
+S3_MULTIPART_PART_SIZE = 8 * 1024 * 1024
+
+COMPRESSION_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
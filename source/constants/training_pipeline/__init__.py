@@ -13,18 +13,25 @@ SAVED_MODEL_DIR: str = os.path.join("saved_models")
 
 # common file name
 
-FILE_NAME: str = "back_order.csv"
+FILE_NAME: str = "back_order.parquet"
 
-TRAIN_FILE_NAME: str = "train.csv"
+TRAIN_FILE_NAME: str = "train.parquet"
 
-TEST_FILE_NAME: str = "test.csv"
+TEST_FILE_NAME: str = "test.parquet"
 
 PREPROCSSING_OBJECT_FILE_NAME = "preprocessing.pkl"
 
 LABEL_ENCODER_OBJECT_FILE_NAME = "label_encoder.pkl"
 
+COMPILED_PREPROCESSING_OBJECT_FILE_NAME = "compiled_preprocessing.pkl"
+
 MODEL_FILE_NAME = "model.pkl"
 
+NATIVE_MODEL_FILE_NAME = "model.ubj"
+
+# sparse feature arrays are stored as CSR in .npz files instead of .npy
+SPARSE_ARRAY_FILE_EXTENSION = ".npz"
+
 SCHEMA_FILE_PATH = os.path.join("config", "schema.yaml")
 
 MODEL_CONFIG_FILE_PATH = os.path.join("config", "model.yaml")
@@ -33,6 +40,50 @@ PREPROCESSING_CONFIG_FILE_PATH = os.path.join("config","preprocessing.yaml")
 
 SCHEMA_DROP_COLS = "drop_columns"
 
+SCHEMA_INGESTION_FILTER = "ingestion_filter"
+
+"""
+Feature store related constant start with FEATURE_STORE VAR NAME
+"""
+FEATURE_STORE_ROWS_PER_PARTITION: int = 250_000
+
+FEATURE_STORE_COMPRESSION: str = "snappy"
+
+FEATURE_STORE_MANIFEST_FILE_NAME: str = "_dataset.json"
+
+"""
+Training run profiler related constant start with PROFILER VAR NAME
+"""
+PROFILER_DIR_NAME: str = "profile"
+
+PROFILER_REPORT_FILE_NAME: str = "run_report.json"
+
+# tracemalloc slows training down noticeably, enable it when hunting a memory regression
+PROFILER_TRACE_ALLOCATIONS: bool = False
+
+PROFILER_TOP_ALLOCATIONS: int = 10
+
+"""
+Stage cache related constant start with STAGE_CACHE VAR NAME
+"""
+# shared by all runs, entries are reused when a stage's inputs have not changed
+STAGE_CACHE_DIR: str = os.path.join(ARTIFACT_DIR, "stage_cache")
+
+STAGE_CACHE_MAX_SIZE_BYTES: int = 10 * 1024 ** 3
+
+STAGE_CACHE_ENABLED: bool = True
+
+# distributions whose version is part of every stage key, an upgrade changes fitted artifacts
+STAGE_CACHE_LIBRARIES: tuple = (
+    "scikit-learn",
+    "xgboost",
+    "numpy",
+    "scipy",
+    "pandas",
+    "imbalanced-learn",
+    "dill",
+)
+
 """
 Data Ingestion related constant start with DATA_INGESTION VAR NAME
 """
@@ -46,6 +97,31 @@ DATA_INGESTION_INGESTED_DIR: str = "ingested"
 
 DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO: float = 0.2
 
+# a fixed split keeps the ingested datasets, and so the stage cache keys, stable across runs
+DATA_INGESTION_TRAIN_TEST_SPLIT_RANDOM_STATE: int = 42
+
+# concurrent range readers of the Mongo export, 1 reads the collection with a single cursor
+DATA_INGESTION_EXPORT_PARTITIONS: int = 4
+
+# field the export is partitioned on, _id or an indexed numeric field such as sku
+DATA_INGESTION_EXPORT_PARTITION_FIELD: str = "_id"
+
+# the snapshot lives outside the timestamped artifact dir so it survives between runs
+DATA_INGESTION_SNAPSHOT_DIR: str = os.path.join(ARTIFACT_DIR, "snapshot")
+
+DATA_INGESTION_SNAPSHOT_FILE_NAME: str = "back_order.parquet"
+
+DATA_INGESTION_WATERMARK_FILE_NAME: str = "watermark.yaml"
+
+# full export by default, incremental sync needs an update timestamp maintained on every write
+DATA_INGESTION_INCREMENTAL: bool = False
+
+# update timestamp of the documents, _id is refused: it misses updates and late inserts
+DATA_INGESTION_WATERMARK_FIELD: str = "updated_at"
+
+# leave the schema drop_columns out of the Mongo projection
+DATA_INGESTION_PROJECT_SCHEMA_COLUMNS: bool = True
+
 """
 Data Validation realted contant start with DATA_VALIDATION VAR NAME
 """
@@ -70,6 +146,45 @@ DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR: str = "transformed"
 
 DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR: str = "transformed_object"
 
+# features and target are stored as separate contiguous arrays of this dtype
+DATA_TRANSFORMATION_ARRAY_DTYPE: str = "float32"
+
+DATA_TRANSFORMATION_TARGET_FILE_SUFFIX: str = "_target.npy"
+
+DATA_TRANSFORMATION_WEIGHT_FILE_SUFFIX: str = "_weight.npy"
+
+# fit the preprocessor chunk by chunk instead of on the whole training set in memory
+DATA_TRANSFORMATION_CHUNKED_FIT: bool = False
+
+DATA_TRANSFORMATION_CHUNK_ROWS: int = 250_000
+
+# rows sampled by the streaming median and winsorizing quantile sketches
+DATA_TRANSFORMATION_SKETCH_SIZE: int = 100_000
+
+# smote_tomek, smote, undersample, scale_pos_weight or none, see source.ml.balancing
+DATA_TRANSFORMATION_BALANCING_METHOD: str = "smote"
+
+# minority to majority ratio after resampling
+DATA_TRANSFORMATION_BALANCING_SAMPLING_RATIO: float = 1.0
+
+DATA_TRANSFORMATION_BALANCING_K_NEIGHBORS: int = 5
+
+DATA_TRANSFORMATION_BALANCING_N_JOBS: int = -1
+
+DATA_TRANSFORMATION_BALANCING_MAX_NEIGHBOR_CANDIDATES: int = 50_000
+
+# weight undersampled majority rows back to their original share, which restores the
+# original class prior in the loss: only set it to undersample for speed, not for balance
+DATA_TRANSFORMATION_BALANCING_REWEIGHT: bool = False
+
+# input columns the majority is undersampled within the strata of, empty for a uniform sample
+DATA_TRANSFORMATION_BALANCING_STRATIFY_ON: tuple = ("national_inv", "lead_time", "deck_risk")
+
+# quantile bins of each numeric stratification column
+DATA_TRANSFORMATION_BALANCING_STRATIFY_BINS: int = 10
+
+DATA_TRANSFORMATION_BALANCING_RANDOM_STATE: int = 42
+
 """
 MODEL TRAINER related constant start with MODEL_TRAINER var name
 """
@@ -83,6 +198,12 @@ MODEL_TRAINER_EXPECTED_SCORE: float = 0.0
 
 MODEL_TRAINER_MODEL_CONFIG_FILE_PATH: str = os.path.join("config", "model.yaml")
 
+# the transformed arrays are memory-mapped instead of read into memory
+MODEL_TRAINER_MMAP_MODE: str = "r"
+
+# tree method of XGBoost models trained on sparse features, left to the model config when dense
+MODEL_TRAINER_SPARSE_TREE_METHOD: str = "hist"
+
 
 """
 model relted constants
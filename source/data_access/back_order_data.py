@@ -1,12 +1,29 @@
 import sys
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
 from source.configuration.mongo_db_connection import MongoDBClient
-from source.constants.database import DATABASE_NAME
+from source.constants.database import (
+    DATABASE_NAME,
+    MONGO_EXPORT_BATCH_SIZE,
+    MONGO_NA_VALUES,
+)
+from source.constants.training_pipeline import (
+    SCHEMA_DROP_COLS,
+    SCHEMA_FILE_PATH,
+    SCHEMA_INGESTION_FILTER,
+    TARGET_COLUMN,
+)
 from source.exception import BackOrderException
+from source.logger import logging
+from source.utils import read_yaml_file
+
+# column of an exported increment telling whether a document matches the ingestion query
+INCREMENT_MATCH_COLUMN = "_matches_query"
 
 
 class BackOrderData:
@@ -14,35 +31,419 @@ class BackOrderData:
     This class help to export entire mongo db record as pandas dataframe
     """
 
-    def __init__(self):
+    def __init__(self, batch_size: int = MONGO_EXPORT_BATCH_SIZE):
         try:
             self.mongo_client = MongoDBClient(database_name=DATABASE_NAME)
 
+            self.batch_size = batch_size
+
+            self._schema_config = read_yaml_file(file_path=SCHEMA_FILE_PATH)
+
         except Exception as e:
             raise BackOrderException(e, sys)
 
+    @property
+    def schema_columns(self) -> Dict[str, str]:
+        """
+        Column name to schema type ("int", "float" or "object"), in schema order.
+        """
+
+        return {
+            name: column_type
+            for column in self._schema_config["columns"]
+            for name, column_type in column.items()
+        }
+
+    @property
+    def ingestion_filter(self) -> dict:
+        """
+        Optional MongoDB filter from the ingestion_filter key of the schema.
+        """
+
+        return self._schema_config.get(SCHEMA_INGESTION_FILTER) or {}
+
+    def get_export_columns(self, drop_unused: bool = True) -> Dict[str, str]:
+        """
+        Schema columns to fetch from MongoDB. With drop_unused, the drop_columns
+        of the schema are left out of the projection, so they never leave the
+        database.
+        """
+
+        if not drop_unused:
+            return self.schema_columns
+
+        drop_columns = set(self._schema_config[SCHEMA_DROP_COLS]) - {TARGET_COLUMN}
+
+        return {
+            column: column_type
+            for column, column_type in self.schema_columns.items()
+            if column not in drop_columns
+        }
+
+    def get_collection(self, collection_name: str, database_name: Optional[str] = None):
+        if database_name is None:
+            return self.mongo_client.database[collection_name]
+
+        return self.mongo_client.client[database_name][collection_name]
+
     def export_collection_as_dataframe(
-        self, collection_name: str, database_name: Optional[str] = None
+        self,
+        collection_name: str,
+        database_name: Optional[str] = None,
+        columns: Optional[Dict[str, str]] = None,
+        n_partitions: int = 1,
+        partition_field: str = "_id",
+        query: Optional[dict] = None,
     ) -> pd.DataFrame:
+        """
+        Export the collection as a DataFrame with one column per schema column,
+        or per requested column, keeping the documents matching query.
+
+        The cursor is read in batches of ``batch_size`` documents with a projection
+        on the requested columns, and every batch is decoded straight into typed
+        NumPy column buffers, with "na" mapped to NaN, so only one batch of
+        documents is held in memory at a time.
+
+        With ``n_partitions`` > 1 the collection is split into ranges of
+        ``partition_field`` (``_id``, or an indexed numeric field such as ``sku``)
+        that are read concurrently over the shared MongoDBClient connection pool.
+        Each range is read in ``partition_field`` order and the ranges are
+        concatenated in order, so the result does not depend on which reader
+        finishes first.
+        """
+
         try:
-            """
-            export entire collectin as dataframe:
-            return pd.DataFrame of collection
-            """
-            if database_name is None:
-                collection = self.mongo_client.database[collection_name]
+            collection = self.get_collection(collection_name, database_name)
+
+            columns = self.schema_columns if columns is None else columns
+
+            bounds = self.get_partition_bounds(collection, partition_field, n_partitions)
+
+            capacity = collection.estimated_document_count() // len(bounds)
+
+            if len(bounds) == 1:
+                dataframe = self._export_range(collection, columns, capacity, query=query)
 
             else:
-                collection = self.mongo_client[database_name][collection_name]
+                logging.info(
+                    f"Exporting {collection_name} collection in {len(bounds)} partitions on {partition_field}"
+                )
+
+                with ThreadPoolExecutor(
+                    max_workers=len(bounds), thread_name_prefix="mongo-export"
+                ) as executor:
+                    partitions = list(
+                        executor.map(
+                            lambda bound: self._export_range(
+                                collection,
+                                columns,
+                                capacity,
+                                query=_and_query(
+                                    query, _range_query(partition_field, *bound)
+                                ),
+                                sort_field=partition_field,
+                            ),
+                            bounds,
+                        )
+                    )
+
+                dataframe = pd.concat(partitions, ignore_index=True)
+
+            logging.info(
+                f"Exported {len(dataframe)} documents from {collection_name} collection"
+            )
+
+            return dataframe
+
+        except Exception as e:
+            raise BackOrderException(e, sys)
+
+    def get_partition_bounds(
+        self, collection, partition_field: str, n_partitions: int
+    ) -> List[Tuple[Any, Any]]:
+        """
+        Split the collection into at most n_partitions [lower, upper) ranges of
+        partition_field holding about the same number of documents. None stands
+        for an open bound. Collections smaller than one batch per partition are
+        not split.
+        """
 
-            df = pd.DataFrame(list(collection.find()))
+        n_documents = collection.estimated_document_count()
 
-            if "_id" in df.columns.to_list():
-                df = df.drop(columns=["_id"], axis=1)
+        if n_partitions <= 1 or n_documents < n_partitions * self.batch_size:
+            return [(None, None)]
 
-            df.replace({"na": np.nan}, inplace=True)
+        split_points = []
 
-            return df
+        for partition in range(1, n_partitions):
+            cursor = (
+                collection.find({}, projection={partition_field: 1})
+                .sort(partition_field, 1)
+                .skip(partition * n_documents // n_partitions)
+                .limit(1)
+            )
+
+            for document in cursor:
+                split_points.append(document[partition_field])
+
+        # repeated values of a non-unique field would give empty ranges
+        split_points = sorted(set(split_points))
+
+        return list(zip([None] + split_points, split_points + [None]))
+
+    def export_collection_increment(
+        self,
+        collection_name: str,
+        watermark_field: str = "_id",
+        watermark: Any = None,
+        database_name: Optional[str] = None,
+        columns: Optional[Dict[str, str]] = None,
+        n_partitions: int = 1,
+        partition_field: str = "_id",
+        query: Optional[dict] = None,
+    ) -> pd.DataFrame:
+        """
+        Export the documents whose watermark_field is at or after watermark,
+        or all the documents matching query when there is no watermark yet.
+        The result carries the _id and watermark_field columns next to the
+        schema columns so it can be merged into a snapshot, and a boolean
+        INCREMENT_MATCH_COLUMN telling whether each document matches query.
+
+        The bound is inclusive: a document written with the watermark value
+        after the previous export passed it is pulled again, rows read twice
+        are deduplicated on _id by the merge. Changed documents are pulled
+        whether or not they match query, so a snapshot row whose update no
+        longer matches it can be removed instead of staying stale.
+        """
+
+        try:
+            columns = dict(self.schema_columns if columns is None else columns)
+
+            columns.setdefault("_id", "object")
+
+            columns.setdefault(watermark_field, "object")
+
+            if watermark is None:
+                dataframe = self.export_collection_as_dataframe(
+                    collection_name=collection_name,
+                    database_name=database_name,
+                    columns=columns,
+                    n_partitions=n_partitions,
+                    partition_field=partition_field,
+                    query=query,
+                )
+
+                dataframe[INCREMENT_MATCH_COLUMN] = True
+
+                return dataframe
+
+            collection = self.get_collection(collection_name, database_name)
+
+            increment_query = {watermark_field: {"$gte": watermark}}
+
+            dataframe = self._export_range(
+                collection, columns, capacity=self.batch_size, query=increment_query
+            )
+
+            if not query:
+                dataframe[INCREMENT_MATCH_COLUMN] = True
+
+                return dataframe
+
+            matching_ids = {
+                document["_id"]
+                for document in collection.find(
+                    _and_query(query, increment_query), projection={"_id": 1}
+                )
+            }
+
+            dataframe[INCREMENT_MATCH_COLUMN] = dataframe["_id"].isin(matching_ids)
+
+            return dataframe
 
         except Exception as e:
             raise BackOrderException(e, sys)
+
+    def _export_range(
+        self,
+        collection,
+        columns: Dict[str, str],
+        capacity: int,
+        query: Optional[dict] = None,
+        sort_field: Optional[str] = None,
+    ) -> pd.DataFrame:
+        projection = {column: 1 for column in columns}
+
+        if "_id" not in columns:
+            projection["_id"] = 0
+
+        cursor = collection.find(
+            query or {}, projection=projection, batch_size=self.batch_size
+        )
+
+        if sort_field is not None:
+            cursor = cursor.sort(sort_field, 1)
+
+        # the capacity is a hint, the buffers grow when a range holds more documents
+        buffers = TypedColumnBuffers(columns, capacity=capacity)
+
+        while True:
+            documents = list(islice(cursor, self.batch_size))
+
+            if not documents:
+                break
+
+            buffers.append(documents)
+
+        return buffers.to_dataframe()
+
+
+def _range_query(field: str, lower: Any, upper: Any) -> dict:
+    condition = {}
+
+    if lower is not None:
+        condition["$gte"] = lower
+
+    if upper is not None:
+        condition["$lt"] = upper
+
+    return {field: condition} if condition else {}
+
+
+def _and_query(*queries: Optional[dict]) -> dict:
+    queries = [query for query in queries if query]
+
+    if len(queries) <= 1:
+        return queries[0] if queries else {}
+
+    return {"$and": queries}
+
+
+class TypedColumnBuffers:
+    """
+    Preallocated NumPy column buffers filled batch by batch from Mongo documents.
+
+    Float columns decode into float64, int columns into int64 (float64 with NaN
+    if a value is missing) and object columns into object arrays. Missing fields,
+    None and "na" become NaN. Buffers grow geometrically when more documents
+    arrive than the initial capacity.
+
+    Args:
+        columns (Dict[str, str]): Column name to schema type.
+        capacity (int): Expected number of documents.
+
+    Methods:
+        append(documents: List[dict]):
+            Decode a batch of documents into the buffers.
+
+        to_dataframe() -> DataFrame:
+            Build a DataFrame from the filled part of the buffers.
+    """
+
+    def __init__(self, columns: Dict[str, str], capacity: int = 0):
+        """
+        Initialize the TypedColumnBuffers instance.
+        """
+
+        self.columns = columns
+
+        self.n_rows = 0
+
+        self._capacity = max(int(capacity), 1)
+
+        self._buffers = {
+            column: self._allocate(column_type, self._capacity)
+            for column, column_type in columns.items()
+        }
+
+        # int columns keep a missing mask, they are only cast to float when needed
+        self._missing = {
+            column: np.zeros(self._capacity, dtype=bool)
+            for column, column_type in columns.items()
+            if column_type == "int"
+        }
+
+    @staticmethod
+    def _allocate(column_type: str, size: int) -> np.ndarray:
+        if column_type == "float":
+            return np.full(size, np.nan, dtype=np.float64)
+
+        if column_type == "int":
+            return np.zeros(size, dtype=np.int64)
+
+        return np.full(size, np.nan, dtype=object)
+
+    def _grow(self, size: int) -> None:
+        capacity = max(size, 2 * self._capacity)
+
+        for column, buffer in self._buffers.items():
+            grown = self._allocate(self.columns[column], capacity)
+
+            grown[: self.n_rows] = buffer[: self.n_rows]
+
+            self._buffers[column] = grown
+
+        for column, missing in self._missing.items():
+            grown = np.zeros(capacity, dtype=bool)
+
+            grown[: self.n_rows] = missing[: self.n_rows]
+
+            self._missing[column] = grown
+
+        self._capacity = capacity
+
+    def append(self, documents: List[dict]) -> None:
+        """
+        Decode a batch of documents into the buffers.
+        """
+
+        start, end = self.n_rows, self.n_rows + len(documents)
+
+        if end > self._capacity:
+            self._grow(end)
+
+        for column, column_type in self.columns.items():
+            values = [document.get(column) for document in documents]
+
+            if column_type == "int":
+                missing = np.fromiter(
+                    (value is None or value in MONGO_NA_VALUES for value in values),
+                    dtype=bool,
+                    count=len(values),
+                )
+
+                self._missing[column][start:end] = missing
+
+                self._buffers[column][start:end] = [
+                    0 if is_missing else value
+                    for value, is_missing in zip(values, missing)
+                ]
+
+            else:
+                self._buffers[column][start:end] = [
+                    np.nan if value is None or value in MONGO_NA_VALUES else value
+                    for value in values
+                ]
+
+        self.n_rows = end
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Build a DataFrame from the filled part of the buffers.
+        """
+
+        data = {}
+
+        for column, buffer in self._buffers.items():
+            values = buffer[: self.n_rows]
+
+            missing = self._missing.get(column)
+
+            if missing is not None and missing[: self.n_rows].any():
+                values = values.astype(np.float64)
+
+                values[missing[: self.n_rows]] = np.nan
+
+            data[column] = values
+
+        return pd.DataFrame(data, columns=list(self.columns))
@@ -0,0 +1,197 @@
+"""
+Local columnar feature store.
+
+A dataset is a directory of Parquet partitions (part-00000.parquet, ...) of at
+most FEATURE_STORE_ROWS_PER_PARTITION rows, next to a _dataset.json manifest
+holding the column schema and statistics. Readers load only the columns they
+ask for, and dtypes (float32, category) survive the round trip.
+"""
+
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+from source.constants.training_pipeline import (
+    FEATURE_STORE_COMPRESSION,
+    FEATURE_STORE_MANIFEST_FILE_NAME,
+    FEATURE_STORE_ROWS_PER_PARTITION,
+)
+from source.exception import BackOrderException
+from source.logger import logging
+from source.utils import read_csv_with_schema
+
+
+def write_dataset(
+    dataframe: pd.DataFrame,
+    dataset_path: str,
+    rows_per_partition: int = FEATURE_STORE_ROWS_PER_PARTITION,
+    compression: str = FEATURE_STORE_COMPRESSION,
+) -> dict:
+    """
+    Write a DataFrame as a partitioned Parquet dataset, replacing any dataset
+    at dataset_path, and return its manifest.
+    """
+
+    try:
+        if os.path.isdir(dataset_path):
+            shutil.rmtree(dataset_path)
+
+        os.makedirs(dataset_path, exist_ok=True)
+
+        table = pa.Table.from_pandas(dataframe, preserve_index=False)
+
+        partitions = []
+
+        # slices share the table buffers and schema, so every partition has the same schema
+        for start in range(0, max(table.num_rows, 1), rows_per_partition):
+            partition = f"part-{len(partitions):05d}.parquet"
+
+            pq.write_table(
+                table.slice(start, rows_per_partition),
+                os.path.join(dataset_path, partition),
+                compression=compression,
+            )
+
+            partitions.append(partition)
+
+        manifest = {
+            "created_at": datetime.now().isoformat(),
+            "num_rows": table.num_rows,
+            "partitions": partitions,
+            "schema": {
+                column: str(dtype) for column, dtype in dataframe.dtypes.items()
+            },
+            "statistics": {
+                column: _column_statistics(dataframe[column])
+                for column in dataframe.columns
+            },
+        }
+
+        with open(os.path.join(dataset_path, FEATURE_STORE_MANIFEST_FILE_NAME), "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+
+        logging.info(
+            f"Wrote {table.num_rows} rows in {len(partitions)} partitions to {dataset_path}"
+        )
+
+        return manifest
+
+    except Exception as e:
+        raise BackOrderException(e, sys) from e
+
+
+def read_dataset(dataset_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read a dataset, or only the given columns of it. Requested columns the
+    dataset does not have are skipped. A CSV file path is read with the
+    schema dtypes, so artifacts of older runs stay readable.
+    """
+
+    try:
+        if os.path.isfile(dataset_path):
+            return read_csv_with_schema(
+                dataset_path,
+                usecols=None if columns is None else lambda column: column in columns,
+            )
+
+        manifest = read_dataset_manifest(dataset_path)
+
+        if columns is not None:
+            columns = [column for column in columns if column in manifest["schema"]]
+
+        tables = [
+            pq.read_table(os.path.join(dataset_path, partition), columns=columns)
+            for partition in manifest["partitions"]
+        ]
+
+        return pa.concat_tables(tables).to_pandas()
+
+    except Exception as e:
+        raise BackOrderException(e, sys) from e
+
+
+def iter_dataset(
+    dataset_path: str,
+    columns: Optional[List[str]] = None,
+    batch_rows: int = FEATURE_STORE_ROWS_PER_PARTITION,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read a dataset, or only the given columns of it, as DataFrames of at most
+    batch_rows rows, so datasets larger than memory can be streamed.
+    """
+
+    try:
+        if os.path.isfile(dataset_path):
+            yield from read_csv_with_schema(
+                dataset_path,
+                usecols=None if columns is None else lambda column: column in columns,
+                chunksize=batch_rows,
+            )
+
+            return
+
+        manifest = read_dataset_manifest(dataset_path)
+
+        if columns is not None:
+            columns = [column for column in columns if column in manifest["schema"]]
+
+        for partition in manifest["partitions"]:
+            parquet_file = pq.ParquetFile(os.path.join(dataset_path, partition))
+
+            for batch in parquet_file.iter_batches(batch_size=batch_rows, columns=columns):
+                # a table carries the pandas metadata, so category dtypes are restored
+                yield pa.Table.from_batches([batch]).to_pandas()
+
+    except Exception as e:
+        raise BackOrderException(e, sys) from e
+
+
+def read_dataset_manifest(dataset_path: str) -> dict:
+    """
+    Read the manifest of a dataset: row count, partitions, schema and column statistics.
+    """
+
+    try:
+        with open(os.path.join(dataset_path, FEATURE_STORE_MANIFEST_FILE_NAME)) as manifest_file:
+            return json.load(manifest_file)
+
+    except Exception as e:
+        raise BackOrderException(e, sys) from e
+
+
+def dataset_exists(dataset_path: str) -> bool:
+    """
+    Whether a complete dataset, or a CSV file, is stored at dataset_path.
+    The manifest is written last, so a partially written dataset does not count.
+    """
+
+    return os.path.isfile(dataset_path) or os.path.isfile(
+        os.path.join(dataset_path, FEATURE_STORE_MANIFEST_FILE_NAME)
+    )
+
+
+def _column_statistics(series: pd.Series) -> dict:
+    statistics = {"null_count": int(series.isna().sum())}
+
+    if is_numeric_dtype(series) and not is_bool_dtype(series):
+        for name, value in (
+            ("min", series.min()),
+            ("max", series.max()),
+            ("mean", series.mean()),
+        ):
+            statistics[name] = None if pd.isna(value) else float(value)
+
+    else:
+        statistics["value_counts"] = {
+            str(value): int(count) for value, count in series.value_counts().items()
+        }
+
+    return statistics
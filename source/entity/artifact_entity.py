@@ -31,6 +31,16 @@ class DataTransformationArtifact:
 
     transformed_test_file_path: str
 
+    compiled_preprocessor_object_file_path: str = None
+
+    transformed_train_target_file_path: str = None
+
+    transformed_test_target_file_path: str = None
+
+    transformed_train_weight_file_path: str = None
+
+    scale_pos_weight: float = None
+
 @dataclass
 class ClassificationMetricArtifact:
     f1_score: float
@@ -1,8 +1,10 @@
 import os
 from dataclasses import dataclass
 from datetime import datetime
+from typing import Optional
 
 from source.constants import prediction_pipeline
+from source.constants.s3_bucket import COMPRESSION_EXTENSIONS
 from source.constants.training_pipeline import *
 # from sensor.entity.artifact_entity import ClassificationMetricArtifact
 
@@ -21,6 +23,28 @@ class TrainingPipelineConfig:
 training_pipeline_config: TrainingPipelineConfig = TrainingPipelineConfig()
 
 
+@dataclass
+class ProfilerConfig:
+    report_file_path: str = os.path.join(
+        training_pipeline_config.artifact_dir,
+        PROFILER_DIR_NAME,
+        PROFILER_REPORT_FILE_NAME,
+    )
+
+    trace_allocations: bool = PROFILER_TRACE_ALLOCATIONS
+
+    top_allocations: int = PROFILER_TOP_ALLOCATIONS
+
+
+@dataclass
+class StageCacheConfig:
+    cache_dir: str = STAGE_CACHE_DIR
+
+    max_size_bytes: int = STAGE_CACHE_MAX_SIZE_BYTES
+
+    enabled: bool = STAGE_CACHE_ENABLED
+
+
 @dataclass
 class DataIngestionConfig:
    
@@ -44,8 +68,28 @@ class DataIngestionConfig:
 
     train_test_split_ratio: float = DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO
 
+    train_test_split_random_state: Optional[int] = DATA_INGESTION_TRAIN_TEST_SPLIT_RANDOM_STATE
+
     collection_name: str = DATA_INGESTION_COLLECTION_NAME
 
+    export_partitions: int = DATA_INGESTION_EXPORT_PARTITIONS
+
+    export_partition_field: str = DATA_INGESTION_EXPORT_PARTITION_FIELD
+
+    project_schema_columns: bool = DATA_INGESTION_PROJECT_SCHEMA_COLUMNS
+
+    incremental: bool = DATA_INGESTION_INCREMENTAL
+
+    watermark_field: str = DATA_INGESTION_WATERMARK_FIELD
+
+    snapshot_file_path: str = os.path.join(
+        DATA_INGESTION_SNAPSHOT_DIR, DATA_INGESTION_SNAPSHOT_FILE_NAME
+    )
+
+    watermark_file_path: str = os.path.join(
+        DATA_INGESTION_SNAPSHOT_DIR, DATA_INGESTION_WATERMARK_FILE_NAME
+    )
+
 
 @dataclass
 class DataValidationConfig:
@@ -82,15 +126,61 @@ class DataTransformationConfig:
     transformed_train_file_path: str = os.path.join(
         data_transformation_dir,
         DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
-        TRAIN_FILE_NAME.replace("csv", "npy"),
+        os.path.splitext(TRAIN_FILE_NAME)[0] + ".npy",
     )
 
     transformed_test_file_path: str = os.path.join(
         data_transformation_dir,
         DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
-        TEST_FILE_NAME.replace("csv", "npy"),
+        os.path.splitext(TEST_FILE_NAME)[0] + ".npy",
+    )
+
+    transformed_train_target_file_path: str = os.path.join(
+        data_transformation_dir,
+        DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+        os.path.splitext(TRAIN_FILE_NAME)[0] + DATA_TRANSFORMATION_TARGET_FILE_SUFFIX,
     )
 
+    transformed_test_target_file_path: str = os.path.join(
+        data_transformation_dir,
+        DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+        os.path.splitext(TEST_FILE_NAME)[0] + DATA_TRANSFORMATION_TARGET_FILE_SUFFIX,
+    )
+
+    transformed_train_weight_file_path: str = os.path.join(
+        data_transformation_dir,
+        DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+        os.path.splitext(TRAIN_FILE_NAME)[0] + DATA_TRANSFORMATION_WEIGHT_FILE_SUFFIX,
+    )
+
+    preprocessing_config_file_path: str = PREPROCESSING_CONFIG_FILE_PATH
+
+    array_dtype: str = DATA_TRANSFORMATION_ARRAY_DTYPE
+
+    chunked_fit: bool = DATA_TRANSFORMATION_CHUNKED_FIT
+
+    chunk_rows: int = DATA_TRANSFORMATION_CHUNK_ROWS
+
+    sketch_size: int = DATA_TRANSFORMATION_SKETCH_SIZE
+
+    balancing_method: str = DATA_TRANSFORMATION_BALANCING_METHOD
+
+    balancing_sampling_ratio: float = DATA_TRANSFORMATION_BALANCING_SAMPLING_RATIO
+
+    balancing_k_neighbors: int = DATA_TRANSFORMATION_BALANCING_K_NEIGHBORS
+
+    balancing_n_jobs: int = DATA_TRANSFORMATION_BALANCING_N_JOBS
+
+    balancing_max_neighbor_candidates: int = DATA_TRANSFORMATION_BALANCING_MAX_NEIGHBOR_CANDIDATES
+
+    balancing_reweight: bool = DATA_TRANSFORMATION_BALANCING_REWEIGHT
+
+    balancing_stratify_on: tuple = DATA_TRANSFORMATION_BALANCING_STRATIFY_ON
+
+    balancing_stratify_bins: int = DATA_TRANSFORMATION_BALANCING_STRATIFY_BINS
+
+    balancing_random_state: Optional[int] = DATA_TRANSFORMATION_BALANCING_RANDOM_STATE
+
     preprocessor_object_file_path: str = os.path.join(
         data_transformation_dir,
         DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,
@@ -103,6 +193,12 @@ class DataTransformationConfig:
         LABEL_ENCODER_OBJECT_FILE_NAME,
     )
 
+    compiled_preprocessor_object_file_path: str = os.path.join(
+        data_transformation_dir,
+        DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,
+        COMPILED_PREPROCESSING_OBJECT_FILE_NAME,
+    )
+
 @dataclass
 class ModelTrainerConfig:
     model_trainer_dir: str = os.path.join(
@@ -115,7 +211,11 @@ class ModelTrainerConfig:
 
     expected_accuracy: float = MODEL_TRAINER_EXPECTED_SCORE
 
-    model_config_file_path: str = MODEL_TRAINER_MODEL_CONFIG_FILE_PATH  
+    model_config_file_path: str = MODEL_TRAINER_MODEL_CONFIG_FILE_PATH
+
+    mmap_mode: Optional[str] = MODEL_TRAINER_MMAP_MODE
+
+    sparse_tree_method: Optional[str] = MODEL_TRAINER_SPARSE_TREE_METHOD
 
 @dataclass
 class ModelEvaluationConfig:
@@ -134,6 +234,23 @@ class ModelPusherConfig:
 
     s3_model_key_path: str = os.path.join(MODEL_PUSHER_S3_KEY, MODEL_FILE_NAME)
 
+    s3_native_model_key_path: str = os.path.join(
+        MODEL_PUSHER_S3_KEY, NATIVE_MODEL_FILE_NAME
+    )
+
+    native_model_file_path: str = os.path.join(
+        training_pipeline_config.artifact_dir,
+        MODEL_PUSHER_DIR_NAME,
+        NATIVE_MODEL_FILE_NAME,
+    )
+
+    # the pushed model, recording the ETag of the native booster pushed with it
+    model_file_path: str = os.path.join(
+        training_pipeline_config.artifact_dir,
+        MODEL_PUSHER_DIR_NAME,
+        MODEL_FILE_NAME,
+    )
+
 @dataclass
 class PredictionPipelineConfig:
     data_bucket_name: str = prediction_pipeline.PREDICTION_DATA_BUCKET
@@ -142,9 +259,56 @@ class PredictionPipelineConfig:
 
     model_file_path: str = os.path.join(MODEL_PUSHER_S3_KEY, MODEL_FILE_NAME)
 
+    native_model_file_path: str = os.path.join(MODEL_PUSHER_S3_KEY, NATIVE_MODEL_FILE_NAME)
+
+    use_native_booster: bool = prediction_pipeline.USE_NATIVE_BOOSTER
+
+    native_booster_nthread: int = prediction_pipeline.NATIVE_BOOSTER_NTHREAD
+
     model_bucket_name: str = prediction_pipeline.MODEL_BUCKET_NAME
 
     output_file_name: str = prediction_pipeline.PREDICTION_OUTPUT_FILE_NAME
 
+    model_cache_ttl_seconds: int = prediction_pipeline.MODEL_CACHE_TTL_SECONDS
+
+    online_max_batch_size: int = prediction_pipeline.ONLINE_SCORING_MAX_BATCH_SIZE
+
+    online_max_wait_ms: float = prediction_pipeline.ONLINE_SCORING_MAX_WAIT_MS
+
+    streaming: bool = prediction_pipeline.PREDICTION_STREAMING
+
+    chunk_size: int = prediction_pipeline.PREDICTION_CHUNK_SIZE
+
+    n_jobs: int = prediction_pipeline.PREDICTION_N_JOBS
+
+    shard_size: int = prediction_pipeline.PREDICTION_SHARD_SIZE
+
+    output_compression: Optional[str] = prediction_pipeline.PREDICTION_OUTPUT_COMPRESSION
+
+    data_format: Optional[str] = prediction_pipeline.PREDICTION_DATA_FORMAT
+
+    @property
+    def file_format(self) -> str:
+        if self.data_format is not None:
+            return self.data_format
+
+        if self.data_file_path.endswith(prediction_pipeline.PARQUET_FILE_EXTENSION):
+            return "parquet"
+
+        return "csv"
+
+    @property
+    def output_key(self) -> str:
+        if self.file_format == "parquet":
+            return (
+                os.path.splitext(self.output_file_name)[0]
+                + prediction_pipeline.PARQUET_FILE_EXTENSION
+            )
+
+        if self.output_compression is None:
+            return self.output_file_name
+
+        return self.output_file_name + COMPRESSION_EXTENSIONS[self.output_compression]
+
 
 
@@ -0,0 +1,517 @@
+import os
+import sys
+import time
+from dataclasses import asdict
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from imblearn.combine import SMOTETomek
+from scipy import sparse
+from sklearn.neighbors import NearestNeighbors
+
+from source.exception import BackOrderException
+from source.logger import logging
+from source.ml.metric import calculate_metric
+
+BALANCING_METHODS = ("smote_tomek", "smote", "undersample", "scale_pos_weight", "none")
+
+
+class ClassBalancer:
+    """
+    Configurable class balancing of the transformed training set, a dense
+    array or a CSR matrix, which every method keeps sparse.
+
+    Balancing methods:
+        - "smote_tomek": imblearn SMOTETomek, exact neighbour search over the
+          whole training set for the Tomek links.
+        - "smote": SMOTE with the neighbour search restricted to at most
+          ``max_neighbor_candidates`` sampled minority rows and run on
+          ``n_jobs`` cores, no Tomek cleaning.
+        - "undersample": keep every minority row and a sample of the majority
+          rows. With ``stratify_on`` the majority is sampled proportionally
+          within strata, the combinations of the bins of those columns: up to
+          ``n_bins`` quantile bins of a numeric column, or its values when it
+          has that few, such as a one-hot column. The kept majority rows are
+          then weighted by the inverse sampling rate of their stratum,
+          normalized to a mean of 1 so the class balance holds. Without
+          ``stratify_on`` the sample is uniform and unweighted. ``reweight``
+          weights the majority back to its original share of the loss instead,
+          which undoes the rebalancing: it only makes the fit cheaper while
+          keeping the original class prior.
+        - "scale_pos_weight": no resampling, the estimator weighs positives by
+          the negative to positive ratio.
+        - "none": leave the training set as it is.
+
+    A dense training set memory-mapped from disk, as the chunked fit of the
+    preprocessor leaves it, stays out of memory when fit_resample is given a
+    file_path: "smote" and "undersample" write their output there
+    ``chunk_rows`` rows at a time and return it memory-mapped. Only the
+    minority rows are read whole. "smote_tomek" always loads the whole set.
+
+    Args:
+        method (str): One of BALANCING_METHODS.
+        sampling_ratio (float): Minority to majority ratio after resampling.
+        k_neighbors (int): Neighbours interpolated between by SMOTE.
+        n_jobs (int): Cores of the neighbour searches, -1 for all.
+        max_neighbor_candidates (int): Minority rows the SMOTE neighbour index is built on.
+        reweight (bool): Weight undersampled majority rows back to their original
+            share, off by default since it cancels the rebalancing.
+        stratify_on (Optional[Sequence[int]]): Columns of X the majority is
+            undersampled within the strata of, see stratify_column_indices.
+        n_bins (int): Quantile bins of each numeric stratification column.
+        random_state (Optional[int]): Seed of the sampling.
+        chunk_rows (int): Rows written at a time when the output goes to a file.
+
+    Methods:
+        fit_resample(X, y, file_path) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+            Balance X, y and return them with optional sample weights.
+
+    Attributes:
+        scale_pos_weight_ (Optional[float]): Positive class weight for the estimator,
+            set by the "scale_pos_weight" method.
+    """
+
+    def __init__(
+        self,
+        method: str = "smote_tomek",
+        sampling_ratio: float = 1.0,
+        k_neighbors: int = 5,
+        n_jobs: int = -1,
+        max_neighbor_candidates: int = 50_000,
+        reweight: bool = False,
+        random_state: Optional[int] = None,
+        chunk_rows: int = 100_000,
+        stratify_on: Optional[Sequence[int]] = None,
+        n_bins: int = 10,
+    ):
+        """
+        Initialize the ClassBalancer instance.
+        """
+
+        if method not in BALANCING_METHODS:
+            raise ValueError(
+                f"Unknown balancing method {method!r}, expected one of {BALANCING_METHODS}"
+            )
+
+        self.method = method
+
+        self.sampling_ratio = sampling_ratio
+
+        self.k_neighbors = k_neighbors
+
+        self.n_jobs = n_jobs
+
+        self.max_neighbor_candidates = max_neighbor_candidates
+
+        self.reweight = reweight
+
+        self.random_state = random_state
+
+        self.chunk_rows = chunk_rows
+
+        self.stratify_on = stratify_on
+
+        self.n_bins = n_bins
+
+        self.scale_pos_weight_: Optional[float] = None
+
+    def fit_resample(
+        self, X: np.ndarray, y: np.ndarray, file_path: Optional[str] = None
+    ) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+        """
+        Balance X, y and return the resampled X, y and the sample weights,
+        None when every row weighs the same. When file_path is set, a resampled
+        dense X is written to it as a .npy file and returned memory-mapped.
+        file_path may be the file X is mapped from, it is replaced once written.
+        """
+
+        logging.info(f"Entered fit_resample method of ClassBalancer class ({self.method})")
+
+        try:
+            self.scale_pos_weight_ = None
+
+            rng = np.random.default_rng(self.random_state)
+
+            if self.method == "smote_tomek":
+                if isinstance(X, np.memmap):
+                    logging.info(
+                        "smote_tomek reads the whole memory-mapped training set into memory, "
+                        "use smote, undersample or scale_pos_weight to keep it on disk"
+                    )
+
+                smt = SMOTETomek(
+                    sampling_strategy="minority" if self.sampling_ratio == 1.0 else self.sampling_ratio,
+                    random_state=self.random_state,
+                )
+
+                X, y = smt.fit_resample(X, y)
+
+                weights = None
+
+            elif self.method == "smote":
+                X, y, weights = self._smote(X, y, rng, file_path)
+
+            elif self.method == "undersample":
+                X, y, weights = self._undersample(X, y, rng, file_path)
+
+            else:
+                if self.method == "scale_pos_weight":
+                    n_positive = int(np.sum(y == 1))
+
+                    self.scale_pos_weight_ = float(len(y) - n_positive) / max(n_positive, 1)
+
+                weights = None
+
+            logging.info(
+                f"Exited fit_resample method of ClassBalancer class with {len(y)} rows"
+            )
+
+            return X, y, weights
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def _smote(
+        self, X: np.ndarray, y: np.ndarray, rng: np.random.Generator,
+        file_path: Optional[str] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, None]:
+        minority = X[y == 1]
+
+        n_minority = minority.shape[0]
+
+        n_majority = len(y) - n_minority
+
+        n_synthetic = int(self.sampling_ratio * n_majority) - n_minority
+
+        if n_synthetic <= 0 or n_minority < 2:
+            return X, y, None
+
+        # neighbours come from a bounded sample of the minority, so the index stays small
+        if n_minority > self.max_neighbor_candidates:
+            candidates = minority[
+                rng.choice(n_minority, self.max_neighbor_candidates, replace=False)
+            ]
+
+        else:
+            candidates = minority
+
+        n_neighbors = min(self.k_neighbors + 1, candidates.shape[0])
+
+        neighbors = (
+            NearestNeighbors(n_neighbors=n_neighbors, n_jobs=self.n_jobs)
+            .fit(candidates)
+            .kneighbors(minority, return_distance=False)
+        )
+
+        base = rng.integers(n_minority, size=n_synthetic)
+
+        # column 0 is the row itself when it is among the candidates
+        neighbor = neighbors[base, rng.integers(1, n_neighbors, size=n_synthetic)]
+
+        gap = rng.random((n_synthetic, 1), dtype=np.float64).astype(X.dtype, copy=False)
+
+        def synthesize(rows: slice):
+            synthetic = minority[base[rows]]
+
+            if sparse.issparse(X):
+                # one-hot columns stay sparse, the interpolation only touches stored values
+                return synthetic + sparse.diags(gap[rows].ravel()) @ (
+                    candidates[neighbor[rows]] - synthetic
+                )
+
+            synthetic += gap[rows] * (candidates[neighbor[rows]] - synthetic)
+
+            return synthetic
+
+        if sparse.issparse(X):
+            X = sparse.vstack([X, synthesize(slice(None))], format="csr")
+
+        elif file_path is not None:
+            X = _write_rows(
+                file_path,
+                chain(
+                    self._row_blocks(X, np.arange(X.shape[0])),
+                    (
+                        synthesize(slice(start, start + self.chunk_rows))
+                        for start in range(0, n_synthetic, self.chunk_rows)
+                    ),
+                ),
+                shape=(X.shape[0] + n_synthetic, X.shape[1]),
+                dtype=X.dtype,
+            )
+
+        else:
+            X = np.concatenate([X, synthesize(slice(None))])
+
+        y = np.concatenate([y, np.ones(n_synthetic, dtype=y.dtype)])
+
+        return X, y, None
+
+    def _undersample(
+        self, X: np.ndarray, y: np.ndarray, rng: np.random.Generator,
+        file_path: Optional[str] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+        majority_index = np.flatnonzero(y != 1)
+
+        n_minority = len(y) - len(majority_index)
+
+        n_keep = min(int(n_minority / self.sampling_ratio), len(majority_index))
+
+        if n_keep >= len(majority_index):
+            return X, y, None
+
+        majority_weights = None
+
+        if self.stratify_on:
+            sampled, majority_weights = self._stratified_sample(
+                X, majority_index, n_keep, rng
+            )
+
+        else:
+            sampled = rng.choice(majority_index, n_keep, replace=False)
+
+        kept = np.sort(np.concatenate([np.flatnonzero(y == 1), sampled]))
+
+        if file_path is not None and not sparse.issparse(X):
+            X = _write_rows(
+                file_path,
+                self._row_blocks(X, kept),
+                shape=(len(kept), X.shape[1]),
+                dtype=X.dtype,
+            )
+
+        else:
+            X = X[kept]
+
+        y = y[kept]
+
+        if majority_weights is None and not self.reweight:
+            return X, y, None
+
+        weights = np.ones(len(y), dtype=np.float32)
+
+        if majority_weights is None:
+            weights[y != 1] = len(majority_index) / max(n_keep, 1)
+
+        else:
+            # kept is sorted, so the majority rows come in the order of sampled sorted
+            majority_weights = majority_weights[np.argsort(sampled, kind="stable")]
+
+            # inverse sampling rates sum to the majority size, the original share
+            scale = 1.0 if self.reweight else n_keep / majority_weights.sum()
+
+            weights[y != 1] = majority_weights * scale
+
+        return X, y, weights
+
+    def _stratified_sample(
+        self, X: np.ndarray, majority_index: np.ndarray, n_keep: int,
+        rng: np.random.Generator,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # n_keep majority rows allocated to strata in proportion to their size,
+        # and the inverse sampling rate of the stratum of each sampled row
+        columns = X[:, list(self.stratify_on)]
+
+        columns = columns.toarray() if sparse.issparse(columns) else np.asarray(columns)
+
+        codes = np.column_stack(
+            [_bin_codes(column, self.n_bins) for column in columns[majority_index].T]
+        )
+
+        stratum = np.unique(codes, axis=0, return_inverse=True)[1].ravel()
+
+        sizes = np.bincount(stratum)
+
+        quota = n_keep * sizes / len(majority_index)
+
+        keep = np.floor(quota).astype(np.int64)
+
+        # the rows left by rounding down go to the largest remainders
+        keep[np.argsort(keep - quota, kind="stable")[: n_keep - keep.sum()]] += 1
+
+        # a random order of the rows, grouped by stratum, keeps the first keep rows of each
+        order = rng.permutation(len(majority_index))
+
+        order = order[np.argsort(stratum[order], kind="stable")]
+
+        rank = np.arange(len(order)) - (np.cumsum(sizes) - sizes)[stratum[order]]
+
+        selected = order[rank < keep[stratum[order]]]
+
+        logging.info(
+            f"Undersampled the majority within {len(sizes)} strata of columns {list(self.stratify_on)}"
+        )
+
+        return (
+            majority_index[selected],
+            (sizes / np.maximum(keep, 1))[stratum[selected]].astype(np.float32),
+        )
+
+    def _row_blocks(self, X: np.ndarray, rows: np.ndarray) -> Iterable[np.ndarray]:
+        # the given rows of X, chunk_rows at a time
+        for start in range(0, len(rows), self.chunk_rows):
+            yield X[rows[start : start + self.chunk_rows]]
+
+
+def _bin_codes(values: np.ndarray, n_bins: int) -> np.ndarray:
+    # the values themselves when there are at most n_bins of them, quantile bins otherwise
+    uniques = np.unique(values)
+
+    if len(uniques) <= n_bins:
+        return np.searchsorted(uniques, values)
+
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1]))
+
+    return np.searchsorted(edges, values, side="right")
+
+
+def stratify_column_indices(
+    feature_names: Sequence[str], columns: Sequence[str], input_columns: Sequence[str]
+) -> List[int]:
+    """
+    Indices of the transformed features coming from the given input columns,
+    with feature_names from ColumnTransformer.get_feature_names_out and
+    input_columns from its feature_names_in_: the feature "<group>__<column>"
+    of a numeric column, or the one-hot features "<group>__<column>_<category>"
+    of a categorical one.
+    """
+
+    names = [str(name).split("__", 1)[-1] for name in feature_names]
+
+    def comes_from(name: str, column: str) -> bool:
+        return name == column or name.startswith(f"{column}_")
+
+    indices = []
+
+    for column in columns:
+        # the longest input column a feature name starts with is the one it comes from
+        matches = [
+            index
+            for index, name in enumerate(names)
+            if comes_from(name, column)
+            and not any(
+                len(other) > len(column) and comes_from(name, other)
+                for other in input_columns
+            )
+        ]
+
+        if not matches:
+            raise ValueError(f"No transformed feature comes from stratification column {column!r}")
+
+        indices.extend(matches)
+
+    return sorted(set(indices))
+
+
+def _write_rows(
+    file_path: str, blocks: Iterable[np.ndarray], shape: Tuple[int, int], dtype
+) -> np.memmap:
+    """
+    Write blocks of rows to a .npy file of the given shape and return it
+    memory-mapped read-only. The file is written next to file_path and renamed
+    over it, so file_path can be the file the blocks are read from.
+    """
+
+    tmp_file_path = f"{file_path}.tmp"
+
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+
+    out = np.lib.format.open_memmap(tmp_file_path, mode="w+", dtype=dtype, shape=shape)
+
+    start = 0
+
+    for block in blocks:
+        out[start : start + block.shape[0]] = block
+
+        start += block.shape[0]
+
+    if start != shape[0]:
+        raise ValueError(f"Expected {shape[0]} rows, the blocks held {start}")
+
+    out.flush()
+
+    del out
+
+    os.replace(tmp_file_path, file_path)
+
+    logging.info(f"Wrote {shape[0]} resampled rows to {file_path}")
+
+    return np.load(file_path, mmap_mode="r")
+
+
+def fit_with_balancing(
+    model, X: np.ndarray, y: np.ndarray, sample_weight: Optional[np.ndarray] = None,
+    scale_pos_weight: Optional[float] = None,
+):
+    """
+    Fit model with the output of a ClassBalancer. scale_pos_weight is set on
+    estimators that take it, such as XGBoost, and folded into the sample
+    weights of the positive rows otherwise.
+    """
+
+    if scale_pos_weight is not None:
+        if "scale_pos_weight" in model.get_params():
+            model.set_params(scale_pos_weight=scale_pos_weight)
+
+        else:
+            sample_weight = (
+                np.ones(len(y), dtype=np.float32) if sample_weight is None
+                else np.array(sample_weight, dtype=np.float32)
+            )
+
+            sample_weight[np.asarray(y) == 1] *= scale_pos_weight
+
+    if sample_weight is None:
+        return model.fit(X, y)
+
+    return model.fit(X, y, sample_weight=sample_weight)
+
+
+def benchmark_balancers(
+    make_model,
+    X_train: np.ndarray,
+    y_train: np.ndarray,
+    X_test: np.ndarray,
+    y_test: np.ndarray,
+    methods: Tuple[str, ...] = BALANCING_METHODS,
+    **balancer_params,
+) -> List[Dict[str, object]]:
+    """
+    Balance the training set with every method, fit a fresh make_model() on
+    it and score it on the untouched test set. Returns one row per method
+    with the resampling and fit times, the row count and the test metrics.
+    """
+
+    results = []
+
+    for method in methods:
+        balancer = ClassBalancer(method=method, **balancer_params)
+
+        start = time.perf_counter()
+
+        X, y, weights = balancer.fit_resample(X_train, y_train)
+
+        balance_time = time.perf_counter() - start
+
+        model = make_model()
+
+        start = time.perf_counter()
+
+        fit_with_balancing(model, X, y, weights, balancer.scale_pos_weight_)
+
+        fit_time = time.perf_counter() - start
+
+        results.append(
+            {
+                "method": method,
+                "train_rows": len(y),
+                "balance_time_s": balance_time,
+                "fit_time_s": fit_time,
+                **asdict(calculate_metric(model, X_test, y_test)),
+            }
+        )
+
+        logging.info(f"Balancing benchmark: {results[-1]}")
+
+    return results
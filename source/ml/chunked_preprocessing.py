@@ -0,0 +1,427 @@
+"""
+Out-of-core fitting and transformation of the training ColumnTransformer.
+
+The preprocessor is fitted from a re-readable stream of DataFrame chunks
+instead of one in-memory DataFrame. Each step of each column pipeline is
+fitted in its own pass over the chunks, on the output of the steps before it:
+StandardScaler and Winsorizer through partial_fit, SimpleImputer medians
+through a QuantileSketch and most frequent values through running counters,
+and OneHotEncoder categories through a running union taken before anything
+else is fitted, with the infrequent categories of high-cardinality columns
+settled from counts over every chunk. The result is an ordinary fitted
+ColumnTransformer with the same columns as one fitted in memory, so it pickles,
+serves and compiles like one.
+"""
+
+import numbers
+import os
+import sys
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+from source.exception import BackOrderException
+from source.logger import logging
+from source.ml.pre_processing import QuantileSketch, Winsorizer
+
+# make_chunks(columns) returns a fresh iterable of DataFrame chunks holding the given columns
+ChunkSource = Callable[[Optional[List[str]]], Iterable[pd.DataFrame]]
+
+
+def fit_preprocessor_in_chunks(
+    preprocessor: ColumnTransformer,
+    make_chunks: ChunkSource,
+    sketch_size: int = 100_000,
+    random_state: Optional[int] = None,
+) -> ColumnTransformer:
+    """
+    Fit an unfitted ColumnTransformer of column pipelines from chunks and return it.
+    """
+
+    logging.info("Entered fit_preprocessor_in_chunks method")
+
+    try:
+        _set_category_union(preprocessor, make_chunks)
+
+        # the first chunk fixes the structure: column order, output widths, sparsity
+        first_chunk = next(iter(make_chunks(None)))
+
+        preprocessor.fit(first_chunk)
+
+        for name, transformer, columns in preprocessor.transformers_:
+            if not isinstance(transformer, Pipeline):
+                continue
+
+            for index, (step_name, step) in enumerate(transformer.steps):
+                fitted = _fit_step_in_chunks(
+                    step,
+                    transformer[:index] if index else None,
+                    lambda: make_chunks(list(columns)),
+                    list(columns),
+                    sketch_size,
+                    random_state,
+                )
+
+                transformer.steps[index] = (step_name, fitted)
+
+                logging.info(f"Fitted {name}/{step_name} in chunks")
+
+        _set_output_indices(preprocessor, first_chunk)
+
+        logging.info("Exited fit_preprocessor_in_chunks method")
+
+        return preprocessor
+
+    except Exception as e:
+        raise BackOrderException(e, sys) from e
+
+
+def transform_in_chunks(
+    preprocessor: ColumnTransformer,
+    chunks: Iterable[pd.DataFrame],
+    n_rows: int,
+    file_path: str,
+    dtype=np.float32,
+) -> Union[np.memmap, sparse.csr_matrix]:
+    """
+    Transform chunks with a fitted preprocessor straight into a .npy file of
+    n_rows rows and return it memory-mapped read-only. Sparse output is kept
+    sparse instead: the CSR chunks are stacked into one CSR matrix in memory,
+    which holds only the stored values, and nothing is written to file_path.
+    """
+
+    try:
+        out = None
+
+        sparse_chunks: List[sparse.csr_matrix] = []
+
+        start = 0
+
+        for chunk in chunks:
+            transformed = preprocessor.transform(chunk)
+
+            if sparse.issparse(transformed):
+                sparse_chunks.append(transformed.tocsr().astype(dtype, copy=False))
+
+                start += transformed.shape[0]
+
+                continue
+
+            if out is None:
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+                out = np.lib.format.open_memmap(
+                    file_path, mode="w+", dtype=dtype, shape=(n_rows, transformed.shape[1])
+                )
+
+            out[start : start + len(transformed)] = transformed
+
+            start += len(transformed)
+
+        if start != n_rows:
+            raise ValueError(f"Expected {n_rows} rows, the chunks held {start}")
+
+        if sparse_chunks:
+            transformed = sparse.vstack(sparse_chunks, format="csr")
+
+            logging.info(
+                f"Transformed {n_rows} rows in chunks into a sparse matrix of {transformed.nnz} values"
+            )
+
+            return transformed
+
+        out.flush()
+
+        del out
+
+        logging.info(f"Transformed {n_rows} rows in chunks into {file_path}")
+
+        return np.load(file_path, mmap_mode="r")
+
+    except Exception as e:
+        raise BackOrderException(e, sys) from e
+
+
+def _set_category_union(preprocessor: ColumnTransformer, make_chunks: ChunkSource) -> None:
+    # one-hot categories are the union of the values seen in every chunk
+    encoders = [
+        (step, list(columns), _missing_category(transformer[:index]))
+        for _, transformer, columns in preprocessor.transformers
+        if isinstance(transformer, Pipeline)
+        for index, (_, step) in enumerate(transformer.steps)
+        if isinstance(step, OneHotEncoder) and step.categories == "auto"
+    ]
+
+    if not encoders:
+        return
+
+    columns = [column for _, encoder_columns, _ in encoders for column in encoder_columns]
+
+    values: Dict[str, set] = {column: set() for column in columns}
+
+    missing: Dict[str, bool] = {column: False for column in columns}
+
+    for chunk in make_chunks(columns):
+        for column in columns:
+            values[column].update(chunk[column].dropna().unique())
+
+            missing[column] = missing[column] or bool(chunk[column].isna().any())
+
+    for encoder, encoder_columns, missing_category in encoders:
+        categories = []
+
+        for column in encoder_columns:
+            column_values = set(values[column])
+
+            if missing[column] and missing_category is not _IMPUTED:
+                column_values.add(missing_category)
+
+            # NaN sorts last, as in OneHotEncoder
+            categories.append(
+                np.array(
+                    sorted(value for value in column_values if not pd.isna(value))
+                    + [value for value in column_values if pd.isna(value)][:1],
+                    dtype=object,
+                )
+            )
+
+        encoder.set_params(categories=categories)
+
+
+# missing values imputed to a category that is already among the values
+_IMPUTED = object()
+
+# fills the rows of a compact encoder input, never one of its categories
+_PADDING = object()
+
+
+def _missing_category(upstream: Pipeline):
+    # the category missing values reach the encoder as
+    for _, step in upstream.steps:
+        if isinstance(step, SimpleImputer):
+            if step.strategy != "constant":
+                return _IMPUTED
+
+            # SimpleImputer fills string columns with "missing_value" by default
+            return "missing_value" if step.fill_value is None else step.fill_value
+
+    return np.nan
+
+
+def _fit_encoder_in_chunks(encoder: OneHotEncoder, inputs: Iterable) -> OneHotEncoder:
+    # the categories are the union set before the first chunk, only the infrequent
+    # ones depend on counts, which are taken here over every chunk
+    if encoder.min_frequency is None and encoder.max_categories is None:
+        return encoder
+
+    counts = [np.zeros(len(categories), dtype=np.int64) for categories in encoder.categories_]
+
+    n_rows = 0
+
+    for X in inputs:
+        X = np.asarray(X, dtype=object)
+
+        n_rows += len(X)
+
+        for index, categories in enumerate(encoder.categories_):
+            counts[index] += _count_categories(X[:, index], categories)
+
+    # OneHotEncoder settles its infrequent categories from counts alone, so a
+    # compact input holding each frequent category once, with min_frequency=1,
+    # reproduces the fit on the whole training set
+    frequent = [
+        categories[~_infrequent_mask(encoder, count, n_rows)]
+        for categories, count in zip(encoder.categories_, counts)
+    ]
+
+    X = np.full((max(1, max(len(values) for values in frequent)), len(frequent)), _PADDING)
+
+    for index, values in enumerate(frequent):
+        X[: len(values), index] = values
+
+    fitted = clone(encoder).set_params(
+        categories=list(encoder.categories_),
+        min_frequency=1,
+        max_categories=None,
+        handle_unknown="infrequent_if_exist",
+    )
+
+    fitted.fit(X)
+
+    return fitted.set_params(
+        min_frequency=encoder.min_frequency,
+        max_categories=encoder.max_categories,
+        handle_unknown=encoder.handle_unknown,
+    )
+
+
+def _count_categories(values: np.ndarray, categories: np.ndarray) -> np.ndarray:
+    known = np.array([not pd.isna(category) for category in categories])
+
+    codes = pd.Categorical(values, categories=categories[known]).codes
+
+    counts = np.bincount(codes[codes >= 0], minlength=int(known.sum()))
+
+    if known.all():
+        return counts
+
+    return np.append(counts, pd.isna(values).sum())
+
+
+def _infrequent_mask(encoder: OneHotEncoder, count: np.ndarray, n_rows: int) -> np.ndarray:
+    # OneHotEncoder._identify_infrequent on the counts of the whole training set
+    min_frequency = encoder.min_frequency
+
+    if isinstance(min_frequency, numbers.Integral):
+        mask = count < min_frequency
+
+    elif isinstance(min_frequency, numbers.Real):
+        mask = count < n_rows * min_frequency
+
+    else:
+        mask = np.zeros(len(count), dtype=bool)
+
+    n_features = len(count) - mask.sum() + 1
+
+    if encoder.max_categories is not None and encoder.max_categories < n_features:
+        # max_categories includes the one infrequent category
+        n_frequent = encoder.max_categories - 1
+
+        if n_frequent == 0:
+            mask[:] = True
+
+        else:
+            mask[np.argsort(count, kind="mergesort")[:-n_frequent]] = True
+
+    return mask
+
+
+def _set_output_indices(preprocessor: ColumnTransformer, sample: pd.DataFrame) -> None:
+    # refitted encoders may change output widths the first chunk recorded
+    start = 0
+
+    output_indices = {name: slice(0, 0) for name, _, _ in preprocessor.transformers}
+
+    output_indices["remainder"] = slice(0, 0)
+
+    for name, transformer, columns in preprocessor.transformers_:
+        if isinstance(transformer, str):
+            width = 0 if transformer == "drop" else len(columns)
+
+        elif len(columns):
+            width = transformer.transform(sample[list(columns)]).shape[1]
+
+        else:
+            width = 0
+
+        if width:
+            output_indices[name] = slice(start, start + width)
+
+        start += width
+
+    preprocessor.output_indices_ = output_indices
+
+
+def _fit_step_in_chunks(
+    step,
+    upstream: Optional[Pipeline],
+    make_chunks: Callable[[], Iterable[pd.DataFrame]],
+    columns: List[str],
+    sketch_size: int,
+    random_state: Optional[int],
+):
+    def inputs():
+        for chunk in make_chunks():
+            chunk = chunk[columns]
+
+            yield chunk if upstream is None else upstream.transform(chunk)
+
+    if isinstance(step, SimpleImputer):
+        return _fit_imputer_in_chunks(step, inputs(), sketch_size, random_state)
+
+    if isinstance(step, OneHotEncoder):
+        # fitted on the first chunk against the category union, infrequent categories aside
+        return _fit_encoder_in_chunks(step, inputs())
+
+    if hasattr(step, "partial_fit"):
+        fitted = clone(step)
+
+        if isinstance(fitted, Winsorizer):
+            fitted.set_params(sketch_size=fitted.sketch_size or sketch_size)
+
+        for X in inputs():
+            fitted.partial_fit(X)
+
+        return fitted
+
+    logging.info(f"{type(step).__name__} has no chunked fit, keeping its first chunk fit")
+
+    return step
+
+
+def _fit_imputer_in_chunks(
+    imputer: SimpleImputer,
+    inputs: Iterable,
+    sketch_size: int,
+    random_state: Optional[int],
+) -> SimpleImputer:
+    # the imputer fitted on the first chunk keeps its structure, only statistics_ change
+    strategy = imputer.strategy
+
+    if strategy == "constant":
+        return imputer
+
+    sketch = QuantileSketch(size=sketch_size, random_state=random_state)
+
+    sums, counts = None, None
+
+    counters: Optional[List[Counter]] = None
+
+    for X in inputs:
+        if strategy == "median":
+            sketch.update(X)
+
+        elif strategy == "mean":
+            X = np.asarray(X, dtype=np.float64)
+
+            sums = np.nansum(X, axis=0) + (0 if sums is None else sums)
+
+            counts = (~np.isnan(X)).sum(axis=0) + (0 if counts is None else counts)
+
+        else:
+            X = pd.DataFrame(X)
+
+            if counters is None:
+                counters = [Counter() for _ in range(X.shape[1])]
+
+            for counter, (_, column) in zip(counters, X.items()):
+                counter.update(column.dropna().tolist())
+
+    if strategy == "median":
+        statistics = sketch.quantiles([0.5])[0]
+
+    elif strategy == "mean":
+        with np.errstate(invalid="ignore", divide="ignore"):
+            statistics = sums / counts
+
+    else:
+        # ties go to the smallest value, as in SimpleImputer
+        statistics = np.array(
+            [
+                min(counter, key=lambda value: (-counter[value], value)) if counter else np.nan
+                for counter in counters
+            ],
+            dtype=object,
+        )
+
+    imputer.statistics_ = statistics.astype(imputer.statistics_.dtype, copy=False)
+
+    return imputer
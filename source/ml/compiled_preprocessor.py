@@ -0,0 +1,315 @@
+import sys
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from source.exception import BackOrderException
+from source.logger import logging
+from source.ml.pre_processing import AsType, Winsorizer
+
+
+class CompiledPreprocessor:
+    """
+    Inference-only replacement for the fitted preprocessing ColumnTransformer.
+
+    The fitted statistics are extracted once, and every batch is transformed
+    without the ColumnTransformer dispatch, its per-step input validation and
+    DataFrame round trips. The numeric block is not transformed in a single
+    pass: each fitted step (cast, standardize, impute, clip) is one vectorized
+    NumPy operation over a working copy, in the dtype the ColumnTransformer
+    step sees, so the output is bit-identical to the ColumnTransformer, in
+    float32 too. The result and the one-hot encoded categorical block, built
+    from category lookup codes, are written into one preallocated output array.
+
+    Args:
+        numerical_cols (List[str]): Numeric input columns, in output order.
+        numerical_steps (List[Tuple[str, np.ndarray, np.ndarray]]): Numeric operations
+            as ("astype", dtype, _), ("affine", mean, scale), ("impute", fill_values, _)
+            or ("clip", lower, upper).
+        categorical_cols (List[str]): Categorical input columns, in output order.
+        categorical_fill_values (List[object]): Imputed value for each categorical column.
+        categories (List[np.ndarray]): Fitted categories for each categorical column.
+        drop_idx (List[Optional[int]]): Index of the dropped category for each column.
+        handle_unknown (List[str]): "error" or "ignore" for each categorical column,
+            as configured on its OneHotEncoder.
+        dtype: Output dtype.
+
+    Methods:
+        transform(dataframe: DataFrame) -> np.ndarray:
+            Transform a DataFrame into the model input array.
+    """
+
+    def __init__(
+        self,
+        numerical_cols: List[str],
+        numerical_steps: List[Tuple[str, np.ndarray, np.ndarray]],
+        categorical_cols: List[str],
+        categorical_fill_values: List[object],
+        categories: List[np.ndarray],
+        drop_idx: List[Optional[int]],
+        handle_unknown: List[str],
+        dtype=np.float64,
+    ):
+        """
+        Initialize the CompiledPreprocessor instance.
+        """
+
+        self.numerical_cols = numerical_cols
+
+        self.numerical_steps = numerical_steps
+
+        self.categorical_cols = categorical_cols
+
+        self.categorical_fill_values = categorical_fill_values
+
+        self.categories = categories
+
+        self.drop_idx = drop_idx
+
+        self.handle_unknown = handle_unknown
+
+        self.dtype = dtype
+
+        self.n_features_out = len(numerical_cols) + sum(
+            len(column_categories) - (drop is not None)
+            for column_categories, drop in zip(categories, drop_idx)
+        )
+
+    def transform(self, dataframe: pd.DataFrame) -> np.ndarray:
+        """
+        Transform a DataFrame into the model input array.
+        """
+
+        try:
+            n_numerical = len(self.numerical_cols)
+
+            out = np.zeros((len(dataframe), self.n_features_out), dtype=self.dtype)
+
+            # numeric block: one working copy, every step applied in place in
+            # the dtype of the ColumnTransformer step, float32 input stays float32
+            numerical = dataframe[self.numerical_cols].to_numpy(copy=True)
+
+            if numerical.dtype not in (np.float32, np.float64):
+                numerical = numerical.astype(np.float64)
+
+            for step, first, second in self.numerical_steps:
+                if step == "astype":
+                    numerical = numerical.astype(first, copy=False)
+
+                elif step == "affine":
+                    # StandardScaler casts its statistics to the input dtype
+                    numerical -= np.asarray(first, dtype=numerical.dtype)
+
+                    numerical /= np.asarray(second, dtype=numerical.dtype)
+
+                elif step == "impute":
+                    rows, cols = np.nonzero(np.isnan(numerical))
+
+                    numerical[rows, cols] = first[cols]
+
+                elif step == "clip":
+                    np.clip(
+                        numerical,
+                        np.asarray(first, dtype=numerical.dtype),
+                        np.asarray(second, dtype=numerical.dtype),
+                        out=numerical,
+                    )
+
+            out[:, :n_numerical] = numerical
+
+            # categorical block: category codes index straight into the output
+            offset = n_numerical
+
+            for column, fill_value, column_categories, drop, handle_unknown in zip(
+                self.categorical_cols,
+                self.categorical_fill_values,
+                self.categories,
+                self.drop_idx,
+                self.handle_unknown,
+            ):
+                values = dataframe[column].to_numpy(dtype=object)
+
+                values = np.where(pd.isna(values), fill_value, values)
+
+                codes = pd.Categorical(values, categories=column_categories).codes
+
+                if handle_unknown == "error" and (codes < 0).any():
+                    unknown = sorted(set(values[codes < 0]))
+
+                    raise ValueError(
+                        f"Found unknown categories {unknown} in column {column}"
+                    )
+
+                if drop is not None:
+                    codes = np.where(
+                        codes == drop, -1, np.where(codes > drop, codes - 1, codes)
+                    )
+
+                rows = np.nonzero(codes >= 0)[0]
+
+                out[rows, offset + codes[rows]] = 1
+
+                offset += len(column_categories) - (drop is not None)
+
+            return out
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+
+def compile_preprocessor(
+    preprocessor: ColumnTransformer, sample: pd.DataFrame, dtype=np.float64
+) -> Optional[CompiledPreprocessor]:
+    """
+    Compile a fitted preprocessing ColumnTransformer into a CompiledPreprocessor
+    and check it against the original on a sample of input rows.
+
+    Returns None, and the caller should keep using the ColumnTransformer,
+    when the transformer has a structure the kernel does not support or
+    when the compiled output differs from the original.
+    """
+
+    try:
+        compiled = _build_compiled_preprocessor(preprocessor, dtype)
+
+    except NotImplementedError as e:
+        logging.info(f"Preprocessor not compiled: {e}")
+
+        return None
+
+    try:
+        expected = preprocessor.transform(sample)
+
+        if hasattr(expected, "toarray"):
+            expected = expected.toarray()
+
+        actual = compiled.transform(sample)
+
+        # the model is trained on the ColumnTransformer output, serving must see the same bits
+        matches = actual.dtype == expected.dtype and np.array_equal(actual, expected)
+
+        if not matches:
+            logging.info("Preprocessor not compiled: output differs from the original")
+
+            return None
+
+        logging.info(
+            f"Compiled preprocessor verified on {len(sample)} rows, {compiled.n_features_out} features"
+        )
+
+        return compiled
+
+    except Exception as e:
+        raise BackOrderException(e, sys) from e
+
+
+def _build_compiled_preprocessor(
+    preprocessor: ColumnTransformer, dtype
+) -> CompiledPreprocessor:
+    if getattr(preprocessor, "sparse_output_", False):
+        raise NotImplementedError("sparse ColumnTransformer output")
+
+    numerical_cols, numerical_steps = [], []
+
+    categorical_cols, categorical_fill_values, categories, drop_idx = [], [], [], []
+
+    handle_unknown = []
+
+    for name, transformer, columns in preprocessor.transformers_:
+        if name == "remainder":
+            if transformer != "drop":
+                raise NotImplementedError(f"remainder={transformer}")
+
+            continue
+
+        if not hasattr(transformer, "steps"):
+            raise NotImplementedError(f"{name} block is not a Pipeline")
+
+        steps = [step for _, step in transformer.steps]
+
+        if isinstance(steps[-1], OneHotEncoder):
+            encoder = steps[-1]
+
+            # the kernel encodes unknown values as all zeros, with infrequent
+            # categories sklearn would put them and the rare ones in their own column
+            if any(
+                infrequent is not None
+                for infrequent in getattr(encoder, "infrequent_categories_", [])
+            ):
+                raise NotImplementedError("OneHotEncoder with infrequent categories")
+
+            if encoder.handle_unknown not in ("error", "ignore"):
+                raise NotImplementedError(f"handle_unknown={encoder.handle_unknown}")
+
+            fill_values = [np.nan] * len(columns)
+
+            for step in steps[:-1]:
+                if not isinstance(step, SimpleImputer) or step.add_indicator:
+                    raise NotImplementedError(f"categorical step {type(step).__name__}")
+
+                fill_values = list(step.statistics_)
+
+            drop = encoder.drop_idx_
+
+            if drop is None:
+                drop = [None] * len(columns)
+
+            categorical_cols += list(columns)
+
+            categorical_fill_values += fill_values
+
+            categories += list(encoder.categories_)
+
+            drop_idx += [None if d is None else int(d) for d in drop]
+
+            handle_unknown += [encoder.handle_unknown] * len(columns)
+
+        else:
+            if categorical_cols or numerical_cols:
+                raise NotImplementedError("numeric block must be the first block")
+
+            for step in steps:
+                if isinstance(step, StandardScaler):
+                    mean = step.mean_ if step.with_mean else 0.0
+
+                    scale = step.scale_ if step.with_std else 1.0
+
+                    numerical_steps.append(("affine", mean, scale))
+
+                elif isinstance(step, SimpleImputer):
+                    statistics = step.statistics_.astype(np.float64)
+
+                    if step.add_indicator or np.isnan(statistics).any():
+                        raise NotImplementedError(
+                            "imputer adding indicators or dropping all-missing columns"
+                        )
+
+                    numerical_steps.append(("impute", statistics, None))
+
+                elif isinstance(step, AsType):
+                    numerical_steps.append(("astype", np.dtype(step.dtype), None))
+
+                elif isinstance(step, Winsorizer):
+                    numerical_steps.append(
+                        ("clip", step.lower_bound, step.upper_bound)
+                    )
+
+                else:
+                    raise NotImplementedError(f"numeric step {type(step).__name__}")
+
+            numerical_cols += list(columns)
+
+    return CompiledPreprocessor(
+        numerical_cols=numerical_cols,
+        numerical_steps=numerical_steps,
+        categorical_cols=categorical_cols,
+        categorical_fill_values=categorical_fill_values,
+        categories=categories,
+        drop_idx=drop_idx,
+        handle_unknown=handle_unknown,
+        dtype=dtype,
+    )
@@ -16,11 +16,34 @@ class BackOrderPredictionModel:
         preprocessing_object (Pipeline): A data preprocessing pipeline.
         trained_model_object (object): A trained prediction model.
         label_encoder_object (object): An object for label encoding.
+        compiled_preprocessing_object (CompiledPreprocessor): Optional inference
+            kernel equivalent to the preprocessing pipeline, used instead of it when set.
+
+    A native XGBoost booster can be attached at serving time with attach_native_booster;
+    predictions then go through Booster.inplace_predict instead of the sklearn wrapper.
 
     Methods:
+        transform(dataframe: DataFrame) -> np.array:
+            Transforms a DataFrame into model input features.
+
+        attach_native_booster(booster, nthread):
+            Serve predictions from a native XGBoost booster.
+
+        set_nthread(nthread):
+            Set the number of threads used by the trained model.
+
         predict(dataframe: DataFrame) -> DataFrame:
             Utilizes the trained model to predict back-order status for a given DataFrame.
 
+        predict_proba(dataframe: DataFrame) -> np.array:
+            Utilizes the trained model to get class probabilities for a given DataFrame.
+
+        predict_transformed(transformed_feature: np.array) -> np.array:
+            Predicts label indices from features already passed through transform.
+
+        predict_proba_transformed(transformed_feature: np.array) -> np.array:
+            Gets class probabilities from features already passed through transform.
+
         get_original_labels(prediction_array: np.array) -> np.array:
             Converts predicted label indices back to their original labels using the label encoder.
 
@@ -34,7 +57,8 @@ class BackOrderPredictionModel:
     def __init__(
             self, preprocessing_object: Pipeline, 
             trained_model_object: object,
-            label_encoder_object: object
+            label_encoder_object: object,
+            compiled_preprocessing_object: object = None,
             ):
         """
         Initialize the BackOrderPredictionModel instance.
@@ -46,6 +70,60 @@ class BackOrderPredictionModel:
 
         self.label_encoder_object = label_encoder_object
 
+        self.compiled_preprocessing_object = compiled_preprocessing_object
+
+        # S3 ETag of the native booster export pushed with this model, set by the model pusher
+        self.native_model_etag = None
+
+    def transform(self, dataframe: DataFrame) -> np.array:
+        """
+        Transforms a DataFrame into model input features, through the compiled
+        kernel when one was built at training time.
+        """
+
+        # models pickled before the compiled kernel existed lack the attribute
+        compiled_preprocessing_object = getattr(
+            self, "compiled_preprocessing_object", None
+        )
+
+        if compiled_preprocessing_object is not None:
+            return compiled_preprocessing_object.transform(dataframe)
+
+        return self.preprocessing_object.transform(dataframe)
+
+    def attach_native_booster(self, booster, nthread: int = 0) -> None:
+        """
+        Serve predictions from a native XGBoost booster, e.g. one loaded from
+        the UBJSON export, using inplace_predict on the preprocessed array.
+        """
+
+        self.native_booster = booster
+
+        if nthread > 0:
+            self.set_nthread(nthread)
+
+    def set_nthread(self, nthread: int) -> None:
+        """
+        Set the number of threads used by the trained model and the native booster.
+        """
+
+        native_booster = getattr(self, "native_booster", None)
+
+        if native_booster is not None:
+            native_booster.set_param({"nthread": nthread})
+
+        if hasattr(self.trained_model_object, "set_params"):
+            self.trained_model_object.set_params(n_jobs=nthread)
+
+    def _native_predict_proba(self, transformed_feature: np.array) -> np.array:
+        prediction = self.native_booster.inplace_predict(transformed_feature)
+
+        # binary:logistic returns the positive class probability only
+        if prediction.ndim == 1:
+            return np.column_stack([1 - prediction, prediction])
+
+        return prediction
+
     def predict(self, dataframe: DataFrame) -> DataFrame:
         """
         Utilizes the trained model to predict back-order status for a given DataFrame.
@@ -56,15 +134,56 @@ class BackOrderPredictionModel:
         try:
             logging.info("Using the trained model to get predictions")
 
-            transformed_feature = self.preprocessing_object.transform(dataframe)
+            transformed_feature = self.transform(dataframe)
 
             logging.info("Used the trained model to get predictions")
 
-            return self.trained_model_object.predict(transformed_feature)
+            return self.predict_transformed(transformed_feature)
 
         except Exception as e:
             raise BackOrderException(e, sys) from e
         
+    def predict_proba(self, dataframe: DataFrame) -> np.array:
+        """
+        Utilizes the trained model to get class probabilities for a given DataFrame.
+        Columns follow the order of the label encoder classes.
+        """
+
+        try:
+            return self.predict_proba_transformed(self.transform(dataframe))
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def predict_transformed(self, transformed_feature: np.array) -> np.array:
+        """
+        Predict label indices from features already passed through transform,
+        so callers can time preprocessing and prediction separately.
+        """
+
+        try:
+            if getattr(self, "native_booster", None) is not None:
+                return self._native_predict_proba(transformed_feature).argmax(axis=1)
+
+            return self.trained_model_object.predict(transformed_feature)
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def predict_proba_transformed(self, transformed_feature: np.array) -> np.array:
+        """
+        Class probabilities from features already passed through transform.
+        """
+
+        try:
+            if getattr(self, "native_booster", None) is not None:
+                return self._native_predict_proba(transformed_feature)
+
+            return self.trained_model_object.predict_proba(transformed_feature)
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
     def get_original_labels(self,prediction_array: np.array) -> np.array:
         """
         Converts predicted label indices back to their original labels using the label encoder.
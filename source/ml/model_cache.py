@@ -0,0 +1,241 @@
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from source.constants.prediction_pipeline import MODEL_CACHE_TTL_SECONDS
+from source.exception import BackOrderException
+from source.logger import logging
+from source.ml.estimator import BackOrderPredictionModel
+from source.ml.s3_estimator import BackOrderEstimator
+from source.monitoring.metrics import MODEL_CACHE_REQUESTS
+
+
+class ModelCache:
+    """
+    Process-wide cache for the back-order prediction model stored in S3.
+
+    The model is downloaded and unpickled once. After ``ttl_seconds`` the next
+    lookup starts a background thread that compares the S3 ETag with the cached
+    one and, if it changed, loads the new model and swaps it in atomically.
+    Requests keep getting the current model while the refresh is running.
+    When ``native_model_path`` is set and the native XGBoost export is the one
+    the pickled model recorded at push time, matched by ETag, it is loaded
+    alongside the pickle and attached to the model for serving.
+
+    Methods:
+        get_instance(bucket_name, model_path, ...) -> ModelCache:
+            Return the shared cache for the given model location.
+
+        from_config(prediction_pipeline_config) -> ModelCache:
+            Return the shared cache for the model of a prediction pipeline configuration.
+
+        get_model() -> BackOrderPredictionModel:
+            Return the cached model, loading it on first use.
+
+        invalidate():
+            Force a revalidation on the next lookup.
+
+    Example usage:
+    ```
+    model = ModelCache.get_instance(bucket_name, "model-registry/model.pkl").get_model()
+    ```
+    """
+
+    _instances: Dict[Tuple[str, str], "ModelCache"] = {}
+
+    _instances_lock = threading.Lock()
+
+    def __init__(
+        self,
+        bucket_name: str,
+        model_path: str,
+        ttl_seconds: float = MODEL_CACHE_TTL_SECONDS,
+        native_model_path: Optional[str] = None,
+        nthread: int = 0,
+    ):
+        """
+        Initialize the ModelCache instance.
+        """
+
+        self.bucket_name = bucket_name
+
+        self.model_path = model_path
+
+        self.ttl_seconds = ttl_seconds
+
+        self.native_model_path = native_model_path
+
+        self.nthread = nthread
+
+        self._estimator: Optional[BackOrderEstimator] = None
+
+        # (model, etag) is replaced as a whole so readers never see a mixed pair
+        self._entry: Optional[Tuple[BackOrderPredictionModel, str]] = None
+
+        self._last_checked = 0.0
+
+        self._refreshing = False
+
+        self._load_lock = threading.Lock()
+
+        self._state_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(
+        cls,
+        bucket_name: str,
+        model_path: str,
+        ttl_seconds: float = MODEL_CACHE_TTL_SECONDS,
+        native_model_path: Optional[str] = None,
+        nthread: int = 0,
+    ) -> "ModelCache":
+        """
+        Return the shared cache for the given model location.
+        """
+
+        key = (bucket_name, model_path)
+
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(
+                    bucket_name=bucket_name,
+                    model_path=model_path,
+                    ttl_seconds=ttl_seconds,
+                    native_model_path=native_model_path,
+                    nthread=nthread,
+                )
+
+            return cls._instances[key]
+
+    @classmethod
+    def from_config(cls, prediction_pipeline_config) -> "ModelCache":
+        """
+        Return the shared cache for the model of a prediction pipeline configuration.
+        """
+
+        return cls.get_instance(
+            bucket_name=prediction_pipeline_config.model_bucket_name,
+            model_path=prediction_pipeline_config.model_file_path,
+            ttl_seconds=prediction_pipeline_config.model_cache_ttl_seconds,
+            native_model_path=(
+                prediction_pipeline_config.native_model_file_path
+                if prediction_pipeline_config.use_native_booster
+                else None
+            ),
+            nthread=prediction_pipeline_config.native_booster_nthread,
+        )
+
+    @property
+    def estimator(self) -> BackOrderEstimator:
+        if self._estimator is None:
+            self._estimator = BackOrderEstimator(
+                bucket_name=self.bucket_name, model_path=self.model_path
+            )
+
+        return self._estimator
+
+    @property
+    def etag(self) -> Optional[str]:
+        entry = self._entry
+
+        return None if entry is None else entry[1]
+
+    def get_model(self) -> BackOrderPredictionModel:
+        """
+        Return the cached model, loading it on first use.
+        """
+
+        try:
+            entry = self._entry
+
+            if entry is None:
+                MODEL_CACHE_REQUESTS.labels("miss").inc()
+
+                with self._load_lock:
+                    if self._entry is None:
+                        self._load()
+
+                return self._entry[0]
+
+            MODEL_CACHE_REQUESTS.labels("hit").inc()
+
+            if time.monotonic() - self._last_checked >= self.ttl_seconds:
+                self._schedule_refresh()
+
+            return entry[0]
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def invalidate(self) -> None:
+        """
+        Force a revalidation against S3 on the next lookup.
+        """
+
+        self._last_checked = 0.0
+
+    def _schedule_refresh(self) -> None:
+        with self._state_lock:
+            if self._refreshing:
+                return
+
+            self._refreshing = True
+
+            self._last_checked = time.monotonic()
+
+        threading.Thread(
+            target=self._refresh, name="model-cache-refresh", daemon=True
+        ).start()
+
+    def _refresh(self) -> None:
+        try:
+            etag = self.estimator.get_model_etag()
+
+            if etag != self.etag:
+                logging.info(
+                    f"Model ETag changed from {self.etag} to {etag}, reloading model"
+                )
+
+                with self._load_lock:
+                    self._load()
+
+        except Exception as e:
+            logging.info(f"Model cache refresh failed, keeping current model: {e}")
+
+        finally:
+            with self._state_lock:
+                self._refreshing = False
+
+    def _load(self) -> None:
+        logging.info(
+            f"Loading model {self.model_path} from {self.bucket_name} into model cache"
+        )
+
+        model, etag = self.estimator.load_model_with_etag()
+
+        # models pickled before the pusher recorded the booster ETag lack the attribute
+        native_model_etag = getattr(model, "native_model_etag", None)
+
+        if self.native_model_path is not None and native_model_etag is not None:
+            booster, booster_etag = self.estimator.load_native_booster_with_etag(
+                self.native_model_path
+            )
+
+            # a booster pushed before or after this model belongs to another model
+            if booster_etag == native_model_etag:
+                model.attach_native_booster(booster, nthread=self.nthread)
+
+                logging.info(f"Attached native booster {self.native_model_path}")
+
+            else:
+                logging.info(
+                    f"Native booster ETag {booster_etag} does not match the model's "
+                    f"{native_model_etag}, serving without it"
+                )
+
+        self._entry = (model, etag)
+
+        self._last_checked = time.monotonic()
+
+        logging.info(f"Loaded model with ETag {etag} into model cache")
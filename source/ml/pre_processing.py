@@ -1,22 +1,159 @@
-from sklearn.base import TransformerMixin
+from typing import Optional
+
+from sklearn.base import BaseEstimator, TransformerMixin
 import numpy as np
 from source.utils import read_yaml_file
 from source.constants.training_pipeline import SCHEMA_DROP_COLS, SCHEMA_FILE_PATH
 from source.exception import BackOrderException
 from source.logger import logging
 import pandas as pd
+
+
+class QuantileSketch:
+    """
+    Bounded-memory sketch of per-column quantiles over a stream of row chunks.
+
+    Keeps exact column minimums and maximums and a uniform reservoir sample of
+    at most ``size`` rows, from which the inner quantiles are estimated. The
+    rank error of an estimate is about 1 / sqrt(size), independent of how many
+    rows were seen, so data larger than memory can be summarized chunk by chunk.
+
+    Args:
+        size (int): Maximum number of sampled rows.
+        random_state (Optional[int]): Seed of the reservoir sampling.
+
+    Methods:
+        update(X):
+            Add a chunk of rows to the sketch.
+
+        quantiles(q) -> np.ndarray:
+            Estimated quantiles q (fractions in [0, 1]) of every column, shape (len(q), n_columns).
+    """
+
+    def __init__(self, size: int = 100_000, random_state: Optional[int] = None):
+        """
+        Initialize the QuantileSketch instance.
+        """
+
+        self.size = size
+
+        self.n_seen = 0
+
+        self.minimum: Optional[np.ndarray] = None
+
+        self.maximum: Optional[np.ndarray] = None
+
+        self._reservoir: Optional[np.ndarray] = None
+
+        self._rng = np.random.default_rng(random_state)
+
+    def update(self, X) -> "QuantileSketch":
+        """
+        Add a chunk of rows to the sketch.
+        """
+
+        X = np.asarray(X, dtype=np.float64)
+
+        if X.ndim == 1:
+            X = X.reshape(-1, 1)
+
+        if self._reservoir is None:
+            self._reservoir = np.empty((self.size, X.shape[1]), dtype=np.float64)
+
+            self.minimum = np.full(X.shape[1], np.nan)
+
+            self.maximum = np.full(X.shape[1], np.nan)
+
+        # fmin/fmax skip NaN unless every value of a column is NaN
+        self.minimum = np.fmin(self.minimum, np.fmin.reduce(X, axis=0, initial=np.nan))
+
+        self.maximum = np.fmax(self.maximum, np.fmax.reduce(X, axis=0, initial=np.nan))
+
+        # fill the reservoir first, then row i replaces a random slot with probability size / (i + 1)
+        n_fill = min(max(self.size - self.n_seen, 0), len(X))
+
+        self._reservoir[self.n_seen : self.n_seen + n_fill] = X[:n_fill]
+
+        rest = X[n_fill:]
+
+        if len(rest):
+            positions = np.arange(self.n_seen + n_fill, self.n_seen + len(X))
+
+            slots = (self._rng.random(len(rest)) * (positions + 1)).astype(np.int64)
+
+            accepted = slots < self.size
+
+            # with repeated slots the later row wins, as it would row by row
+            self._reservoir[slots[accepted]] = rest[accepted]
+
+        self.n_seen += len(X)
+
+        return self
+
+    def quantiles(self, q) -> np.ndarray:
+        """
+        Estimated quantiles q (fractions in [0, 1]) of every column, shape
+        (len(q), n_columns). The 0 and 1 quantiles are the exact extremes.
+        """
+
+        q = np.asarray(q, dtype=np.float64)
+
+        sample = self._reservoir[: min(self.n_seen, self.size)]
+
+        values = _column_quantiles(sample, q)
+
+        values[q == 0] = self.minimum
+
+        values[q == 1] = self.maximum
+
+        return values
+
+
+def _column_quantiles(X: np.ndarray, q: np.ndarray) -> np.ndarray:
+    # np.quantile partitions each column once for all q, the nan variant is far slower
+    if np.isnan(X).any():
+        return np.nanquantile(X, q, axis=0)
+
+    return np.quantile(X, q, axis=0)
+
+
 ## custom class with fit and tranform to perform winsorization
 
-class Winsorizer(TransformerMixin):
-    def __init__(self):
+class Winsorizer(BaseEstimator, TransformerMixin):
+    """
+    Clip every column to its Tukey fences, [Q1 - fold * IQR, Q3 + fold * IQR],
+    narrowed to the column's observed range.
+
+    fit computes the minimum, quartiles and maximum of all columns in one
+    vectorized pass. With ``sketch_size`` set, or when fitted chunk by chunk
+    through partial_fit, the quartiles come from a QuantileSketch instead, so
+    the data never has to fit in memory at once.
+
+    Parameters:
+    - fold (float): IQR multiplier of the fences (default: 1.5).
+    - sketch_size (Optional[int]): Rows sampled by the quantile sketch, None fits exact quantiles.
+    - random_state (Optional[int]): Seed of the quantile sketch.
+    - copy (bool): When False, transform clips float arrays in place.
+    """
+
+    def __init__(
+        self,
+        fold: float = 1.5,
+        sketch_size: Optional[int] = None,
+        random_state: Optional[int] = None,
+        copy: bool = True,
+    ):
         """
         Initialize the Winsorizer transformer.
-
-        Parameters:
-        - lower_quantile (float): Lower quantile for winsorization (default: 0.05).
-        - upper_quantile (float): Upper quantile for winsorization (default: 0.95).
         """
-        # self.change = change
+
+        self.fold = fold
+
+        self.sketch_size = sketch_size
+
+        self.random_state = random_state
+
+        self.copy = copy
 
     def fit(self, X, y=None):
         """
@@ -29,20 +166,58 @@ class Winsorizer(TransformerMixin):
         Returns:
         - self: Returns the instance of the transformer.
         """
-        # Calculate the percentiles
-        p0 = np.nanpercentile(X, 0)
-        p100 = np.nanpercentile(X, 100)
 
-        # Calculate the lower and upper IQR
-        Q1 = np.nanpercentile(X, 25)
-        Q3 = np.nanpercentile(X, 75)
-        IQR = Q3 - Q1
+        if self.sketch_size is not None:
+            self.sketch_ = None
+
+            return self.partial_fit(X)
+
+        X = np.asarray(X, dtype=np.float64)
+
+        if X.ndim == 1:
+            X = X.reshape(-1, 1)
+
+        self._set_bounds(_column_quantiles(X, np.array([0.0, 0.25, 0.75, 1.0])))
+
+        return self
+
+    def partial_fit(self, X, y=None):
+        """
+        Add a chunk of rows to the quantile sketch and refit the bounds.
+
+        Parameters:
+        - X (array-like): Input data chunk.
+        - y: Ignored.
+
+        Returns:
+        - self: Returns the instance of the transformer.
+        """
+
+        if getattr(self, "sketch_", None) is None:
+            self.sketch_ = QuantileSketch(
+                size=self.sketch_size or 100_000, random_state=self.random_state
+            )
+
+        self.sketch_.update(X)
+
+        self._set_bounds(self.sketch_.quantiles([0.0, 0.25, 0.75, 1.0]))
 
-        # Calculate the lower and upper bounds
-        self.lower_bound = max(Q1 - (1.5 * IQR),p0)
-        self.upper_bound = min(Q3 + (1.5 * IQR),p100)
         return self
 
+    def _set_bounds(self, quantiles: np.ndarray) -> None:
+        p0, q1, q3, p100 = quantiles
+
+        iqr = q3 - q1
+
+        # per-column bounds broadcast over the rows of X
+        self.lower_bound = np.maximum(q1 - self.fold * iqr, p0)
+
+        self.upper_bound = np.minimum(q3 + self.fold * iqr, p100)
+
+    def __sklearn_is_fitted__(self) -> bool:
+        # the bounds predate the trailing underscore convention check_is_fitted looks for
+        return hasattr(self, "lower_bound")
+
     def transform(self, X):
         """
         Transform the input data using winsorization.
@@ -54,10 +229,21 @@ class Winsorizer(TransformerMixin):
         - X_transformed (array-like): Transformed data after winsorization.
         """
 
-        X_clipped = np.clip(X, self.lower_bound, self.upper_bound)
-        return X_clipped
+        lower_bound, upper_bound = self.lower_bound, self.upper_bound
+
+        if isinstance(X, np.ndarray) and X.dtype.kind == "f":
+            # float32 input stays float32
+            lower_bound = np.asarray(lower_bound, dtype=X.dtype)
+
+            upper_bound = np.asarray(upper_bound, dtype=X.dtype)
+
+            # models pickled before per-column bounds have no copy attribute
+            if not getattr(self, "copy", True) and X.flags.writeable:
+                return np.clip(X, lower_bound, upper_bound, out=X)
+
+        return np.clip(X, lower_bound, upper_bound)
 
-    def get_feature_names_out(self, input_features):
+    def get_feature_names_out(self, input_features=None):
         """
         Get the feature names after transformation.
 
@@ -69,14 +255,48 @@ class Winsorizer(TransformerMixin):
         """
         return input_features
     
+class AsType(BaseEstimator, TransformerMixin):
+    """
+    Stateless step casting its input to an array of the given dtype.
+
+    Parameters:
+    - dtype: Target dtype (default: "float32").
+    """
+
+    def __init__(self, dtype="float32"):
+        """
+        Initialize the AsType transformer.
+        """
+
+        self.dtype = dtype
+
+    def fit(self, X, y=None):
+        return self
+
+    def partial_fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        return np.asarray(X, dtype=self.dtype)
+
+    def __sklearn_is_fitted__(self) -> bool:
+        return True
+
+    def get_feature_names_out(self, input_features=None):
+        return input_features
+
+
 def drop_columns(df: pd.DataFrame) -> pd.DataFrame:
     """
     will drop unneccesary columns before data transformation
      """
     _schema_config = read_yaml_file(file_path=SCHEMA_FILE_PATH) 
 
-    df = df.drop(_schema_config[SCHEMA_DROP_COLS], axis=1)
+    # columns left out at ingestion are already gone
+    columns = [column for column in _schema_config[SCHEMA_DROP_COLS] if column in df.columns]
+
+    df = df.drop(columns, axis=1)
 
-    logging.info(f"Features droped out:{_schema_config[SCHEMA_DROP_COLS]}")
+    logging.info(f"Features droped out:{columns}")
 
     return df
\ No newline at end of file
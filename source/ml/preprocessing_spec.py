@@ -0,0 +1,169 @@
+import importlib
+import sys
+from typing import List, Optional
+
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+from source.constants.training_pipeline import (
+    CLASS_OF_MODEL,
+    MODULE_OF_MODEL,
+    PREPROCESSING_CONFIG_FILE_PATH,
+    SCHEMA_DROP_COLS,
+    TARGET_COLUMN,
+    TUNED_PARAMS_OF_MODEL,
+)
+from source.exception import BackOrderException
+from source.logger import logging
+from source.ml.pre_processing import AsType
+from source.utils import read_yaml_file
+
+
+class PreprocessingSpec:
+    """
+    Declarative preprocessing graph read from config/preprocessing.yaml.
+
+    The spec lists column groups, each with its columns, input dtype, sparse
+    or dense output and an ordered list of steps given by module, class and
+    params, plus the output dtype, parallelism and sparse threshold of the
+    whole transformer. build_preprocessor compiles it into an unfitted
+    ColumnTransformer with one Pipeline per group.
+
+    Args:
+        config (dict): Parsed preprocessing spec.
+        schema_config (dict): Parsed schema, resolving group names such as "numerical".
+
+    Methods:
+        from_file(schema_config, file_path) -> PreprocessingSpec:
+            Read the spec from a YAML file.
+
+        get_columns(group) -> List[str]:
+            Columns of a column group.
+
+        build_preprocessor() -> ColumnTransformer:
+            Compile the spec into an unfitted ColumnTransformer.
+
+    Attributes:
+        dtype: Output dtype of the transformed features.
+        n_jobs (Optional[int]): Column groups processed in parallel.
+    """
+
+    def __init__(self, config: dict, schema_config: dict):
+        """
+        Initialize the PreprocessingSpec instance.
+        """
+
+        self.config = config
+
+        self.schema_config = schema_config
+
+        output = config.get("output", {})
+
+        self.dtype = np.dtype(output.get("dtype", "float64"))
+
+        self.n_jobs: Optional[int] = output.get("n_jobs")
+
+        self.sparse_threshold: float = output.get("sparse_threshold", 0.3)
+
+        self.column_groups: List[dict] = config["column_groups"]
+
+    @classmethod
+    def from_file(
+        cls, schema_config: dict, file_path: str = PREPROCESSING_CONFIG_FILE_PATH
+    ) -> "PreprocessingSpec":
+        """
+        Read the spec from a YAML file.
+        """
+
+        try:
+            return cls(read_yaml_file(file_path), schema_config)
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def get_columns(self, group: dict) -> List[str]:
+        """
+        Columns of a column group: an explicit list, or a schema group minus
+        the drop_columns and the target, in schema group order.
+        """
+
+        columns = group["columns"]
+
+        if isinstance(columns, list):
+            return columns
+
+        excluded = set(self.schema_config[SCHEMA_DROP_COLS]) | {TARGET_COLUMN}
+
+        return [column for column in self.schema_config[columns] if column not in excluded]
+
+    def build_preprocessor(self) -> ColumnTransformer:
+        """
+        Compile the spec into an unfitted ColumnTransformer.
+        """
+
+        logging.info("Entered build_preprocessor method of PreprocessingSpec class")
+
+        try:
+            transformers = []
+
+            any_sparse = False
+
+            for group in self.column_groups:
+                steps = [(step["name"], self._build_step(step)) for step in group["steps"]]
+
+                group_dtype = group.get("dtype")
+
+                sparse = bool(group.get("sparse", False))
+
+                encoder = steps[-1][1]
+
+                if isinstance(encoder, OneHotEncoder):
+                    # the encoder writes its output dtype and sparsity directly
+                    encoder.set_params(
+                        **{_sparse_param(encoder): sparse},
+                        dtype=np.dtype(group_dtype or self.dtype).type,
+                    )
+
+                    any_sparse = any_sparse or sparse
+
+                elif group_dtype is not None:
+                    # scalers and imputers keep the float dtype they are given
+                    steps.insert(0, ("astype", AsType(dtype=group_dtype)))
+
+                columns = self.get_columns(group)
+
+                transformers.append((group["name"], Pipeline(steps), columns))
+
+                logging.info(
+                    f"Column group {group['name']}: {len(columns)} columns, "
+                    f"steps {[name for name, _ in steps]}, {'sparse' if sparse else 'dense'}"
+                )
+
+            preprocessor = ColumnTransformer(
+                transformers=transformers,
+                n_jobs=self.n_jobs,
+                # only groups declared sparse may make the output sparse
+                sparse_threshold=self.sparse_threshold if any_sparse else 0.0,
+            )
+
+            logging.info("Exited build_preprocessor method of PreprocessingSpec class")
+
+            return preprocessor
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    @staticmethod
+    def _build_step(step: dict):
+        module = importlib.import_module(step[MODULE_OF_MODEL])
+
+        step_class = getattr(module, step[CLASS_OF_MODEL])
+
+        return step_class(**(step.get(TUNED_PARAMS_OF_MODEL) or {}))
+
+
+def _sparse_param(encoder: OneHotEncoder) -> str:
+    # scikit-learn 1.2 renamed OneHotEncoder's sparse to sparse_output
+    return "sparse_output" if "sparse_output" in encoder.get_params() else "sparse"
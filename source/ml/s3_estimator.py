@@ -1,5 +1,7 @@
 import sys
+from typing import Tuple
 
+import xgboost as xgb
 from pandas import DataFrame
 
 from source.cloud_storage.aws_storage import SimpleStorageService
@@ -48,6 +50,83 @@ class BackOrderEstimator:
 
         return self.s3.load_model(self.model_path, bucket_name=self.bucket_name)
 
+    def load_model_with_etag(self,) -> Tuple[BackOrderPredictionModel, str]:
+        """
+        Load the model from the specified S3 bucket along with its ETag.
+        """
+
+        return self.s3.load_model_with_etag(self.model_path, bucket_name=self.bucket_name)
+
+    def get_model_etag(self,) -> str:
+        """
+        Get the ETag of the model stored in the specified S3 bucket.
+        """
+
+        return self.s3.get_object_etag(self.model_path, bucket_name=self.bucket_name)
+
+    def load_native_booster(self, native_model_path: str):
+        """
+        Load the native XGBoost booster exported next to the model.
+        """
+
+        return self.load_native_booster_with_etag(native_model_path)[0]
+
+    def load_native_booster_with_etag(self, native_model_path: str) -> Tuple[object, str]:
+        """
+        Load the native XGBoost booster exported next to the model along with
+        the ETag of the export that was actually read.
+        """
+
+        try:
+            raw_model, etag = self.s3.read_bytes_with_etag(
+                native_model_path, bucket_name=self.bucket_name
+            )
+
+            booster = xgb.Booster()
+
+            booster.load_model(bytearray(raw_model))
+
+            return booster, etag
+
+        except Exception as e:
+            raise BackOrderException(e, sys)
+
+    def get_native_model_etag(self, native_model_path: str) -> str:
+        """
+        Get the ETag of the native XGBoost booster export.
+        """
+
+        return self.s3.get_object_etag(native_model_path, bucket_name=self.bucket_name)
+
+    def remove_native_model(self, native_model_path: str) -> None:
+        """
+        Remove the native XGBoost booster export from the specified S3 bucket.
+        """
+
+        try:
+            self.s3.delete_object(native_model_path, bucket_name=self.bucket_name)
+
+        except Exception as e:
+            raise BackOrderException(e, sys)
+
+    def save_native_model(
+        self, from_file, native_model_path: str, remove: bool = False
+    ) -> None:
+        """
+        Save the native XGBoost booster export to the specified S3 bucket.
+        """
+
+        try:
+            self.s3.upload_file(
+                from_file,
+                to_filename=native_model_path,
+                bucket_name=self.bucket_name,
+                remove=remove,
+            )
+
+        except Exception as e:
+            raise BackOrderException(e, sys)
+
     def save_model(self, from_file, remove: bool = False) -> None:
         """
         Save the model to the specified S3 bucket.
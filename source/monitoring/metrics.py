@@ -0,0 +1,73 @@
+import time
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Histogram
+
+# process_resident_memory_bytes and the other process metrics come from the
+# default ProcessCollector registered by prometheus_client
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latency of HTTP requests by route",
+    ["method", "route", "status"],
+)
+
+PHASE_LATENCY = Histogram(
+    "pipeline_phase_duration_seconds",
+    "Latency of training and prediction pipeline phases",
+    ["pipeline", "phase"],
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 1800, 3600),
+)
+
+PHASE_FAILURES = Counter(
+    "pipeline_phase_failures_total",
+    "Number of failed training and prediction pipeline phases",
+    ["pipeline", "phase"],
+)
+
+ROWS_SCORED = Counter(
+    "prediction_rows_scored_total",
+    "Number of rows scored by the model",
+    ["source"],
+)
+
+MODEL_CACHE_REQUESTS = Counter(
+    "model_cache_requests_total",
+    "Model cache lookups by result",
+    ["result"],
+)
+
+
+@contextmanager
+def phase_timer(pipeline: str, phase: str):
+    """
+    Record the duration of a pipeline phase, and count it as failed if it raises.
+
+    Example usage:
+    ```
+    with phase_timer("prediction", "s3_read"):
+        dataframe = self.get_data()
+    ```
+    """
+
+    start = time.perf_counter()
+
+    try:
+        yield
+
+    except Exception:
+        PHASE_FAILURES.labels(pipeline, phase).inc()
+
+        raise
+
+    finally:
+        PHASE_LATENCY.labels(pipeline, phase).observe(time.perf_counter() - start)
+
+
+def record_phase(pipeline: str, phase: str, seconds: float) -> None:
+    """
+    Record a phase duration measured elsewhere, such as in a worker process
+    whose own metrics registry is never scraped.
+    """
+
+    PHASE_LATENCY.labels(pipeline, phase).observe(seconds)
@@ -0,0 +1,262 @@
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from source.exception import BackOrderException
+from source.logger import logging
+
+# profiler of the training run in progress, used by profile_step
+_active_profiler: Optional["StageProfiler"] = None
+
+
+def get_rss_bytes() -> int:
+    """
+    Current resident set size of the process, falling back to the peak RSS
+    where /proc is not available.
+    """
+
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    except (OSError, ValueError):
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class StageProfiler:
+    """
+    Records wall time, CPU time, RSS and peak RSS for each training stage and
+    the sub-steps nested in it, optionally with the top tracemalloc allocators,
+    and writes them to a JSON run report.
+
+    A background thread samples the RSS every ``sample_interval`` seconds to
+    track the peak of every open stage.
+
+    Args:
+        report_file_path (str): Location of the JSON run report.
+        trace_allocations (bool): Record the top allocators of each stage with tracemalloc.
+        top_allocations (int): Number of allocators kept per stage.
+        sample_interval (float): RSS sampling interval in seconds.
+
+    Methods:
+        activate():
+            Make this profiler the target of profile_step for the duration of a run.
+
+        stage(name: str):
+            Profile a stage, nested under the stage that is currently open.
+
+        write_report(**extra) -> str:
+            Write the JSON run report and return its path.
+
+    Example usage:
+    ```
+    profiler = StageProfiler(report_file_path)
+    with profiler.activate(), profiler.stage("data_ingestion"):
+        ...
+    profiler.write_report()
+    ```
+    """
+
+    def __init__(
+        self,
+        report_file_path: str,
+        trace_allocations: bool = False,
+        top_allocations: int = 10,
+        sample_interval: float = 0.05,
+    ):
+        """
+        Initialize the StageProfiler instance.
+        """
+
+        self.report_file_path = report_file_path
+
+        self.trace_allocations = trace_allocations
+
+        self.top_allocations = top_allocations
+
+        self.sample_interval = sample_interval
+
+        self.stages: List[Dict[str, Any]] = []
+
+        self.started_at = datetime.now().isoformat()
+
+        self._open_stages: List[Dict[str, Any]] = []
+
+        self._lock = threading.Lock()
+
+        self._stop_sampling = threading.Event()
+
+    @contextmanager
+    def activate(self):
+        """
+        Make this profiler the target of profile_step for the duration of a run.
+        """
+
+        global _active_profiler
+
+        _active_profiler = self
+
+        started_tracemalloc = self.trace_allocations and not tracemalloc.is_tracing()
+
+        if started_tracemalloc:
+            tracemalloc.start()
+
+        self._stop_sampling.clear()
+
+        sampler = threading.Thread(
+            target=self._sample_rss, name="stage-profiler", daemon=True
+        )
+
+        sampler.start()
+
+        try:
+            yield self
+
+        finally:
+            self._stop_sampling.set()
+
+            sampler.join()
+
+            if started_tracemalloc:
+                tracemalloc.stop()
+
+            _active_profiler = None
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Profile a stage, nested under the stage that is currently open.
+        """
+
+        rss = get_rss_bytes()
+
+        record: Dict[str, Any] = {
+            "name": name,
+            "status": "running",
+            "rss_start_bytes": rss,
+            "peak_rss_bytes": rss,
+            "steps": [],
+        }
+
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+
+        with self._lock:
+            parent = self._open_stages[-1]["steps"] if self._open_stages else self.stages
+
+            parent.append(record)
+
+            self._open_stages.append(record)
+
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+
+        try:
+            yield record
+
+            record["status"] = "succeeded"
+
+        except Exception:
+            record["status"] = "failed"
+
+            raise
+
+        finally:
+            record["wall_time_s"] = time.perf_counter() - wall_start
+
+            record["cpu_time_s"] = time.process_time() - cpu_start
+
+            record["rss_end_bytes"] = get_rss_bytes()
+
+            if snapshot is not None and tracemalloc.is_tracing():
+                record["top_allocations"] = self._top_allocations(snapshot)
+
+            with self._lock:
+                record["peak_rss_bytes"] = max(
+                    record["peak_rss_bytes"], record["rss_end_bytes"]
+                )
+
+                self._open_stages.remove(record)
+
+            logging.info(
+                f"Stage {name} {record['status']} in {record['wall_time_s']:.2f}s wall, "
+                f"{record['cpu_time_s']:.2f}s cpu, peak rss {record['peak_rss_bytes']} bytes"
+            )
+
+    def write_report(self, **extra) -> str:
+        """
+        Write the JSON run report and return its path.
+        """
+
+        try:
+            report = {
+                "started_at": self.started_at,
+                "finished_at": datetime.now().isoformat(),
+                "trace_allocations": self.trace_allocations,
+                **extra,
+                "stages": self.stages,
+            }
+
+            os.makedirs(os.path.dirname(self.report_file_path), exist_ok=True)
+
+            with open(self.report_file_path, "w") as report_file:
+                json.dump(report, report_file, indent=2, default=str)
+
+            logging.info(f"Run report written to {self.report_file_path}")
+
+            return self.report_file_path
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def _top_allocations(self, start_snapshot) -> List[Dict[str, Any]]:
+        statistics = tracemalloc.take_snapshot().compare_to(start_snapshot, "lineno")
+
+        return [
+            {
+                "location": str(statistic.traceback),
+                "size_diff_bytes": statistic.size_diff,
+                "count_diff": statistic.count_diff,
+            }
+            for statistic in statistics[: self.top_allocations]
+        ]
+
+    def _sample_rss(self) -> None:
+        while not self._stop_sampling.wait(self.sample_interval):
+            rss = get_rss_bytes()
+
+            with self._lock:
+                for record in self._open_stages:
+                    if rss > record["peak_rss_bytes"]:
+                        record["peak_rss_bytes"] = rss
+
+
+@contextmanager
+def profile_step(name: str):
+    """
+    Profile a sub-step under the current stage of the active training run
+    profiler. Does nothing when no profiler is active.
+
+    Example usage:
+    ```
+    with profile_step("fit_transform"):
+        input_feature_train_arr = preprocessor.fit_transform(input_feature_train_df)
+    ```
+    """
+
+    profiler = _active_profiler
+
+    if profiler is None:
+        yield None
+
+    else:
+        with profiler.stage(name) as record:
+            yield record
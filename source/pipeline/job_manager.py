@@ -0,0 +1,172 @@
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from source.constants.application import JOB_HISTORY_SIZE, JOB_MAX_WORKERS
+from source.exception import BackOrderException
+from source.logger import logging
+
+JOB_PENDING = "pending"
+
+JOB_RUNNING = "running"
+
+JOB_SUCCEEDED = "succeeded"
+
+JOB_FAILED = "failed"
+
+
+@dataclass
+class Job:
+    job_id: str
+
+    kind: str
+
+    status: str
+
+    submitted_at: str
+
+    started_at: Optional[str] = None
+
+    finished_at: Optional[str] = None
+
+    result: Any = None
+
+    error: Optional[str] = None
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in (JOB_PENDING, JOB_RUNNING)
+
+    def to_dict(self) -> Dict[str, Any]:
+        job = asdict(self)
+
+        job.pop("result")
+
+        return job
+
+
+class JobManager:
+    """
+    JobManager runs long pipelines such as training and batch prediction
+    on a worker pool so they never block the API event loop.
+
+    Jobs are single-flight per kind: while a job of a given kind is pending
+    or running, submitting another one returns the active job instead of
+    starting a second run on the same artifact paths.
+
+    Methods:
+        submit(kind, func) -> Job:
+            Submit a job, or return the active job of the same kind.
+
+        get_job(job_id) -> Optional[Job]:
+            Return the job with the given id.
+
+    Example usage:
+    ```
+    job = job_manager.submit("train", TrainPipeline().run_pipeline)
+    job_manager.get_job(job.job_id).status
+    ```
+    """
+
+    def __init__(
+        self, max_workers: int = JOB_MAX_WORKERS, history_size: int = JOB_HISTORY_SIZE
+    ):
+        """
+        Initialize the JobManager instance.
+        """
+
+        self.history_size = history_size
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="pipeline-job"
+        )
+
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+        self._active_jobs: Dict[str, str] = {}
+
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, func: Callable[[], Any]) -> Job:
+        """
+        Submit a job, or return the active job of the same kind.
+        """
+
+        try:
+            with self._lock:
+                active_job_id = self._active_jobs.get(kind)
+
+                if active_job_id is not None:
+                    logging.info(f"{kind} job {active_job_id} already active")
+
+                    return self._jobs[active_job_id]
+
+                job = Job(
+                    job_id=uuid.uuid4().hex,
+                    kind=kind,
+                    status=JOB_PENDING,
+                    submitted_at=datetime.now().isoformat(),
+                )
+
+                self._jobs[job.job_id] = job
+
+                self._active_jobs[kind] = job.job_id
+
+                self._evict_finished_jobs()
+
+            logging.info(f"Submitted {kind} job {job.job_id}")
+
+            self._executor.submit(self._run, job, func)
+
+            return job
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        """
+        Return the job with the given id.
+        """
+
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job, func: Callable[[], Any]) -> None:
+        job.status = JOB_RUNNING
+
+        job.started_at = datetime.now().isoformat()
+
+        logging.info(f"Started {job.kind} job {job.job_id}")
+
+        try:
+            job.result = func()
+
+            job.status = JOB_SUCCEEDED
+
+        except Exception as e:
+            job.error = str(e)
+
+            job.status = JOB_FAILED
+
+        finally:
+            job.finished_at = datetime.now().isoformat()
+
+            with self._lock:
+                if self._active_jobs.get(job.kind) == job.job_id:
+                    del self._active_jobs[job.kind]
+
+            logging.info(f"Finished {job.kind} job {job.job_id} with status {job.status}")
+
+    def _evict_finished_jobs(self) -> None:
+        # caller holds self._lock
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.history_size:
+                break
+
+            if not self._jobs[job_id].is_active:
+                del self._jobs[job_id]
@@ -0,0 +1,219 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from source.constants.training_pipeline import (
+    SCHEMA_DROP_COLS,
+    SCHEMA_FILE_PATH,
+    TARGET_COLUMN,
+)
+from source.entity.config_entity import PredictionPipelineConfig
+from source.exception import BackOrderException
+from source.logger import logging
+from source.ml.model_cache import ModelCache
+from source.monitoring.metrics import ROWS_SCORED, phase_timer
+from source.utils import read_yaml_file
+
+
+class OnlinePredictionPipeline:
+    """
+    OnlinePredictionPipeline scores back-order rows sent to the API.
+
+    Concurrent requests are queued and merged into a single vectorized
+    call to the model once either ``online_max_batch_size`` rows are waiting
+    or ``online_max_wait_ms`` has passed since the first queued request.
+    Scoring runs on a dedicated worker thread so the event loop stays free.
+    When a merged batch fails, its requests are scored one by one, so a
+    malformed request only fails its own caller.
+
+    Attributes:
+        prediction_pipeline_config (PredictionPipelineConfig):
+            Configuration for the prediction pipeline.
+
+    Methods:
+        build_dataframe(rows):
+            Validate the incoming rows against the schema and build a DataFrame.
+
+        score(dataframe):
+            Queue a DataFrame for scoring and wait for its predictions.
+
+    """
+
+    def __init__(
+        self,
+        prediction_pipeline_config: PredictionPipelineConfig = PredictionPipelineConfig(),
+    ) -> None:
+        """
+        Initialize the OnlinePredictionPipeline.
+        """
+
+        try:
+            self.prediction_pipeline_config = prediction_pipeline_config
+
+            self._schema_config = read_yaml_file(file_path=SCHEMA_FILE_PATH)
+
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="online-scoring"
+            )
+
+            self._queue: Optional[asyncio.Queue] = None
+
+            self._worker: Optional[asyncio.Task] = None
+
+        except Exception as e:
+            raise BackOrderException(e, sys)
+
+    @property
+    def required_columns(self) -> List[str]:
+        drop_cols = set(self._schema_config[SCHEMA_DROP_COLS]) | {TARGET_COLUMN}
+
+        return [
+            list(column.keys())[0]
+            for column in self._schema_config["columns"]
+            if list(column.keys())[0] not in drop_cols
+        ]
+
+    def build_dataframe(self, rows: List[Dict[str, Any]]) -> DataFrame:
+        """
+        Validate the incoming rows against the schema and build a DataFrame.
+        """
+
+        if len(rows) == 0:
+            raise ValueError("At least one row is required")
+
+        dataframe = DataFrame(rows)
+
+        missing_columns = [
+            column for column in self.required_columns if column not in dataframe.columns
+        ]
+
+        if missing_columns:
+            raise ValueError(f"Missing columns: {missing_columns}")
+
+        dataframe = dataframe.replace({"na": np.nan})
+
+        numerical_cols = [
+            column
+            for column in self._schema_config["numerical"]
+            if column in dataframe.columns
+        ]
+
+        dataframe[numerical_cols] = dataframe[numerical_cols].astype(float)
+
+        return dataframe
+
+    async def score(self, dataframe: DataFrame) -> DataFrame:
+        """
+        Queue a DataFrame for scoring and wait for its predictions.
+        Returns a DataFrame with ``class`` and ``probability`` columns.
+        """
+
+        loop = asyncio.get_running_loop()
+
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+
+            self._worker = loop.create_task(self._run())
+
+        future = loop.create_future()
+
+        await self._queue.put((dataframe, future))
+
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        max_batch_size = self.prediction_pipeline_config.online_max_batch_size
+
+        max_wait = self.prediction_pipeline_config.online_max_wait_ms / 1000
+
+        while True:
+            batch = [await self._queue.get()]
+
+            n_rows = len(batch[0][0])
+
+            deadline = loop.time() + max_wait
+
+            while n_rows < max_batch_size:
+                timeout = deadline - loop.time()
+
+                if timeout <= 0:
+                    break
+
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+
+                except asyncio.TimeoutError:
+                    break
+
+                batch.append(item)
+
+                n_rows += len(item[0])
+
+            await self._score_batch(batch)
+
+    async def _score_batch(self, batch: List[Tuple[DataFrame, asyncio.Future]]) -> None:
+        loop = asyncio.get_running_loop()
+
+        try:
+            dataframe = pd.concat([frame for frame, _ in batch], ignore_index=True)
+
+            logging.info(
+                f"Scoring micro-batch of {len(batch)} requests and {len(dataframe)} rows"
+            )
+
+            result = await loop.run_in_executor(self._executor, self._predict, dataframe)
+
+        except Exception as e:
+            if len(batch) == 1:
+                if not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+
+                return
+
+            # one malformed request fails the merged batch, each request is
+            # scored on its own so only the bad one gets the error
+            logging.info(
+                f"Micro-batch of {len(batch)} requests failed, scoring them one by one: {e}"
+            )
+
+            for item in batch:
+                await self._score_batch([item])
+
+            return
+
+        offset = 0
+
+        for frame, future in batch:
+            if not future.done():
+                future.set_result(
+                    result.iloc[offset : offset + len(frame)].reset_index(drop=True)
+                )
+
+            offset += len(frame)
+
+    def _predict(self, dataframe: DataFrame) -> DataFrame:
+        try:
+            with phase_timer("online_prediction", "model_load"):
+                model = ModelCache.from_config(self.prediction_pipeline_config).get_model()
+
+            with phase_timer("online_prediction", "preprocess"):
+                transformed_feature = model.transform(dataframe)
+
+            with phase_timer("online_prediction", "predict"):
+                probabilities = model.predict_proba_transformed(transformed_feature)
+
+            ROWS_SCORED.labels("online").inc(len(dataframe))
+
+            labels = model.get_original_labels(probabilities.argmax(axis=1))
+
+            return DataFrame({"class": labels, "probability": probabilities[:, -1]})
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
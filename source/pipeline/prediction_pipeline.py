@@ -1,18 +1,58 @@
+import multiprocessing
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 from pandas import DataFrame
 
 from source.cloud_storage.aws_storage import SimpleStorageService
-from source.constants.training_pipeline import SCHEMA_FILE_PATH
+from source.constants.prediction_pipeline import PREDICTION_ID_COLUMNS
+from source.constants.training_pipeline import SCHEMA_DROP_COLS, SCHEMA_FILE_PATH
 from source.entity.config_entity import PredictionPipelineConfig
 from source.exception import BackOrderException
 from source.logger import logging
-from source.ml.s3_estimator import BackOrderEstimator
+from source.ml.model_cache import ModelCache
+from source.monitoring.metrics import ROWS_SCORED, phase_timer, record_phase
 from source.utils import read_yaml_file
 from source.ml.pre_processing import drop_columns
 
+# model held by each prediction worker process, set once by the pool initializer
+_worker_model = None
+
+
+def _init_prediction_worker(model) -> None:
+    global _worker_model
+
+    # one thread per process, the pool already uses every core
+    model.set_nthread(1)
+
+    _worker_model = model
+
+
+def _predict_shard(dataframe: DataFrame) -> Tuple[np.ndarray, float, float]:
+    # phases are timed here and recorded by the parent, the metrics of a worker
+    # process never reach the scraped registry
+    start = time.perf_counter()
+
+    transformed_feature = _worker_model.transform(dataframe)
+
+    preprocessed = time.perf_counter()
+
+    predicted_arr = _worker_model.predict_transformed(transformed_feature)
+
+    predicted = time.perf_counter()
+
+    return (
+        _worker_model.get_original_labels(predicted_arr),
+        preprocessed - start,
+        predicted - preprocessed,
+    )
+
 
 class PredictionPipeline:
     """
@@ -30,7 +70,7 @@ class PredictionPipeline:
             Retrieve prediction data from an S3 bucket.
 
         get_model():
-            Load the prediction model from an S3 bucket.
+            Get the prediction model from the process-wide model cache.
 
         predict(model, dataframe):
             Make predictions using the provided model and input data.
@@ -38,9 +78,24 @@ class PredictionPipeline:
         get_labels(model, prediction_array):
             Get the original labels from the model.
 
+        get_input_columns():
+            Columns read from columnar input, skipping the unused drop_columns.
+
+        get_data_chunks():
+            Stream prediction data from an S3 bucket in chunks of rows.
+
+        predict_labels(model, dataframe):
+            Predict the original labels, sharding across worker processes when enabled.
+
+        predict_chunk(model, dataframe):
+            Append the predicted labels of one chunk as a class column.
+
         initiate_prediction():
             Initiate the prediction pipeline.
 
+        initiate_streaming_prediction():
+            Initiate the prediction pipeline in bounded memory, chunk by chunk.
+
     """
 
     def __init__(
@@ -57,8 +112,12 @@ class PredictionPipeline:
 
             self.s3 = SimpleStorageService()
 
+            self._schema_config = read_yaml_file(file_path=SCHEMA_FILE_PATH)
+
+            self._executor: Optional[ProcessPoolExecutor] = None
+
         except Exception as e:
-            raise (BackOrderException, sys)
+            raise BackOrderException(e, sys)
 
     def get_data(self) -> DataFrame:
         """
@@ -67,13 +126,23 @@ class PredictionPipeline:
         try:
             logging.info("Entered get_data method of PredictionPipeline class")
 
-            prediction_df = self.s3.read_csv(
-                filename=self.prediction_pipeline_config.data_file_path,
-                bucket_name=self.prediction_pipeline_config.data_bucket_name,
+            if self.prediction_pipeline_config.file_format == "parquet":
+                prediction_df = self.s3.read_parquet(
+                    filename=self.prediction_pipeline_config.data_file_path,
+                    bucket_name=self.prediction_pipeline_config.data_bucket_name,
+                    columns=self.get_input_columns(),
+                )
+
+            else:
+                prediction_df = self.s3.read_csv(
+                    filename=self.prediction_pipeline_config.data_file_path,
+                    bucket_name=self.prediction_pipeline_config.data_bucket_name,
+                )
+
+            logging.info(
+                f"Read prediction {self.prediction_pipeline_config.file_format} file from s3 bucket"
             )
 
-            logging.info("Read prediction csv file from s3 bucket")
-
             logging.info(f"prediction_df \n\n:{prediction_df}")
 
             # prediction_df = drop_columns(prediction_df)
@@ -87,20 +156,59 @@ class PredictionPipeline:
         except Exception as e:
             raise BackOrderException(e, sys)
         
-    def get_model(self) -> object:
+    def get_input_columns(self) -> List[str]:
+        """
+        Columns read from columnar input: every schema column except the
+        drop_columns the model never uses, keeping the identifier columns.
+        """
+
+        skipped_columns = set(self._schema_config[SCHEMA_DROP_COLS]) - set(
+            PREDICTION_ID_COLUMNS
+        )
+
+        return [
+            list(column.keys())[0]
+            for column in self._schema_config["columns"]
+            if list(column.keys())[0] not in skipped_columns
+        ]
+
+    def get_data_chunks(self) -> Iterator[DataFrame]:
         """
-        Load the prediction model from an S3 bucket.
+        Stream prediction data from an S3 bucket in chunks of rows.
         """
 
         try:
-            logging.info("Entered predict method of PredictionPipeline class")
+            logging.info("Entered get_data_chunks method of PredictionPipeline class")
+
+            if self.prediction_pipeline_config.file_format == "parquet":
+                return self.s3.read_parquet_chunks(
+                    filename=self.prediction_pipeline_config.data_file_path,
+                    bucket_name=self.prediction_pipeline_config.data_bucket_name,
+                    chunksize=self.prediction_pipeline_config.chunk_size,
+                    columns=self.get_input_columns(),
+                )
 
-            back_order_estimator = BackOrderEstimator(
-                bucket_name=self.prediction_pipeline_config.model_bucket_name,
-                model_path=self.prediction_pipeline_config.model_file_path,
+            return self.s3.read_csv_chunks(
+                filename=self.prediction_pipeline_config.data_file_path,
+                bucket_name=self.prediction_pipeline_config.data_bucket_name,
+                chunksize=self.prediction_pipeline_config.chunk_size,
             )
 
-            model = back_order_estimator.load_model()
+        except Exception as e:
+            raise BackOrderException(e, sys)
+
+    def get_model(self) -> object:
+        """
+        Get the prediction model from the process-wide model cache.
+        The model is only downloaded from S3 on first use or when its ETag changes.
+        """
+
+        try:
+            logging.info("Entered get_model method of PredictionPipeline class")
+
+            model_cache = ModelCache.from_config(self.prediction_pipeline_config)
+
+            model = model_cache.get_model()
             return model
             
         except Exception as e:
@@ -114,7 +222,11 @@ class PredictionPipeline:
         try:
             logging.info("Entered predict method of PredictionPipeline class")
 
-            return model.predict(dataframe)
+            with phase_timer("prediction", "preprocess"):
+                transformed_feature = model.transform(dataframe)
+
+            with phase_timer("prediction", "predict"):
+                return model.predict_transformed(transformed_feature)
 
         except Exception as e:
             raise BackOrderException(e, sys)
@@ -133,35 +245,172 @@ class PredictionPipeline:
             raise BackOrderException(e, sys)
 
 
-    def initiate_prediction(self,) -> None:
+    @contextmanager
+    def worker_pool(self, model):
         """
-        Initiate the prediction pipeline.
+        Start the prediction worker processes for the duration of a run.
+        Each worker receives the model once through the pool initializer.
         """
-        
+
+        n_jobs = self.prediction_pipeline_config.n_jobs
+
+        if n_jobs == -1:
+            n_jobs = os.cpu_count()
+
+        if n_jobs <= 1:
+            yield
+            return
+
+        logging.info(f"Starting {n_jobs} prediction worker processes")
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=n_jobs,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_prediction_worker,
+            initargs=(model,),
+        )
+
         try:
-            logging.info("Starting prediction pipeline")
+            yield
 
-            dataframe = self.get_data()
-            
-            model = self.get_model()
+        finally:
+            self._executor.shutdown()
 
-            predicted_arr = self.predict(model,dataframe)
+            self._executor = None
 
-            predicted_labels = self.get_labels(model,predicted_arr)
+    def predict_labels(self, model, dataframe: DataFrame) -> np.ndarray:
+        """
+        Predict the original labels, sharding the rows across the worker
+        processes when a worker pool is running. Shards are scored in parallel
+        and reassembled in their original order.
+        """
 
-            prediction = pd.DataFrame(list(predicted_labels))
+        try:
+            shard_size = self.prediction_pipeline_config.shard_size
 
-            prediction.columns = ["class"]
+            if self._executor is None or len(dataframe) <= shard_size:
+                predicted_arr = self.predict(model, dataframe)
 
-            predicted_dataframe = pd.concat([dataframe, prediction], axis=1)
+                return self.get_labels(model, predicted_arr)
 
-            self.s3.upload_df_as_csv(
-                predicted_dataframe,
-                self.prediction_pipeline_config.output_file_name,
-                self.prediction_pipeline_config.output_file_name,
-                self.prediction_pipeline_config.data_bucket_name,
+            shards = (
+                dataframe.iloc[start : start + shard_size]
+                for start in range(0, len(dataframe), shard_size)
             )
 
+            predicted_labels = []
+
+            for labels, preprocess_seconds, predict_seconds in self._executor.map(
+                _predict_shard, shards
+            ):
+                record_phase("prediction", "preprocess", preprocess_seconds)
+
+                record_phase("prediction", "predict", predict_seconds)
+
+                predicted_labels.append(labels)
+
+            return np.concatenate(predicted_labels)
+
+        except Exception as e:
+            raise BackOrderException(e, sys)
+
+    def predict_chunk(self, model, dataframe: DataFrame) -> DataFrame:
+        """
+        Append the predicted labels of one chunk as a class column.
+        """
+
+        try:
+            predicted_labels = self.predict_labels(model, dataframe)
+
+            ROWS_SCORED.labels("batch").inc(len(dataframe))
+
+            return dataframe.assign(**{"class": predicted_labels})
+
+        except Exception as e:
+            raise BackOrderException(e, sys)
+
+    @staticmethod
+    def _timed_chunks(data_frames: Iterator[DataFrame]) -> Iterator[DataFrame]:
+        # time each chunk read separately, scoring and upload interleave with it
+        data_frames = iter(data_frames)
+
+        while True:
+            with phase_timer("prediction", "s3_read"):
+                dataframe = next(data_frames, None)
+
+            if dataframe is None:
+                return
+
+            yield dataframe
+
+    def initiate_streaming_prediction(self,) -> None:
+        """
+        Initiate the prediction pipeline in bounded memory: the input is read
+        from S3 in chunks, each chunk is scored and streamed back to S3 through
+        a multipart upload, so only a few chunks are held in memory at a time.
+        """
+
+        try:
+            logging.info("Starting streaming prediction pipeline")
+
+            with phase_timer("prediction", "model_load"):
+                model = self.get_model()
+
+            predicted_chunks = (
+                self.predict_chunk(model, dataframe)
+                for dataframe in self._timed_chunks(self.get_data_chunks())
+            )
+
+            with self.worker_pool(model):
+                upload_chunks = (
+                    self.s3.upload_df_chunks_as_parquet
+                    if self.prediction_pipeline_config.file_format == "parquet"
+                    else self.s3.upload_df_chunks_as_csv
+                )
+
+                upload_chunks(
+                    predicted_chunks,
+                    self.prediction_pipeline_config.output_key,
+                    self.prediction_pipeline_config.data_bucket_name,
+                    compression=self.prediction_pipeline_config.output_compression,
+                    # chunks are scored while the parts upload, so each part is timed
+                    part_timer=lambda: phase_timer("prediction", "upload"),
+                )
+
+            logging.info(f"Exiting streaming prediction pipeline")
+
+        except Exception as e:
+            raise BackOrderException(e, sys)
+
+    def initiate_prediction(self,) -> None:
+        """
+        Initiate the prediction pipeline.
+        """
+        
+        try:
+            if self.prediction_pipeline_config.streaming:
+                return self.initiate_streaming_prediction()
+
+            logging.info("Starting prediction pipeline")
+
+            with phase_timer("prediction", "s3_read"):
+                dataframe = self.get_data()
+
+            with phase_timer("prediction", "model_load"):
+                model = self.get_model()
+
+            with self.worker_pool(model):
+                predicted_dataframe = self.predict_chunk(model, dataframe)
+
+            with phase_timer("prediction", "upload"):
+                self.s3.upload_df(
+                    predicted_dataframe,
+                    self.prediction_pipeline_config.output_key,
+                    self.prediction_pipeline_config.data_bucket_name,
+                    compression=self.prediction_pipeline_config.output_compression,
+                    file_format=self.prediction_pipeline_config.file_format,
+                )
+
             logging.info("Uploaded artifacts folder to s3 bucket_name")
 
             logging.info(f"File has uploaded to\n\n {predicted_dataframe}")
@@ -0,0 +1,376 @@
+"""
+Content-addressed cache of training pipeline stage outputs.
+
+A stage entry is keyed by a fingerprint of everything the stage reads: the
+content of its input datasets and artifacts, the config files it depends on,
+its settings, the version of the code and the versions of the libraries that
+fit and pickle the artifacts. Entries live under one cache
+directory shared by all runs, and the least recently used ones are evicted
+once the cache grows past its size limit.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+from importlib import metadata
+from typing import Dict, Iterable, List, Optional
+
+import source
+from source.constants.training_pipeline import (
+    FEATURE_STORE_MANIFEST_FILE_NAME,
+    STAGE_CACHE_LIBRARIES,
+)
+from source.exception import BackOrderException
+from source.logger import logging
+
+ENTRY_FILE_NAME = "entry.json"
+
+HASH_CHUNK_BYTES = 1 << 20
+
+
+def file_digest(file_path: str, digest=None):
+    """
+    Feed the content of a file into digest, a new sha256 by default, and return it.
+    """
+
+    digest = hashlib.sha256() if digest is None else digest
+
+    with open(file_path, "rb") as file_obj:
+        for chunk in iter(lambda: file_obj.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+
+    return digest
+
+
+def path_digest(path: str) -> str:
+    """
+    Hex digest of a file, or of every file below a directory. The manifest of
+    a feature store dataset holds its creation time, so it is left out and two
+    datasets with the same partitions have the same digest.
+    """
+
+    digest = hashlib.sha256()
+
+    if not os.path.isdir(path):
+        return file_digest(path, digest).hexdigest()
+
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+
+        for file_name in sorted(files):
+            if file_name == FEATURE_STORE_MANIFEST_FILE_NAME:
+                continue
+
+            file_path = os.path.join(root, file_name)
+
+            digest.update(os.path.relpath(file_path, path).encode())
+
+            file_digest(file_path, digest)
+
+    return digest.hexdigest()
+
+
+_code_version: Optional[str] = None
+
+
+def code_version() -> str:
+    """
+    Digest of the Python sources of the source package, computed once per process.
+    """
+
+    global _code_version
+
+    if _code_version is None:
+        digest = hashlib.sha256()
+
+        package_dir = os.path.dirname(os.path.abspath(source.__file__))
+
+        for root, dirs, files in os.walk(package_dir):
+            dirs.sort()
+
+            for file_name in sorted(files):
+                if file_name.endswith(".py"):
+                    file_path = os.path.join(root, file_name)
+
+                    digest.update(os.path.relpath(file_path, package_dir).encode())
+
+                    file_digest(file_path, digest)
+
+        _code_version = digest.hexdigest()
+
+    return _code_version
+
+
+def library_versions() -> Dict[str, Optional[str]]:
+    """
+    Installed version of each library in STAGE_CACHE_LIBRARIES, None when it is not installed.
+    """
+
+    versions = {}
+
+    for library in STAGE_CACHE_LIBRARIES:
+        try:
+            versions[library] = metadata.version(library)
+
+        except metadata.PackageNotFoundError:
+            versions[library] = None
+
+    return versions
+
+
+class StageCache:
+    """
+    On-disk cache of stage artifacts, addressed by input fingerprint.
+
+    Each entry is a directory <cache_dir>/<stage>/<key> holding a copy of the
+    artifact files and an entry.json with the artifact's other values and the
+    last time the entry was used. Entries are written to a temporary directory
+    and renamed into place, so a reader never sees a partial entry.
+
+    Args:
+        cache_dir (str): Root directory of the cache.
+        max_size_bytes (int): Size above which least recently used entries are evicted.
+        enabled (bool): When False, lookups always miss and nothing is stored.
+
+    Methods:
+        fingerprint(stage, paths, values) -> str:
+            Key of a stage run from its input paths and settings.
+
+        load(stage, key, destinations) -> Optional[dict]:
+            Copy the files of a cached entry to their destinations and return its values.
+
+        store(stage, key, files, values):
+            Store the files and values of a finished stage run.
+
+        evict():
+            Remove least recently used entries until the cache fits its size limit.
+    """
+
+    def __init__(self, cache_dir: str, max_size_bytes: int, enabled: bool = True):
+        """
+        Initialize the StageCache instance.
+        """
+
+        self.cache_dir = cache_dir
+
+        self.max_size_bytes = max_size_bytes
+
+        self.enabled = enabled
+
+    def fingerprint(
+        self,
+        stage: str,
+        paths: Iterable[Optional[str]] = (),
+        values: Optional[dict] = None,
+    ) -> str:
+        """
+        Key of a stage run: digest of the stage name, the code and library
+        versions, the content of the input paths and the stage settings.
+        None stands for an absent optional input, any other path that does
+        not exist raises FileNotFoundError instead of being left out of the key.
+        """
+
+        try:
+            paths = list(paths)
+
+            missing_paths = [
+                path for path in paths if path is not None and not os.path.exists(path)
+            ]
+
+            if missing_paths:
+                raise FileNotFoundError(f"Missing inputs of stage {stage}: {missing_paths}")
+
+            inputs = {
+                "stage": stage,
+                "code_version": code_version(),
+                "library_versions": library_versions(),
+                "paths": [path_digest(path) for path in paths if path is not None],
+                "values": values or {},
+            }
+
+            return hashlib.sha256(
+                json.dumps(inputs, sort_keys=True, default=str).encode()
+            ).hexdigest()
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def load(self, stage: str, key: str, destinations: Dict[str, str]) -> Optional[dict]:
+        """
+        Copy the files of the entry for key to destinations, a mapping of
+        artifact field to file path whose extension is replaced by the one
+        the file was stored with, and return the stored values with the
+        fields pointing at the copies. Return None on a miss.
+        """
+
+        try:
+            if not self.enabled:
+                return None
+
+            entry_dir = self._entry_dir(stage, key)
+
+            entry = self._read_entry(entry_dir)
+
+            if entry is None:
+                logging.info(f"Stage cache miss for {stage} ({key[:12]})")
+
+                return None
+
+            values = dict(entry["values"])
+
+            for field, file_name in entry["files"].items():
+                # the copy keeps the extension it was stored with, e.g. .npz for sparse arrays
+                destination = (
+                    os.path.splitext(destinations[field])[0] + os.path.splitext(file_name)[1]
+                )
+
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+
+                shutil.copyfile(os.path.join(entry_dir, file_name), destination)
+
+                values[field] = destination
+
+            entry["last_used"] = time.time()
+
+            self._write_entry(entry_dir, entry)
+
+            logging.info(f"Stage cache hit for {stage} ({key[:12]})")
+
+            return values
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def store(
+        self, stage: str, key: str, files: Dict[str, str], values: Optional[dict] = None
+    ) -> None:
+        """
+        Store a copy of files, a mapping of artifact field to file path, and
+        the other artifact values under key, then evict old entries.
+        """
+
+        try:
+            if not self.enabled:
+                return
+
+            entry_dir = self._entry_dir(stage, key)
+
+            if self._read_entry(entry_dir) is not None:
+                return
+
+            staging_dir = f"{entry_dir}.{uuid.uuid4().hex}.tmp"
+
+            os.makedirs(staging_dir)
+
+            entry = {
+                "stage": stage,
+                "key": key,
+                "files": {},
+                "values": values or {},
+                "size_bytes": 0,
+                "created_at": time.time(),
+                "last_used": time.time(),
+            }
+
+            for field, file_path in files.items():
+                file_name = f"{field}{os.path.splitext(file_path)[1]}"
+
+                shutil.copyfile(file_path, os.path.join(staging_dir, file_name))
+
+                entry["files"][field] = file_name
+
+                entry["size_bytes"] += os.path.getsize(file_path)
+
+            self._write_entry(staging_dir, entry)
+
+            try:
+                os.replace(staging_dir, entry_dir)
+
+            except OSError:
+                # another run stored the same entry first
+                shutil.rmtree(staging_dir, ignore_errors=True)
+
+            logging.info(
+                f"Stored {stage} outputs in stage cache ({key[:12]}, {entry['size_bytes']} bytes)"
+            )
+
+            self.evict()
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def evict(self) -> List[str]:
+        """
+        Remove least recently used entries until the cache fits max_size_bytes
+        and return the removed entry directories.
+        """
+
+        try:
+            entries = []
+
+            for entry_dir in self._entry_dirs():
+                entry = self._read_entry(entry_dir)
+
+                if entry is not None:
+                    entries.append((entry["last_used"], entry["size_bytes"], entry_dir))
+
+            total_size = sum(size_bytes for _, size_bytes, _ in entries)
+
+            evicted = []
+
+            for _, size_bytes, entry_dir in sorted(entries):
+                if total_size <= self.max_size_bytes:
+                    break
+
+                shutil.rmtree(entry_dir, ignore_errors=True)
+
+                total_size -= size_bytes
+
+                evicted.append(entry_dir)
+
+            if evicted:
+                logging.info(
+                    f"Evicted {len(evicted)} stage cache entries, {total_size} bytes left"
+                )
+
+            return evicted
+
+        except Exception as e:
+            raise BackOrderException(e, sys) from e
+
+    def _entry_dir(self, stage: str, key: str) -> str:
+        return os.path.join(self.cache_dir, stage, key)
+
+    def _entry_dirs(self) -> List[str]:
+        if not os.path.isdir(self.cache_dir):
+            return []
+
+        return [
+            os.path.join(self.cache_dir, stage, key)
+            for stage in os.listdir(self.cache_dir)
+            if os.path.isdir(os.path.join(self.cache_dir, stage))
+            for key in os.listdir(os.path.join(self.cache_dir, stage))
+            if not key.endswith(".tmp")
+        ]
+
+    @staticmethod
+    def _read_entry(entry_dir: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(entry_dir, ENTRY_FILE_NAME)) as entry_file:
+                return json.load(entry_file)
+
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_entry(entry_dir: str, entry: dict) -> None:
+        entry_file_path = os.path.join(entry_dir, ENTRY_FILE_NAME)
+
+        with open(entry_file_path + ".tmp", "w") as entry_file:
+            json.dump(entry, entry_file, indent=2)
+
+        os.replace(entry_file_path + ".tmp", entry_file_path)
@@ -1,4 +1,7 @@
 import sys
+from contextlib import contextmanager
+from dataclasses import asdict, fields
+from typing import Optional, Tuple
 
 from source.components.data_ingestion import DataIngestion
 from source.components.data_transformation import DataTransformation
@@ -6,11 +9,14 @@ from source.components.data_validation import DataValidation
 from source.components.model_evaluation import ModelEvaluation
 from source.components.model_pusher import ModelPusher
 from source.components.model_trainer import ModelTrainer
+from source.constants.training_pipeline import SCHEMA_FILE_PATH
 from source.entity.artifact_entity import (
+    ClassificationMetricArtifact,
     DataIngestionArtifact,
     DataTransformationArtifact,
     DataValidationArtifact,
     ModelEvaluationArtifact,
+    ModelPusherArtifact,
     ModelTrainerArtifact,
 )
 from source.entity.config_entity import (
@@ -20,9 +26,40 @@ from source.entity.config_entity import (
     ModelEvaluationConfig,
     ModelPusherConfig,
     ModelTrainerConfig,
+    ProfilerConfig,
+    StageCacheConfig,
+    training_pipeline_config,
 )
 from source.exception import BackOrderException
 from source.logger import logging
+from source.monitoring.metrics import phase_timer
+from source.monitoring.profiler import StageProfiler
+from source.pipeline.stage_cache import StageCache
+
+
+def _is_path_field(name: str) -> bool:
+    return name.endswith(("_path", "_dir"))
+
+
+def _settings(config) -> dict:
+    # every config value except the paths, which change with each run's artifact dir
+    return {
+        field: value for field, value in asdict(config).items() if not _is_path_field(field)
+    }
+
+
+def _split_artifact(artifact) -> Tuple[dict, dict]:
+    # artifact files to cache, and the remaining artifact values
+    files, values = {}, {}
+
+    for field, value in asdict(artifact).items():
+        if not _is_path_field(field):
+            values[field] = value
+
+        elif value is not None:
+            files[field] = value
+
+    return files, values
 
 
 class TrainPipeline:
@@ -51,8 +88,9 @@ class TrainPipeline:
         start_model_pusher(model_trainer_artifact: ModelTrainerArtifact):
             Start the model pushing process.
 
-        run_pipeline():
-            Run the entire training pipeline.
+        run_pipeline() -> Optional[ModelPusherArtifact]:
+            Run the entire training pipeline and return the model pusher artifact,
+            or None if the trained model was not accepted.
 
     Attributes:
         data_ingestion_config (DataIngestionConfig): Data ingestion configuration.
@@ -61,6 +99,8 @@ class TrainPipeline:
         model_trainer_config (ModelTrainerConfig): Model trainer configuration.
         model_evaluation_config (ModelEvaluationConfig): Model evaluation configuration.
         model_pusher_config (ModelPusherConfig): Model pusher configuration.
+        profiler_config (ProfilerConfig): Training run profiler configuration.
+        stage_cache_config (StageCacheConfig): Stage output cache configuration.
     """
 
     def __init__(self):
@@ -80,6 +120,28 @@ class TrainPipeline:
 
         self.model_pusher_config = ModelPusherConfig()
 
+        self.profiler_config = ProfilerConfig()
+
+        self.profiler = StageProfiler(
+            report_file_path=self.profiler_config.report_file_path,
+            trace_allocations=self.profiler_config.trace_allocations,
+            top_allocations=self.profiler_config.top_allocations,
+        )
+
+        self.stage_cache_config = StageCacheConfig()
+
+        self.stage_cache = StageCache(
+            cache_dir=self.stage_cache_config.cache_dir,
+            max_size_bytes=self.stage_cache_config.max_size_bytes,
+            enabled=self.stage_cache_config.enabled,
+        )
+
+    @contextmanager
+    def _stage(self, name: str):
+        # metrics and run report for one start_* stage
+        with phase_timer("training", name), self.profiler.stage(name):
+            yield
+
 
     def start_data_ingestion(self)-> DataIngestionArtifact:
         try:
@@ -139,10 +201,36 @@ class TrainPipeline:
         self, data_validation_artifact: DataValidationArtifact
     ) -> DataTransformationArtifact:
         """
-        Start the data transformation process.
+        Start the data transformation process, or restore its artifacts from
+        the stage cache when the validated data, schema, preprocessing config
+        and code are unchanged.
         """
 
         try:
+            key = self.stage_cache.fingerprint(
+                stage="data_transformation",
+                paths=[
+                    data_validation_artifact.valid_train_file_path,
+                    data_validation_artifact.valid_test_file_path,
+                    SCHEMA_FILE_PATH,
+                    self.data_transformation_config.preprocessing_config_file_path,
+                ],
+                values=_settings(self.data_transformation_config),
+            )
+
+            cached = self.stage_cache.load(
+                "data_transformation",
+                key,
+                destinations={
+                    field.name: getattr(self.data_transformation_config, field.name)
+                    for field in fields(DataTransformationArtifact)
+                    if _is_path_field(field.name)
+                },
+            )
+
+            if cached is not None:
+                return DataTransformationArtifact(**cached)
+
             data_transformation = DataTransformation(
                 data_validation_artifact, self.data_transformation_config
             )
@@ -151,6 +239,10 @@ class TrainPipeline:
                 data_transformation.initiate_data_transformation()
             )
 
+            files, values = _split_artifact(data_transformation_artifact)
+
+            self.stage_cache.store("data_transformation", key, files=files, values=values)
+
             return data_transformation_artifact
 
         except Exception as e:
@@ -161,10 +253,40 @@ class TrainPipeline:
         self, data_transformation_artifact: DataTransformationArtifact
     ) -> ModelTrainerArtifact:
         """
-        Start the model training process.
+        Start the model training process, or restore the trained model from
+        the stage cache when the transformed data, model config and code are
+        unchanged.
         """
         
         try:
+            input_files, input_values = _split_artifact(data_transformation_artifact)
+
+            key = self.stage_cache.fingerprint(
+                stage="model_trainer",
+                paths=list(input_files.values())
+                + [self.model_trainer_config.model_config_file_path],
+                values={**_settings(self.model_trainer_config), **input_values},
+            )
+
+            cached = self.stage_cache.load(
+                "model_trainer",
+                key,
+                destinations={
+                    "trained_model_file_path": self.model_trainer_config.trained_model_file_path
+                },
+            )
+
+            if cached is not None:
+                return ModelTrainerArtifact(
+                    trained_model_file_path=cached["trained_model_file_path"],
+                    train_metric_artifact=ClassificationMetricArtifact(
+                        **cached["train_metric_artifact"]
+                    ),
+                    test_metric_artifact=ClassificationMetricArtifact(
+                        **cached["test_metric_artifact"]
+                    ),
+                )
+
             model_trainer = ModelTrainer(
                 data_transformation_artifact=data_transformation_artifact,
                 model_trainer_config=self.model_trainer_config,
@@ -172,6 +294,18 @@ class TrainPipeline:
 
             model_trainer_artifact = model_trainer.initiate_model_trainer()
 
+            self.stage_cache.store(
+                "model_trainer",
+                key,
+                files={
+                    "trained_model_file_path": model_trainer_artifact.trained_model_file_path
+                },
+                values={
+                    "train_metric_artifact": asdict(model_trainer_artifact.train_metric_artifact),
+                    "test_metric_artifact": asdict(model_trainer_artifact.test_metric_artifact),
+                },
+            )
+
             return model_trainer_artifact
 
         except Exception as e:
@@ -221,41 +355,61 @@ class TrainPipeline:
         except Exception as e:
             raise BackOrderException(e, sys) 
 
-    def run_pipeline(self):
+    def run_pipeline(self) -> Optional[ModelPusherArtifact]:
         """
         Run the entire training pipeline.
         """
         
         try:
-            data_ingestion_artifact: DataIngestionArtifact = self.start_data_ingestion()
-            
-            data_validation_artifact = self.start_data_validation(
-                data_ingestion_artifact
-            )      
-
-            data_transformation_artifact = self.start_data_transformation(
-                data_validation_artifact
-            )      
-
-            model_trainer_artifact = self.start_model_trainer(
-                data_transformation_artifact
-            )
-            model_evaluation_artifact = self.start_model_evaluation(
-                data_validation_artifact, data_transformation_artifact, model_trainer_artifact,
-            )
+            with self.profiler.activate():
+                with self._stage("data_ingestion"):
+                    data_ingestion_artifact: DataIngestionArtifact = self.start_data_ingestion()
 
-            if not model_evaluation_artifact.is_model_accepted:
-                logging.info(f"Model not accepted.")
+                with self._stage("data_validation"):
+                    data_validation_artifact = self.start_data_validation(
+                        data_ingestion_artifact
+                    )
 
-                logging.info(f"Exiting the training pipeline")
+                with self._stage("data_transformation"):
+                    data_transformation_artifact = self.start_data_transformation(
+                        data_validation_artifact
+                    )
 
-                return None   
-            
-            model_pusher_artifact = self.start_model_pusher(
-                model_trainer_artifact=model_trainer_artifact
-            )
+                with self._stage("model_trainer"):
+                    model_trainer_artifact = self.start_model_trainer(
+                        data_transformation_artifact
+                    )
 
-            logging.info(f"Exiting the training pipeline")         
+                with self._stage("model_evaluation"):
+                    model_evaluation_artifact = self.start_model_evaluation(
+                        data_validation_artifact, data_transformation_artifact, model_trainer_artifact,
+                    )
+
+                if not model_evaluation_artifact.is_model_accepted:
+                    logging.info(f"Model not accepted.")
+
+                    logging.info(f"Exiting the training pipeline")
+
+                    return None
+
+                with self._stage("model_pusher"):
+                    model_pusher_artifact = self.start_model_pusher(
+                        model_trainer_artifact=model_trainer_artifact
+                    )
+
+                logging.info(f"Exiting the training pipeline")
+
+                return model_pusher_artifact
 
         except Exception as e:
-            raise BackOrderException(e, sys) from e     
\ No newline at end of file
+            raise BackOrderException(e, sys) from e
+
+        finally:
+            try:
+                self.profiler.write_report(
+                    pipeline_name=training_pipeline_config.pipeline_name,
+                    artifact_dir=training_pipeline_config.artifact_dir,
+                )
+
+            except BackOrderException as e:
+                logging.info(f"Could not write the training run report: {e}")     
\ No newline at end of file
@@ -1,9 +1,19 @@
 import os.path
 import sys
+from typing import List, Optional
+
 import dill
 import numpy as np
+import pandas as pd
 import yaml
-
+from scipy import sparse
+
+from source.constants.training_pipeline import (
+    SCHEMA_DROP_COLS,
+    SCHEMA_FILE_PATH,
+    SPARSE_ARRAY_FILE_EXTENSION,
+    TARGET_COLUMN,
+)
 from source.exception import BackOrderException
 from source.logger import logging
 
@@ -57,31 +67,163 @@ def load_object(file_path: str) -> object:
         raise BackOrderException(e, sys) from e
 
 
-def save_numpy_array_data(file_path: str, array: np.array):
+def get_schema_dtypes(schema_config: Optional[dict] = None) -> dict:
+    """
+    pandas dtypes of the schema columns: float columns as float32 and the
+    object (Yes/No flag) columns as category. Integer id columns are left to
+    inference so they keep their exact values.
+    """
+
+    try:
+        if schema_config is None:
+            schema_config = read_yaml_file(file_path=SCHEMA_FILE_PATH)
+
+        dtypes = {}
+
+        for column in schema_config["columns"]:
+            for name, column_type in column.items():
+                if column_type == "float":
+                    dtypes[name] = np.float32
+
+                elif column_type == "object":
+                    dtypes[name] = "category"
+
+        return dtypes
+
+    except Exception as e:
+        raise BackOrderException(e, sys) from e
+
+
+def apply_schema_dtypes(
+    dataframe: pd.DataFrame, schema_config: Optional[dict] = None
+) -> pd.DataFrame:
+    """
+    Cast the schema columns of a DataFrame to the schema dtypes used by
+    read_csv_with_schema.
+    """
+
+    try:
+        dtypes = get_schema_dtypes(schema_config)
+
+        return dataframe.astype(
+            {column: dtype for column, dtype in dtypes.items() if column in dataframe.columns}
+        )
+
+    except Exception as e:
+        raise BackOrderException(e, sys) from e
+
+
+def get_feature_columns(schema_config: Optional[dict] = None) -> List[str]:
+    """
+    Schema columns the model uses: every column but the drop_columns and the target.
+    """
+
+    try:
+        if schema_config is None:
+            schema_config = read_yaml_file(file_path=SCHEMA_FILE_PATH)
+
+        excluded = set(schema_config[SCHEMA_DROP_COLS]) | {TARGET_COLUMN}
+
+        return [
+            name
+            for column in schema_config["columns"]
+            for name in column
+            if name not in excluded
+        ]
+
+    except Exception as e:
+        raise BackOrderException(e, sys) from e
+
+
+def read_csv_with_schema(
+    filepath_or_buffer, schema_config: Optional[dict] = None, **kwargs
+) -> pd.DataFrame:
+    """
+    Read a CSV file with the schema dtypes, float32 numerics and categorical
+    flags, instead of pandas' float64 and object inference. Columns missing
+    from the file are ignored. Extra keyword arguments go to pandas.read_csv.
+    """
+
+    try:
+        return pd.read_csv(
+            filepath_or_buffer, dtype=get_schema_dtypes(schema_config), **kwargs
+        )
+
+    except Exception as e:
+        raise BackOrderException(e, sys) from e
+
+
+def save_numpy_array_data(
+    file_path: str, array: np.array, dtype=None, chunk_rows: int = 100_000
+):
     """
     Save numpy array data to file
     file_path: str location of file to save
-    array: np.array data to save
+    array: np.array data to save, or a scipy sparse matrix, which is written as
+        CSR with scipy.sparse.save_npz to file_path with the extension .npz
+    dtype: when set, the array is written as a C-contiguous array of this dtype,
+        converted chunk_rows rows at a time so no full converted copy is held
+    return: str location of the saved file
     """
     try:
+        if sparse.issparse(array):
+            file_path = os.path.splitext(file_path)[0] + SPARSE_ARRAY_FILE_EXTENSION
+
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+            sparse.save_npz(
+                file_path, array.tocsr().astype(dtype or array.dtype, copy=False), compressed=False
+            )
+
+            return file_path
+
+        # already written in place, e.g. by a chunked transform, rewriting it would truncate its source
+        if isinstance(array, np.memmap) and array.filename is not None and \
+                os.path.abspath(array.filename) == os.path.abspath(file_path):
+            return file_path
+
         dir_path = os.path.dirname(file_path)
 
         os.makedirs(dir_path, exist_ok=True)
 
-        with open(file_path, "wb") as file_obj:
-            np.save(file_obj, array)
+        if dtype is None:
+            with open(file_path, "wb") as file_obj:
+                np.save(file_obj, array)
+
+            return file_path
+
+        out = np.lib.format.open_memmap(
+            file_path, mode="w+", dtype=dtype, shape=array.shape
+        )
+
+        for start in range(0, len(array), chunk_rows):
+            out[start : start + chunk_rows] = array[start : start + chunk_rows]
+
+        out.flush()
+
+        del out
+
+        return file_path
 
     except Exception as e:
         raise BackOrderException(e, sys) from e
 
 
-def load_numpy_array_data(file_path: str) -> np.array:
+def load_numpy_array_data(file_path: str, mmap_mode: Optional[str] = None) -> np.array:
     """
     load numpy array data from file
     file_path: str location of file to load
+    mmap_mode: "r" to memory-map the file read-only instead of reading it into memory,
+        ignored for .npz files, which are loaded whole as a CSR matrix
     return: np.array data loaded
     """
     try:
+        if file_path.endswith(SPARSE_ARRAY_FILE_EXTENSION):
+            return sparse.load_npz(file_path).tocsr()
+
+        if mmap_mode is not None:
+            return np.load(file_path, mmap_mode=mmap_mode)
+
         with open(file_path, "rb") as file_obj:
             return np.load(file_obj)
 
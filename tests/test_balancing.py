@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from source.ml.balancing import ClassBalancer, stratify_column_indices
+
+
+@pytest.mark.parametrize("stratify_on", [None, [0, 3]])
+@pytest.mark.parametrize("reweight", [False, True])
+@pytest.mark.parametrize("method", ["smote", "undersample"])
+def test_resampling_to_file_matches_in_memory(tmp_path, method, reweight, stratify_on):
+    rng = np.random.default_rng(0)
+
+    X = rng.normal(size=(5_000, 8)).astype(np.float32)
+
+    y = (rng.random(5_000) < 0.05).astype(np.int64)
+
+    file_path = str(tmp_path / "train.npy")
+
+    np.save(file_path, X)
+
+    def balancer():
+        return ClassBalancer(
+            method=method,
+            reweight=reweight,
+            stratify_on=stratify_on,
+            random_state=42,
+            chunk_rows=700,
+        )
+
+    expected_X, expected_y, expected_weights = balancer().fit_resample(X, y)
+
+    actual_X, actual_y, actual_weights = balancer().fit_resample(
+        np.load(file_path, mmap_mode="r"), y, file_path=file_path
+    )
+
+    assert isinstance(actual_X, np.memmap)
+
+    assert actual_X.filename == file_path
+
+    np.testing.assert_array_equal(actual_X, expected_X)
+
+    np.testing.assert_array_equal(actual_y, expected_y)
+
+    np.testing.assert_array_equal(actual_weights, expected_weights)
+
+
+def test_stratified_undersample_keeps_stratum_proportions():
+    rng = np.random.default_rng(0)
+
+    # one rare and one common category of a one-hot column, and a numeric column
+    X = np.column_stack(
+        [rng.random(20_000) < 0.1, rng.normal(size=20_000)]
+    ).astype(np.float32)
+
+    y = (rng.random(20_000) < 0.05).astype(np.int64)
+
+    balancer = ClassBalancer(
+        method="undersample", stratify_on=[0, 1], n_bins=4, random_state=42
+    )
+
+    X_balanced, y_balanced, weights = balancer.fit_resample(X, y)
+
+    majority, balanced_majority = X[y != 1], X_balanced[y_balanced != 1]
+
+    assert len(balanced_majority) == (y == 1).sum()
+
+    assert abs(balanced_majority[:, 0].mean() - majority[:, 0].mean()) < 0.01
+
+    # normalized inverse sampling rates keep the majority total at its sampled size
+    np.testing.assert_allclose(weights[y_balanced != 1].sum(), len(balanced_majority), rtol=1e-4)
+
+    np.testing.assert_array_equal(weights[y_balanced == 1], 1)
+
+
+def test_stratify_column_indices():
+    feature_names = [
+        "num__sales",
+        "num__sales_1_month",
+        "cat__deck_risk_No",
+        "cat__deck_risk_Yes",
+    ]
+
+    input_columns = ["sales", "sales_1_month", "deck_risk"]
+
+    assert stratify_column_indices(feature_names, ["sales", "deck_risk"], input_columns) == [0, 2, 3]
+
+    with pytest.raises(ValueError):
+        stratify_column_indices(feature_names, ["lead_time"], input_columns)
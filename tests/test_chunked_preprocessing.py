@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from scipy import sparse
+
+from benchmarks.synthetic_data import generate_back_order_data
+from source.constants.training_pipeline import SCHEMA_FILE_PATH, TARGET_COLUMN
+from source.ml.chunked_preprocessing import fit_preprocessor_in_chunks
+from source.ml.pre_processing import drop_columns
+from source.ml.preprocessing_spec import PreprocessingSpec
+from source.utils import apply_schema_dtypes, read_yaml_file
+
+ID_GROUP = {
+    "name": "ids",
+    "columns": ["supplier_id", "warehouse_id"],
+    "dtype": "float32",
+    "sparse": True,
+    "steps": [
+        {
+            "name": "imputer",
+            "module": "sklearn.impute",
+            "class": "SimpleImputer",
+            "params": {"strategy": "constant", "fill_value": "missing"},
+        },
+        {
+            "name": "encoder",
+            "module": "sklearn.preprocessing",
+            "class": "OneHotEncoder",
+            "params": {"handle_unknown": "infrequent_if_exist", "min_frequency": 20},
+        },
+    ],
+}
+
+
+def make_features(n_rows: int):
+    rng = np.random.default_rng(11)
+
+    dataframe = apply_schema_dtypes(drop_columns(generate_back_order_data(n_rows, seed=11)))
+
+    dataframe["supplier_id"] = np.array(
+        [f"s{value}" for value in rng.zipf(1.5, n_rows) % 5_000], dtype=object
+    )
+
+    dataframe["warehouse_id"] = np.array(
+        [f"w{value}" for value in rng.integers(0, 300, n_rows)], dtype=object
+    )
+
+    dataframe.loc[rng.random(n_rows) < 0.02, "supplier_id"] = None
+
+    return dataframe.drop(columns=[TARGET_COLUMN])
+
+
+def build_preprocessor(with_ids: bool):
+    schema_config = read_yaml_file(SCHEMA_FILE_PATH)
+
+    spec = PreprocessingSpec.from_file(schema_config)
+
+    if with_ids:
+        spec.column_groups = spec.column_groups + [ID_GROUP]
+
+    return spec.build_preprocessor()
+
+
+@pytest.mark.parametrize("with_ids", [False, True])
+def test_chunked_fit_matches_in_memory_fit(with_ids):
+    features = make_features(30_000)
+
+    if not with_ids:
+        features = features.drop(columns=["supplier_id", "warehouse_id"])
+
+    def make_chunks(columns=None):
+        chunk_columns = list(features.columns) if columns is None else columns
+
+        return [
+            features.iloc[start : start + 7_000][chunk_columns]
+            for start in range(0, len(features), 7_000)
+        ]
+
+    in_memory = build_preprocessor(with_ids).fit(features)
+
+    chunked = fit_preprocessor_in_chunks(
+        build_preprocessor(with_ids), make_chunks, sketch_size=len(features), random_state=0
+    )
+
+    assert list(chunked.get_feature_names_out()) == list(in_memory.get_feature_names_out())
+
+    assert chunked.output_indices_ == in_memory.output_indices_
+
+    expected = in_memory.transform(features)
+
+    actual = chunked.transform(features)
+
+    assert sparse.issparse(actual) == sparse.issparse(expected) == with_ids
+
+    if with_ids:
+        expected, actual = expected.toarray(), actual.toarray()
+
+        # rare ids share one infrequent column in both fits
+        assert any(name.endswith("infrequent_sklearn") for name in chunked.get_feature_names_out())
+
+    np.testing.assert_array_equal(actual, expected)
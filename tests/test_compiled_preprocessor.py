@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from benchmarks.synthetic_data import generate_back_order_data
+from source.components.data_transformation import DataTransformation
+from source.constants.training_pipeline import TARGET_COLUMN
+from source.entity.config_entity import DataTransformationConfig
+from source.ml.compiled_preprocessor import compile_preprocessor
+from source.ml.pre_processing import drop_columns
+from source.utils import apply_schema_dtypes
+
+
+@pytest.mark.parametrize("schema_dtypes", [True, False])
+def test_compiled_preprocessor_is_bit_identical(schema_dtypes):
+    dataframe = drop_columns(generate_back_order_data(20_000, seed=7))
+
+    if schema_dtypes:
+        # float32 columns, as read from the feature store
+        dataframe = apply_schema_dtypes(dataframe)
+
+    features = dataframe.drop(columns=[TARGET_COLUMN])
+
+    train_df, test_df = features.iloc[:15_000], features.iloc[15_000:]
+
+    data_transformation = DataTransformation(None, DataTransformationConfig())
+
+    preprocessor = data_transformation.get_data_transformer_object().fit(train_df)
+
+    dtype = data_transformation._preprocessing_spec.dtype
+
+    compiled = compile_preprocessor(preprocessor, test_df, dtype=dtype)
+
+    assert compiled is not None
+
+    expected = preprocessor.transform(test_df)
+
+    actual = compiled.transform(test_df)
+
+    assert actual.dtype == expected.dtype == dtype
+
+    assert np.array_equal(actual, expected)
+
+
+def test_compiled_preprocessor_refuses_infrequent_categories():
+    rng = np.random.default_rng(0)
+
+    # "z" sorts last, is infrequent and absent from the sample the kernel is checked on
+    train_df = pd.DataFrame(
+        {
+            "national_inv": rng.normal(size=1_000),
+            "supplier_id": np.where(np.arange(1_000) < 5, "z", rng.choice(["a", "b"], 1_000)),
+        }
+    )
+
+    preprocessor = ColumnTransformer(
+        [
+            ("num", Pipeline([("scaler", StandardScaler())]), ["national_inv"]),
+            (
+                "ids",
+                Pipeline(
+                    [
+                        (
+                            "encoder",
+                            OneHotEncoder(
+                                handle_unknown="infrequent_if_exist",
+                                min_frequency=20,
+                                sparse_output=False,
+                            ),
+                        )
+                    ]
+                ),
+                ["supplier_id"],
+            ),
+        ]
+    ).fit(train_df)
+
+    sample = train_df[train_df["supplier_id"] != "z"]
+
+    assert compile_preprocessor(preprocessor, sample) is None
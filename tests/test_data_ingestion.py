@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks.local_stores import LocalMongoClient
+from source.components.data_ingestion import DataIngestion
+from source.configuration.mongo_db_connection import MongoDBClient
+from source.constants.database import DATABASE_NAME
+from source.data_access.back_order_data import BackOrderData
+from source.entity.config_entity import DataIngestionConfig
+
+START = datetime(2026, 1, 1)
+
+
+def make_document(sku: int, updated_at: datetime, label: str = "No") -> dict:
+    return {"_id": sku, "sku": sku, "national_inv": float(sku), "went_on_backorder": label, "updated_at": updated_at}
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    mongo_client = LocalMongoClient()
+
+    monkeypatch.setattr(MongoDBClient, "client", mongo_client)
+
+    config = DataIngestionConfig()
+
+    return mongo_client[DATABASE_NAME][config.collection_name]
+
+
+@pytest.fixture
+def data_ingestion(tmp_path, collection):
+    config = DataIngestionConfig()
+
+    config.incremental = True
+
+    config.export_partitions = 1
+
+    config.snapshot_file_path = str(tmp_path / "snapshot" / "back_order.parquet")
+
+    config.watermark_file_path = str(tmp_path / "snapshot" / "watermark.yaml")
+
+    return DataIngestion(config)
+
+
+def make_back_order_data(query: dict) -> BackOrderData:
+    back_order_data = BackOrderData()
+
+    back_order_data._schema_config = {**back_order_data._schema_config, "ingestion_filter": query}
+
+    return back_order_data
+
+
+def test_sync_snapshot_pulls_documents_written_at_the_watermark(collection, data_ingestion):
+    collection.insert_many([make_document(sku, START + timedelta(seconds=sku)) for sku in range(3)])
+
+    data_ingestion.sync_snapshot(make_back_order_data({}))
+
+    # written with the watermark timestamp after the first export passed it
+    collection.insert_many([make_document(3, START + timedelta(seconds=2))])
+
+    snapshot = data_ingestion.sync_snapshot(make_back_order_data({}))
+
+    assert sorted(snapshot["_id"]) == ["0", "1", "2", "3"]
+
+    assert snapshot["_id"].is_unique
+
+
+def test_sync_snapshot_drops_documents_updated_out_of_the_filter(collection, data_ingestion):
+    query = {"went_on_backorder": {"$in": ["Yes", "No"]}}
+
+    collection.insert_many([make_document(sku, START + timedelta(seconds=sku)) for sku in range(3)])
+
+    data_ingestion.sync_snapshot(make_back_order_data(query))
+
+    collection.documents[0].update(went_on_backorder="na", updated_at=START + timedelta(seconds=10))
+
+    collection.documents[1].update(national_inv=-1.0, updated_at=START + timedelta(seconds=10))
+
+    snapshot = data_ingestion.sync_snapshot(make_back_order_data(query)).set_index("_id")
+
+    assert sorted(snapshot.index) == ["1", "2"]
+
+    assert snapshot.loc["1", "national_inv"] == -1.0
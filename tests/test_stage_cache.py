@@ -0,0 +1,30 @@
+import pytest
+
+from source.exception import BackOrderException
+from source.pipeline import stage_cache
+from source.pipeline.stage_cache import StageCache
+
+
+def test_fingerprint_raises_on_missing_input(tmp_path):
+    cache = StageCache(str(tmp_path / "cache"), max_size_bytes=1 << 20)
+
+    with pytest.raises(BackOrderException, match="Missing inputs"):
+        cache.fingerprint("model_trainer", paths=[str(tmp_path / "train.npy")])
+
+
+def test_fingerprint_changes_with_library_versions(tmp_path, monkeypatch):
+    cache = StageCache(str(tmp_path / "cache"), max_size_bytes=1 << 20)
+
+    input_path = tmp_path / "train.npy"
+
+    input_path.write_bytes(b"features")
+
+    paths = [str(input_path), None]
+
+    key = cache.fingerprint("model_trainer", paths=paths)
+
+    versions = {**stage_cache.library_versions(), "scikit-learn": "0.0.0"}
+
+    monkeypatch.setattr(stage_cache, "library_versions", lambda: versions)
+
+    assert cache.fingerprint("model_trainer", paths=paths) != key